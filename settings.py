@@ -1,7 +1,9 @@
-from azure.identity import DefaultAzureCredential
-from azure.keyvault.secrets import SecretClient
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+import json
 import os
+import threading
+import time
 
 # Load environment variables from .env file (for local development)
 load_dotenv()
@@ -9,50 +11,194 @@ load_dotenv()
 # Key Vault configuration
 AZURE_KEY_VAULT_URL = os.getenv("AZURE_KEY_VAULT_URL")  # e.g., "https://your-vault.vault.azure.net/"
 
-def get_secrets():
-    """Retrieve secrets from Azure Key Vault or fallback to environment variables"""
+# Key Vault secret holding each setting
+SECRET_NAMES = {
+    "AZURE_STORAGE_CONNECTION_STRING": "azure-storage-connection-string",
+    "AZURE_BLOB_CONTAINER_ROW_DATA": "azure-blob-container-row-data",
+    "AZURE_BLOB_CONTAINER_BACKUPS": "azure-blob-container-backups",
+    "AZURE_SQL_CONNECTION_STRING": "azure-sql-connection-string",
+}
+
+# Startup mode: with LAZY_INIT=true secrets are fetched on first use rather than
+# on import, and repositories defer their connection and container checks
+LAZY_INIT = os.getenv("LAZY_INIT", "false").lower() == "true"
+# Seconds fetched secrets are reused, and an optional file keeping them across
+# restarts of the process (written with owner-only permissions)
+SECRETS_CACHE_TTL_SECONDS = float(os.getenv("SECRETS_CACHE_TTL_SECONDS", "3600"))
+SECRETS_CACHE_PATH = os.getenv("SECRETS_CACHE_PATH")
+
+# Database backend: "azure_sql" (default) or "sqlite" for the embedded local database
+DB_BACKEND = os.getenv("DB_BACKEND", "azure_sql").lower()
+SQLITE_DATABASE_PATH = os.getenv("SQLITE_DATABASE_PATH", "data/etl_poc.db")
+if DB_BACKEND not in ("azure_sql", "sqlite"):
+    raise ValueError(f"Unsupported DB_BACKEND: {DB_BACKEND}")
+
+_secrets = {"loaded_at": 0.0, "values": None}
+_secrets_lock = threading.Lock()
+
+
+def _fetch_secrets():
+    """Retrieve secrets from Azure Key Vault, all at once, or fallback to environment variables"""
+    if not AZURE_KEY_VAULT_URL:
+        print("AZURE_KEY_VAULT_URL is not set, using environment variables")
+        return {key: os.getenv(key) for key in SECRET_NAMES}, False
     try:
+        # Imported here: without a Key Vault the SDKs are not needed at all
+        from azure.identity import DefaultAzureCredential
+        from azure.keyvault.secrets import SecretClient
+
         # Initialize the Secret Client
         credential = DefaultAzureCredential()
         secret_client = SecretClient(vault_url=AZURE_KEY_VAULT_URL, credential=credential)
 
-        # Fetch secrets from Key Vault
-        secrets = {
-            "AZURE_STORAGE_CONNECTION_STRING": secret_client.get_secret("azure-storage-connection-string").value,
-            "AZURE_BLOB_CONTAINER_ROW_DATA": secret_client.get_secret("azure-blob-container-row-data").value,
-            "AZURE_BLOB_CONTAINER_BACKUPS": secret_client.get_secret("azure-blob-container-backups").value,
-            "AZURE_SQL_CONNECTION_STRING": secret_client.get_secret("azure-sql-connection-string").value,
-        }
+        # Fetch secrets from Key Vault concurrently rather than one round trip after another
+        with ThreadPoolExecutor(max_workers=len(SECRET_NAMES)) as pool:
+            values = pool.map(
+                lambda name: secret_client.get_secret(name).value, SECRET_NAMES.values()
+            )
+            secrets = dict(zip(SECRET_NAMES, values))
         print("Successfully loaded secrets from Azure Key Vault")
-        return secrets
+        return secrets, True
 
     except Exception as e:
         print(f"Failed to load secrets from Key Vault: {str(e)}")
         print("Falling back to environment variables")
         # Fallback to environment variables
-        return {
-            "AZURE_STORAGE_CONNECTION_STRING": os.getenv("AZURE_STORAGE_CONNECTION_STRING"),
-            "AZURE_BLOB_CONTAINER_ROW_DATA": os.getenv("AZURE_BLOB_CONTAINER_ROW_DATA"),
-            "AZURE_BLOB_CONTAINER_BACKUPS": os.getenv("AZURE_BLOB_CONTAINER_BACKUPS"),
-            "AZURE_SQL_CONNECTION_STRING": os.getenv("AZURE_SQL_CONNECTION_STRING"),
-        }
-
-# Load secrets
-secrets = get_secrets()
-
-# Assign secrets to variables
-AZURE_STORAGE_CONNECTION_STRING = secrets["AZURE_STORAGE_CONNECTION_STRING"]
-AZURE_BLOB_CONTAINER_ROW_DATA = secrets["AZURE_BLOB_CONTAINER_ROW_DATA"]
-AZURE_BLOB_CONTAINER_BACKUPS = secrets["AZURE_BLOB_CONTAINER_BACKUPS"]
-AZURE_SQL_CONNECTION_STRING = secrets["AZURE_SQL_CONNECTION_STRING"]
-
-# Validate required variables
-if not all(
-    [
-        AZURE_STORAGE_CONNECTION_STRING,
-        AZURE_BLOB_CONTAINER_ROW_DATA,
-        AZURE_BLOB_CONTAINER_BACKUPS,
-        AZURE_SQL_CONNECTION_STRING,
-    ]
-):
-    raise ValueError("One or more required environment variables or secrets are missing!")
\ No newline at end of file
+        return {key: os.getenv(key) for key in SECRET_NAMES}, False
+
+
+def _read_secrets_file(now):
+    try:
+        with open(SECRETS_CACHE_PATH) as file:
+            cached = json.load(file)
+        if now - cached["loaded_at"] < SECRETS_CACHE_TTL_SECONDS:
+            return cached
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+
+def _write_secrets_file(cached):
+    try:
+        descriptor = os.open(SECRETS_CACHE_PATH, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(descriptor, "w") as file:
+            json.dump(cached, file)
+    except OSError as e:
+        print(f"[WARN] Could not write the secrets cache: {e}")
+
+
+def _validate(secrets):
+    # Validate required variables
+    if not all(
+        [
+            secrets["AZURE_STORAGE_CONNECTION_STRING"],
+            secrets["AZURE_BLOB_CONTAINER_ROW_DATA"],
+            secrets["AZURE_BLOB_CONTAINER_BACKUPS"],
+            secrets["AZURE_SQL_CONNECTION_STRING"] or DB_BACKEND == "sqlite",
+        ]
+    ):
+        raise ValueError("One or more required environment variables or secrets are missing!")
+
+
+def get_secrets():
+    """
+    Return the secrets, fetching them at most once per SECRETS_CACHE_TTL_SECONDS
+    (from SECRETS_CACHE_PATH when set and fresh, then from Key Vault).
+    """
+    with _secrets_lock:
+        now = time.time()
+        if _secrets["values"] is not None and now - _secrets["loaded_at"] < SECRETS_CACHE_TTL_SECONDS:
+            return _secrets["values"]
+        cached = _read_secrets_file(now) if SECRETS_CACHE_PATH else None
+        if cached is None:
+            values, from_key_vault = _fetch_secrets()
+            cached = {"loaded_at": now, "values": values}
+            # Only Key Vault values are worth keeping; the environment is at hand
+            if SECRETS_CACHE_PATH and from_key_vault:
+                _write_secrets_file(cached)
+        _validate(cached["values"])
+        _secrets.update(cached)
+        return _secrets["values"]
+
+
+def get_secret(name):
+    return get_secrets()[name]
+
+
+if not LAZY_INIT:
+    # Load secrets
+    secrets = get_secrets()
+
+    # Assign secrets to variables
+    AZURE_STORAGE_CONNECTION_STRING = secrets["AZURE_STORAGE_CONNECTION_STRING"]
+    AZURE_BLOB_CONTAINER_ROW_DATA = secrets["AZURE_BLOB_CONTAINER_ROW_DATA"]
+    AZURE_BLOB_CONTAINER_BACKUPS = secrets["AZURE_BLOB_CONTAINER_BACKUPS"]
+    AZURE_SQL_CONNECTION_STRING = secrets["AZURE_SQL_CONNECTION_STRING"]
+
+
+def __getattr__(name):
+    # With LAZY_INIT the secrets are only fetched when first read
+    if name in SECRET_NAMES:
+        return get_secret(name)
+    raise AttributeError(f"module 'settings' has no attribute '{name}'")
+
+
+# SQL instrumentation: timings and latency histograms per statement, and the
+# executions taking at least DB_SLOW_QUERY_MS in a ring buffer of the given size
+DB_INSTRUMENTATION = os.getenv("DB_INSTRUMENTATION", "true").lower() == "true"
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "500"))
+DB_SLOW_QUERY_LOG_SIZE = int(os.getenv("DB_SLOW_QUERY_LOG_SIZE", "100"))
+
+# Logging: records of the app go to a bounded queue written as JSON lines by a
+# background thread; repeated messages are sampled past a burst per window
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "500"))
+LOG_FLUSH_INTERVAL_SECONDS = float(os.getenv("LOG_FLUSH_INTERVAL_SECONDS", "0.5"))
+LOG_RATE_LIMIT_BURST = int(os.getenv("LOG_RATE_LIMIT_BURST", "20"))
+LOG_RATE_LIMIT_WINDOW_SECONDS = float(os.getenv("LOG_RATE_LIMIT_WINDOW_SECONDS", "10"))
+LOG_SAMPLE_EVERY = int(os.getenv("LOG_SAMPLE_EVERY", "100"))
+
+# Database execution (plain environment variables, not secrets)
+DB_EXECUTOR_MAX_WORKERS = int(os.getenv("DB_EXECUTOR_MAX_WORKERS", "8"))
+DB_QUERY_TIMEOUT_SECONDS = float(os.getenv("DB_QUERY_TIMEOUT_SECONDS", "30"))
+DB_WRITE_TIMEOUT_SECONDS = float(os.getenv("DB_WRITE_TIMEOUT_SECONDS", "300"))
+DB_BACKUP_TIMEOUT_SECONDS = float(os.getenv("DB_BACKUP_TIMEOUT_SECONDS", "3600"))
+
+# Batch write governor (adaptive concurrency and retries under throttling)
+DB_WRITE_CONCURRENCY_INITIAL = int(os.getenv("DB_WRITE_CONCURRENCY_INITIAL", "2"))
+DB_WRITE_CONCURRENCY_MAX = int(os.getenv("DB_WRITE_CONCURRENCY_MAX", "8"))
+DB_WRITE_MAX_RETRIES = int(os.getenv("DB_WRITE_MAX_RETRIES", "5"))
+INGEST_MAX_PENDING_BATCHES = int(os.getenv("INGEST_MAX_PENDING_BATCHES", "8"))
+
+# Backups (rows fetched per database round trip and AVRO block compression)
+BACKUP_FETCH_SIZE = int(os.getenv("BACKUP_FETCH_SIZE", "5000"))
+BACKUP_CODEC = os.getenv("BACKUP_CODEC", "deflate")
+AVRO_ENGINE = os.getenv("AVRO_ENGINE", "compiled")
+RESTORE_BATCH_SIZE = int(os.getenv("RESTORE_BATCH_SIZE", "10000"))
+# Incremental backups allowed on top of a full one before compacting (0 = never)
+BACKUP_MAX_CHAIN_LENGTH = int(os.getenv("BACKUP_MAX_CHAIN_LENGTH", "10"))
+# Id ranges backed up concurrently, and partitions loaded at once on restore
+BACKUP_PARTITIONS = int(os.getenv("BACKUP_PARTITIONS", "1"))
+RESTORE_PARALLELISM = int(os.getenv("RESTORE_PARALLELISM", "4"))
+# Seconds a table's backup catalog is served from memory before re-reading it
+BACKUP_CATALOG_TTL_SECONDS = float(os.getenv("BACKUP_CATALOG_TTL_SECONDS", "30"))
+BACKUP_CATALOG_SEGMENT_SIZE = int(os.getenv("BACKUP_CATALOG_SEGMENT_SIZE", "500"))
+# Default backup file format (avro or parquet) and rows per Parquet row group
+BACKUP_FORMAT = os.getenv("BACKUP_FORMAT", "avro").lower()
+PARQUET_ROW_GROUP_SIZE = int(os.getenv("PARQUET_ROW_GROUP_SIZE", "65536"))
+
+# Metrics results cache: seconds a result is served at most, and results kept
+METRICS_CACHE_TTL_SECONDS = float(os.getenv("METRICS_CACHE_TTL_SECONDS", "300"))
+METRICS_CACHE_MAX_ENTRIES = int(os.getenv("METRICS_CACHE_MAX_ENTRIES", "256"))
+
+# Metrics engine: sql queries the database, numpy answers from an in-process
+# columnar copy of employees that checks for rows added elsewhere every N seconds
+METRICS_ENGINE = os.getenv("METRICS_ENGINE", "sql").lower()
+METRICS_ENGINE_REFRESH_SECONDS = float(
+    os.getenv("METRICS_ENGINE_REFRESH_SECONDS", "30")
+)
+
+# Blob transfers (block size and parallel blocks per upload or download)
+BLOB_BLOCK_SIZE_BYTES = int(os.getenv("BLOB_BLOCK_SIZE_BYTES", str(4 * 1024 * 1024)))
+BLOB_MAX_CONCURRENCY = int(os.getenv("BLOB_MAX_CONCURRENCY", "8"))
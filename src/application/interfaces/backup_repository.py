@@ -1,19 +1,78 @@
 from abc import ABC, abstractmethod
-from typing import Optional
+from datetime import datetime
+from typing import Dict, Optional
 
 
 class BackupRepository(ABC):
     @abstractmethod
-    async def create_backup(self, table_name: str) -> Optional[str]:
-        """Create a backup for a specific table"""
+    async def create_backup(
+        self,
+        table_name: str,
+        codec: Optional[str] = None,
+        incremental: bool = False,
+        partitions: Optional[int] = None,
+        file_format: Optional[str] = None,
+    ) -> Optional[Dict]:
+        """
+        Create a backup for a specific table.
+
+        An incremental backup only holds the rows added since the previous one.
+        With `partitions`, id ranges are read and written concurrently.
+        `file_format` selects AVRO or Parquet files.
+        Returns the backup id and its metadata (rows, codec, sizes and timings),
+        or the previous backup flagged as skipped when the table is unchanged.
+        """
+        pass
+
+    @abstractmethod
+    async def create_dataset_backup(
+        self, codec: Optional[str] = None, file_format: Optional[str] = None
+    ) -> Dict:
+        """
+        Back up every table concurrently as of one consistent point in time,
+        under one backup set id. Returns the set id and the result per table.
+        """
         pass
 
     @abstractmethod
-    async def restore_backup(self, backup_id: str, table_name: str) -> bool:
-        """Restore a table from a backup"""
+    async def compact_backups(
+        self, table_name: str, backup_id: Optional[str] = None
+    ) -> Dict:
+        """Merge a chain of incremental backups into a new full backup"""
+        pass
+
+    @abstractmethod
+    async def restore_backup(
+        self,
+        backup_id: Optional[str],
+        table_name: str,
+        as_of: Optional[datetime] = None,
+        shadow: bool = False,
+    ) -> bool:
+        """
+        Restore a table from a backup; the latest one (as of `as_of`, if given)
+        when no backup id is passed. With `shadow`, readers keep seeing the old
+        rows until the restored table is swapped in.
+        """
+        pass
+
+    @abstractmethod
+    async def restore_dataset(
+        self,
+        backup_ids: Dict[str, Optional[str]],
+        manage_constraints: bool = False,
+        as_of: Optional[datetime] = None,
+        backup_set: Optional[str] = None,
+    ) -> Dict:
+        """
+        Restore every table from a backup each, in foreign key order, or from
+        the members of `backup_set`.
+
+        Returns the rows restored per table and the seconds spent per phase.
+        """
         pass
 
     @abstractmethod
     async def list_backups(self, table_name: str) -> list[dict]:
-        """List all backups for a specific table"""
+        """List all backups for a specific table, oldest first, from its catalog"""
         pass
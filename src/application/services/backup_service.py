@@ -1,51 +1,127 @@
 from datetime import datetime, timezone
+from typing import Dict, Optional
 
 
 from src.application.interfaces.backup_repository import BackupRepository
 from src.application.interfaces.logger import Logger
+from src.application.services.metrics_cache import DataVersions
 from src.domain.exceptions.domain_exceptions import BackupError, RestoreError
 
 
 class BackupService:
-    def __init__(self, backup_repository: BackupRepository, logger: Logger):
+    def __init__(
+        self,
+        backup_repository: BackupRepository,
+        logger: Logger,
+        data_versions: Optional[DataVersions] = None,
+    ):
         self.backup_repository = backup_repository
         self.logger = logger
+        # Bumped after every restore so cached metrics over the table are recomputed
+        self.data_versions = data_versions or DataVersions()
 
-    async def create_backup(self, table_name: str) -> dict:
+    async def create_backup(
+        self,
+        table_name: str,
+        codec: Optional[str] = None,
+        incremental: bool = False,
+        partitions: Optional[int] = None,
+        file_format: Optional[str] = None,
+    ) -> dict:
         """
         Create a backup for a specific table.
+
+        Args:
+            table_name: Table to back up
+            codec: Block compression; the repository default when omitted
+            incremental: Only back up rows added since the previous backup
+            partitions: Id ranges backed up concurrently; the repository default
+                when omitted
+            file_format: avro or parquet; the repository default when omitted
         """
         try:
             await self.logger.info(f"Starting backup for table: {table_name}")
 
             # Delegate to the repository
-            backup_path = await self.backup_repository.create_backup(table_name)
-            if not backup_path:
+            backup = await self.backup_repository.create_backup(
+                table_name, codec, incremental, partitions, file_format
+            )
+            if not backup:
                 raise BackupError(f"Failed to create backup for table: {table_name}")
 
-            await self.logger.info(f"Backup completed successfully: {backup_path}")
+            backup_path = backup.pop("backup_id")
+            if backup.get("skipped"):
+                await self.logger.info(
+                    f"Table {table_name} unchanged, latest backup is {backup_path}"
+                )
+            else:
+                await self.logger.info(f"Backup completed successfully: {backup_path}")
 
             return {
                 "backup_path": backup_path,
                 "table_name": table_name,
                 "timestamp": datetime.now(timezone.utc).isoformat(),
+                "metadata": backup,
             }
 
         except Exception as e:
             await self.logger.error(f"Error creating backup for {table_name}: {str(e)}")
             raise BackupError(f"Error creating backup: {str(e)}")
 
-    async def restore_backup(self, backup_id: str, table_name: str) -> bool:
+    async def create_dataset_backup(
+        self, codec: Optional[str] = None, file_format: Optional[str] = None
+    ) -> dict:
+        """
+        Back up departments, jobs and employees from one consistent snapshot.
+
+        Args:
+            codec: Block compression; the repository default when omitted
+            file_format: avro or parquet; the repository default when omitted
+        """
+        try:
+            await self.logger.info("Starting dataset backup")
+            result = await self.backup_repository.create_dataset_backup(
+                codec, file_format
+            )
+            await self.logger.info(
+                f"Dataset backup {result['backup_set']} completed in "
+                f"{result['seconds']}s, as of {result['snapshot_at']}"
+            )
+            return result
+
+        except Exception as e:
+            await self.logger.error(f"Error creating dataset backup: {str(e)}")
+            raise BackupError(f"Error creating dataset backup: {str(e)}")
+
+    async def restore_backup(
+        self,
+        backup_id: Optional[str],
+        table_name: str,
+        as_of: Optional[datetime] = None,
+        shadow: bool = False,
+    ) -> bool:
         """
         Restore a table from a backup.
+
+        Args:
+            backup_id: Backup to restore; the latest backup when omitted
+            table_name: Table to restore
+            as_of: Without a backup id, restore the latest backup taken at or
+                before this time
+            shadow: Load into a shadow table and swap it in when complete
         """
         try:
+            source = backup_id or (
+                f"latest as of {as_of.isoformat()}" if as_of else "latest"
+            )
             await self.logger.info(
-                f"Starting restore for table: {table_name} from backup: {backup_id}"
+                f"Starting restore for table: {table_name} from backup: {source}"
             )
 
             # Delegate to the repository
-            success = await self.backup_repository.restore_backup(backup_id, table_name)
+            success = await self.backup_repository.restore_backup(
+                backup_id, table_name, as_of, shadow
+            )
             if not success:
                 raise RestoreError(f"Failed to restore backup for table: {table_name}")
 
@@ -57,6 +133,59 @@ class BackupService:
                 f"Error restoring backup for {table_name}: {str(e)}"
             )
             raise RestoreError(f"Error restoring backup: {str(e)}")
+        finally:
+            # A failed restore may have replaced some rows too
+            self.data_versions.bump(table_name)
+
+    async def restore_dataset(
+        self,
+        backup_ids: Dict[str, Optional[str]],
+        manage_constraints: bool = False,
+        as_of: Optional[datetime] = None,
+        backup_set: Optional[str] = None,
+    ) -> dict:
+        """
+        Restore departments, jobs and employees together.
+
+        Args:
+            backup_ids: Backup id per table; the latest backup when missing
+            manage_constraints: Disable indexes and FK checks during the load
+            as_of: Point in time for tables without a backup id
+            backup_set: Backup set providing the ids not given in `backup_ids`
+        """
+        try:
+            source = f"backup set {backup_set}" if backup_set else "backups"
+            await self.logger.info(f"Starting dataset restore from {source}: {backup_ids}")
+            result = await self.backup_repository.restore_dataset(
+                backup_ids, manage_constraints, as_of, backup_set
+            )
+            await self.logger.info(
+                f"Dataset restore completed in {result['seconds']}s: {result['phases']}"
+            )
+            return result
+
+        except Exception as e:
+            await self.logger.error(f"Error restoring dataset: {str(e)}")
+            raise RestoreError(f"Error restoring dataset: {str(e)}")
+        finally:
+            self.data_versions.bump(*backup_ids)
+
+    async def compact_backups(
+        self, table_name: str, backup_id: Optional[str] = None
+    ) -> dict:
+        """
+        Merge the chain ending at `backup_id` (the newest backup by default)
+        into a new full backup.
+        """
+        try:
+            await self.logger.info(f"Compacting backups for table: {table_name}")
+            return await self.backup_repository.compact_backups(table_name, backup_id)
+
+        except Exception as e:
+            await self.logger.error(
+                f"Error compacting backups for {table_name}: {str(e)}"
+            )
+            raise BackupError(f"Error compacting backups: {str(e)}")
 
     async def list_backups(self, table_name: str) -> list:
         """
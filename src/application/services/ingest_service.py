@@ -6,25 +6,36 @@ from src.domain.repositories.department_repository import DepartmentRepository
 from src.domain.repositories.job_repository import JobRepository
 from src.application.interfaces.storage_service import StorageService
 from src.application.dto.employee_dto import BatchIngestDTO
+from src.application.services.metrics_cache import DataVersions
 from src.domain.exceptions.domain_exceptions import IngestError
-import requests
-from typing import BinaryIO, List, Dict, Tuple
-import pandas as pd
+import asyncio
+from typing import TYPE_CHECKING, BinaryIO, List, Dict, Optional, Tuple
 from datetime import datetime
 from io import StringIO
 import logging
 
+# pandas takes longer to import than the rest of the app; it is imported by the
+# methods parsing CSV files, so starting the API does not pay for it
+if TYPE_CHECKING:
+    import pandas as pd
+
 logger = logging.getLogger(__name__)
 
 
 class IngestService:
     def __init__(
-        self, employee_repository: EmployeeRepository, department_repository: DepartmentRepository, job_repository: JobRepository,storage_service: StorageService
+        self, employee_repository: EmployeeRepository, department_repository: DepartmentRepository, job_repository: JobRepository,storage_service: StorageService,
+        max_pending_batches: int = 8,
+        data_versions: Optional[DataVersions] = None,
     ):
         self.employee_repository = employee_repository
         self.department_repository = department_repository
         self.job_repository = job_repository
         self.storage_service = storage_service
+        # Upper bound of batches parsed and waiting to be written at the same time
+        self.max_pending_batches = max_pending_batches
+        # Bumped after every ingest so cached metrics over the table are recomputed
+        self.data_versions = data_versions or DataVersions()
 
     async def process_and_store_file_in_batches(
         self, 
@@ -48,7 +59,7 @@ class IngestService:
             if not is_stored:
                 raise IngestError("Failed to store file in Blob Storage")
             
-            logger.info(f"File stored in Blob Storage: {filename}")
+            logger.info("File stored in Blob Storage: %s", filename)
 
             # Define required columns for each table
             required_columns_by_table = {
@@ -60,6 +71,8 @@ class IngestService:
             if table_name not in required_columns_by_table:
                 raise ValueError(f"Unknown table: {table_name}")
 
+            import pandas as pd
+
             # Reset file pointer
             file_content.seek(0)
             
@@ -71,52 +84,83 @@ class IngestService:
                 header=None  # Indicate no header row in CSV
             )
 
-            total_processed = 0
-            total_successful = 0
-            total_failed = 0
-            total_invalid = 0
-
-            # Process each batch
-            for chunk in df_iterator:
-                batch_records, invalid_rows = self._process_batch(chunk, table_name)
-                
-                # Save batch according to table type
-                if batch_records:
-                    if table_name == "employees":
-                        save_results = await self.employee_repository.save_batch(batch_records)
-                    elif table_name == "departments":
-                        save_results = await self.department_repository.save_batch(batch_records)
-                    elif table_name == "jobs":
-                        save_results = await self.job_repository.save_batch(batch_records)
-                    
-                    successful = sum(1 for r in save_results if r)
-                    failed = len(batch_records) - successful
-                    
-                    total_processed += len(batch_records) + len(invalid_rows)
-                    total_successful += successful
-                    total_failed += failed
-                    total_invalid += len(invalid_rows)
-                    
-                    logger.info(
-                        f"Batch processed - Success: {successful}, "
-                        f"Failed: {failed}, Invalid: {len(invalid_rows)}"
-                    )
+            repository = {
+                "employees": self.employee_repository,
+                "departments": self.department_repository,
+                "jobs": self.job_repository,
+            }[table_name]
+
+            totals = {
+                "processed": 0,
+                "successful": 0,
+                "failed": 0,
+                "invalid_rows": 0,
+                "failed_batches": 0,
+            }
+            batch_errors: List[str] = []
+
+            async def save_batch(batch_records: List[object], invalid_rows: List[Dict]):
+                try:
+                    save_results = await repository.save_batch(batch_records)
+                except Exception as e:
+                    # Permanent error, or transient errors that outlasted the retries
+                    save_results = [False] * len(batch_records)
+                    totals["failed_batches"] += 1
+                    batch_errors.append(str(e))
+                    logger.error("Batch of %s rows failed: %s", len(batch_records), e)
+
+                successful = sum(1 for r in save_results if r)
+                failed = len(batch_records) - successful
+
+                totals["processed"] += len(batch_records) + len(invalid_rows)
+                totals["successful"] += successful
+                totals["failed"] += failed
+                totals["invalid_rows"] += len(invalid_rows)
+
+                logger.info(
+                    "Batch processed - Success: %s, Failed: %s, Invalid: %s",
+                    successful,
+                    failed,
+                    len(invalid_rows),
+                )
+
+            # Process each batch; several batches are written concurrently and the
+            # repository's write governor decides how many actually hit the database
+            pending = set()
+            try:
+                for chunk in df_iterator:
+                    batch_records, invalid_rows = self._process_batch(chunk, table_name)
+
+                    if batch_records:
+                        pending.add(
+                            asyncio.ensure_future(save_batch(batch_records, invalid_rows))
+                        )
+                        if len(pending) >= self.max_pending_batches:
+                            _, pending = await asyncio.wait(
+                                pending, return_when=asyncio.FIRST_COMPLETED
+                            )
+
+                if pending:
+                    await asyncio.wait(pending)
+            finally:
+                for task in pending:
+                    task.cancel()
+                # Even a failed ingest may have written some batches
+                self.data_versions.bump(table_name, appended=True)
 
             return {
-                "processed": total_processed,
-                "successful": total_successful,
-                "failed": total_failed,
-                "invalid_rows": total_invalid,
+                **totals,
+                "errors": batch_errors[:10],
                 "filename": filename
             }
 
         except Exception as e:
-            logger.error(f"Error processing and storing file: {str(e)}")
+            logger.error("Error processing and storing file: %s", e)
             raise IngestError(f"Error processing and storing file: {str(e)}")
 
     def _process_batch(
         self, 
-        batch_df: pd.DataFrame, 
+        batch_df: "pd.DataFrame", 
         table_name: str
     ) -> Tuple[List[object], List[Dict]]:
         """
@@ -154,7 +198,9 @@ class IngestService:
                     valid_records.append(Job(**validated_data))
             except ValueError as e:
                 invalid_records.append(row.to_dict())
-                logger.warning(f"Validation failed for row: {row.to_dict()}. Error: {str(e)}")
+                logger.warning(
+                    "Validation failed for row: %s. Error: %s", row.to_dict(), e
+                )
 
         return valid_records, invalid_records
 
@@ -178,7 +224,7 @@ class IngestService:
             )
             if not is_stored:
                 raise IngestError("Failed to store the file in Blob Storage.")
-            print(f"File stored in Blob Storage: {table_name}.csv")
+            logger.info("File stored in Blob Storage: %s.csv", table_name)
 
             # Reset the file pointer and process the file
             file_content.seek(0)
@@ -186,8 +232,10 @@ class IngestService:
 
             # Log invalid rows
             if invalid_rows:
-                print(
-                    f"Found {len(invalid_rows)} invalid rows while processing '{table_name}'"
+                logger.warning(
+                    "Found %s invalid rows while processing '%s'",
+                    len(invalid_rows),
+                    table_name,
                 )
 
             # Save valid records in the database
@@ -203,6 +251,7 @@ class IngestService:
                 save_results = await self.job_repository.save_batch(records)
                 successful = sum(1 for r in save_results if r)
                 failed = len(records) - successful
+            self.data_versions.bump(table_name, appended=True)
 
             return {
                 "processed": len(records) + len(invalid_rows),
@@ -211,7 +260,7 @@ class IngestService:
                 "invalid_rows": len(invalid_rows),
             }
         except Exception as e:
-            print(f"Error processing and storing file: {str(e)}")
+            logger.error("Error processing and storing file: %s", e)
             raise IngestError(f"Error processing and storing file: {str(e)}")
 
     async def ingest_employees_file(
@@ -228,10 +277,11 @@ class IngestService:
 
             # Log invalid rows
             if invalid_rows:
-                logger.warning(f"Invalid rows: {len(invalid_rows)}")
+                logger.warning("Invalid rows: %s", len(invalid_rows))
 
             # Store valid records
             results = await self.employee_repository.save_batch(employees)
+            self.data_versions.bump("employees", appended=True)
 
             return {
                 "processed": len(employees) + len(invalid_rows),
@@ -240,7 +290,7 @@ class IngestService:
                 "invalid_rows": len(invalid_rows),
             }
         except Exception as e:
-            logger.error(f"Error during ingestion: {str(e)}")
+            logger.error("Error during ingestion: %s", e)
             raise IngestError(f"Error during ingestion: {str(e)}")
 
     async def ingest_batch(self, batch_dto: BatchIngestDTO) -> dict:
@@ -258,6 +308,7 @@ class IngestService:
             ]
 
             results = await self.employee_repository.save_batch(employees)
+            self.data_versions.bump("employees", appended=True)
 
             return {
                 "processed": len(employees),
@@ -265,7 +316,7 @@ class IngestService:
                 "failed": sum(1 for r in results if not r),
             }
         except Exception as e:
-            logger.error(f"Error during batch ingestion: {str(e)}")
+            logger.error("Error during batch ingestion: %s", e)
             raise IngestError(f"Error during batch ingestion: {str(e)}")
 
     def _process_file(
@@ -287,6 +338,8 @@ class IngestService:
 
             required_columns = required_columns_by_table[table_name]
 
+            import pandas as pd
+
             # Leer el archivo CSV y asignar nombres de columnas si no existen
             df = pd.read_csv(
                 StringIO(file_content.read().decode("utf-8")),
@@ -317,14 +370,18 @@ class IngestService:
                         valid_rows.append(Job(**job_data))  # Si tienes una clase para trabajos
                 except ValueError as e:
                     invalid_rows.append(row.to_dict())
-                    print(f"Validation failed for row: {row.to_dict()}. Error: {str(e)}")
+                    logger.warning(
+                        "Validation failed for row: %s. Error: %s", row.to_dict(), e
+                    )
 
             return valid_rows, invalid_rows
         except Exception as e:
             raise ValueError(f"Error processing file: {str(e)}")
         
-    def _validate_employee_row(self, row: pd.Series) -> dict:
+    def _validate_employee_row(self, row: "pd.Series") -> dict:
         """Validate and convert an employee row."""
+        import pandas as pd
+
         if pd.isnull(row["id"]) or not isinstance(row["id"], (int, float)) or row["id"] <= 0:
             raise ValueError("Invalid or missing 'id'")
         if pd.isnull(row["name"]) or not isinstance(row["name"], str) or not row["name"].strip():
@@ -352,7 +409,9 @@ class IngestService:
         except ValueError:
             return False
 
-    def _validate_department_row(self, row: pd.Series) -> dict:
+    def _validate_department_row(self, row: "pd.Series") -> dict:
+        import pandas as pd
+
         if (
             pd.isnull(row["id"]) or not isinstance(row["id"], (int, float)) or row["id"] <= 0
         ):
@@ -369,7 +428,9 @@ class IngestService:
             "department": row["department"].strip(),
         }
 
-    def _validate_job_row(self, row: pd.Series) -> dict:
+    def _validate_job_row(self, row: "pd.Series") -> dict:
+        import pandas as pd
+
         if (
             pd.isnull(row["id"]) or not isinstance(row["id"], (int, float)) or row["id"] <= 0
         ):
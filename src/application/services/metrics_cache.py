@@ -0,0 +1,143 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+
+class DataVersions:
+    """
+    Version counter per table, bumped whenever an ingest or a restore may have
+    changed its rows. Cached results remember the versions they were computed
+    at and are stale as soon as one of them moves.
+
+    Ingests only add rows, so they bump with `appended=True`; consumers holding
+    a copy of a table can then fetch the new rows instead of reloading it. The
+    version of the last other change is kept as the table's reset version.
+    """
+
+    def __init__(self):
+        self._versions: Dict[str, int] = {}
+        self._resets: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def bump(self, *tables: str, appended: bool = False) -> None:
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+                if not appended:
+                    self._resets[table] = self._versions[table]
+
+    def get(self, tables: Iterable[str]) -> Tuple[int, ...]:
+        with self._lock:
+            return tuple(self._versions.get(table, 0) for table in tables)
+
+    def changes(self, table: str) -> Tuple[int, int]:
+        """Current version of the table and the version of its last reset."""
+        with self._lock:
+            return self._versions.get(table, 0), self._resets.get(table, 0)
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._versions)
+
+
+class MetricsCache:
+    """
+    Results of metrics queries keyed by endpoint and parameters, valid while
+    the versions of the tables they read are unchanged.
+
+    Concurrent requests for the same missing result share one computation
+    (single flight). Every result gets an ETag, a digest of its content computed
+    once when it is stored, so polling clients sending If-None-Match are
+    answered with a 304 and no response body.
+    """
+
+    def __init__(
+        self, data_versions: DataVersions, ttl: float = 300.0, max_entries: int = 256
+    ):
+        """
+        Args:
+            data_versions: Table versions bumped by ingests and restores
+            ttl: Seconds a result is served at most, bounding staleness when
+                another instance changed the data
+            max_entries: Results kept, least recently used evicted first
+        """
+        self.data_versions = data_versions
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, str, Any]]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0, "not_modified": 0}
+
+    def not_modified(self, if_none_match: Optional[str], etag: str) -> bool:
+        """Whether an If-None-Match header already names the current result."""
+        if not if_none_match:
+            return False
+        candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+        if "*" in candidates or etag in candidates or f"W/{etag}" in candidates:
+            self._stats["not_modified"] += 1
+            return True
+        return False
+
+    async def get_or_compute(
+        self, key: str, tables: Iterable[str], compute: Callable[[], Awaitable[Any]]
+    ) -> Tuple[str, Any]:
+        """
+        Return the ETag and the result for `key`, computing it at most once
+        for all concurrent callers.
+
+        Args:
+            key: Endpoint and parameters of the query
+            tables: Tables the query reads
+            compute: Coroutine function running the query
+        """
+        # Results computed before a table changed are never looked up again
+        versions = self.data_versions.get(tables)
+        entry_key = f"{key}|{'.'.join(str(version) for version in versions)}"
+        entry = self._entries.get(entry_key)
+        if entry is not None and time.monotonic() - entry[0] < self.ttl:
+            self._entries.move_to_end(entry_key)
+            self._stats["hits"] += 1
+            return entry[1], entry[2]
+
+        future = self._in_flight.get(entry_key)
+        if future is not None:
+            self._stats["coalesced"] += 1
+        else:
+            self._stats["misses"] += 1
+            # A task of its own, so a disconnecting client does not cancel the
+            # query for the others waiting on it
+            future = asyncio.ensure_future(compute())
+            self._in_flight[entry_key] = future
+            future.add_done_callback(lambda done: self._store(entry_key, done))
+        result = await asyncio.shield(future)
+        entry = self._entries.get(entry_key)
+        return (entry[1] if entry else self._etag(result)), result
+
+    def stats(self) -> Dict:
+        return {
+            **self._stats,
+            "entries": len(self._entries),
+            "in_flight": len(self._in_flight),
+            "ttl": self.ttl,
+            "data_versions": self.data_versions.snapshot(),
+        }
+
+    def _store(self, entry_key: str, future: asyncio.Future) -> None:
+        self._in_flight.pop(entry_key, None)
+        if future.cancelled() or future.exception() is not None:
+            return
+        result = future.result()
+        self._entries[entry_key] = (time.monotonic(), self._etag(result), result)
+        self._entries.move_to_end(entry_key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    @staticmethod
+    def _etag(result: Any) -> str:
+        content = json.dumps(result, sort_keys=True, default=str)
+        return f'"{hashlib.sha1(content.encode()).hexdigest()[:20]}"'
+
@@ -1,5 +1,8 @@
 from dataclasses import dataclass
 from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass
@@ -16,6 +19,6 @@ class Employee:
         if self.id <= 0:
             raise ValueError("Employee ID must be positive")
         if self.department_id <= 0:
-            print("Warning: Department ID is invalid, setting to default (-1).")
+            logger.warning("Department ID is invalid, setting to default (-1).")
         if self.job_id <= 0:
-            print("Warning: Job ID is invalid, setting to default (-1).")
+            logger.warning("Job ID is invalid, setting to default (-1).")
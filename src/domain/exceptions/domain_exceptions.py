@@ -43,3 +43,15 @@ class IngestError(Exception):
     """Custom exception for errors during ingestion."""
 
     pass
+
+
+class DatabaseTimeoutError(DomainException):
+    """Raised when a database operation exceeds its time budget"""
+
+    pass
+
+
+class DatabaseCancelledError(DomainException):
+    """Raised inside a database operation after it has been cancelled"""
+
+    pass
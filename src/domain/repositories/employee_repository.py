@@ -2,7 +2,7 @@ from src.domain.repositories.base_repository import BaseRepository
 from src.domain.entities.employee import Employee
 
 from abc import abstractmethod
-from typing import List
+from typing import AsyncIterator, List
 import datetime
 
 
@@ -23,3 +23,49 @@ class EmployeeRepository(BaseRepository[Employee]):
     ) -> List[Employee]:
         """Retrieve all employees hired within a specific date range."""
         pass
+
+    @abstractmethod
+    async def find_page_by_department(
+        self, department_id: int, after_id: int = 0, limit: int = 1000
+    ) -> List[Employee]:
+        """Retrieve up to `limit` employees of a department with id > `after_id`, ordered by id."""
+        pass
+
+    @abstractmethod
+    async def find_page_by_job(
+        self, job_id: int, after_id: int = 0, limit: int = 1000
+    ) -> List[Employee]:
+        """Retrieve up to `limit` employees with a job ID and id > `after_id`, ordered by id."""
+        pass
+
+    @abstractmethod
+    async def find_page_by_hire_date_range(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        after_id: int = 0,
+        limit: int = 1000,
+    ) -> List[Employee]:
+        """Retrieve up to `limit` employees hired in a date range with id > `after_id`, ordered by id."""
+        pass
+
+    @abstractmethod
+    def iter_by_department(
+        self, department_id: int, page_size: int = 1000
+    ) -> AsyncIterator[List[Employee]]:
+        """Iterate over the employees of a department, one page at a time."""
+        pass
+
+    @abstractmethod
+    def iter_by_job(
+        self, job_id: int, page_size: int = 1000
+    ) -> AsyncIterator[List[Employee]]:
+        """Iterate over the employees with a specific job ID, one page at a time."""
+        pass
+
+    @abstractmethod
+    def iter_by_hire_date_range(
+        self, start_date: datetime, end_date: datetime, page_size: int = 1000
+    ) -> AsyncIterator[List[Employee]]:
+        """Iterate over the employees hired within a date range, one page at a time."""
+        pass
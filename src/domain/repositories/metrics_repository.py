@@ -0,0 +1,32 @@
+import datetime
+from abc import ABC, abstractmethod
+from typing import Dict, List
+
+# Periods hires can be grouped by
+GRANULARITIES = ("month", "quarter", "week")
+
+
+class MetricsRepository(ABC):
+    @abstractmethod
+    async def hires_by_period(
+        self, start: datetime.date, end: datetime.date, granularity: str = "quarter"
+    ) -> List[Dict]:
+        """
+        Number of employees hired for each department and job per period, over
+        hire dates in [start, end) (keys: department, job, period, hires),
+        ordered by department, job and period. Periods are labelled 'YYYY-MM'
+        (month), 'YYYY-Qn' (quarter) or by the Monday the week starts on,
+        'YYYY-MM-DD' (week).
+        """
+        pass
+
+    @abstractmethod
+    async def departments_above_mean(
+        self, start: datetime.date, end: datetime.date
+    ) -> List[Dict]:
+        """
+        Departments that hired more employees than the mean of all departments
+        over hire dates in [start, end) (keys: id, department, hired), ordered by
+        hires descending.
+        """
+        pass
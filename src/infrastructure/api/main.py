@@ -1,8 +1,18 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from src.infrastructure.api.routes import employee_routes, backup_routes, metrics_routes
+from src.infrastructure.api.routes import (
+    employee_query_routes,
+    backup_routes,
+    metrics_routes,
+    system_routes,
+)
+from src.infrastructure.api.routes import ingest_routes
 from src.infrastructure.api.routes.ingest_routes import router as ingest_router
 from src.infrastructure.api.middleware.error_handler import error_handler
+from src.infrastructure.api.middleware.request_metrics import (
+    RequestMetricsMiddleware,
+    request_metrics,
+)
 import azure.functions as func
 from azure.functions import AsgiMiddleware
 from src.infrastructure.di.container import Container
@@ -24,13 +34,30 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Added last so it is the outermost middleware and times the others too
+app.add_middleware(RequestMetricsMiddleware, metrics=request_metrics)
 
 container = Container()
-container.wire(modules=[backup_routes])
+container.wire(
+    modules=[
+        ingest_routes,
+        backup_routes,
+        metrics_routes,
+        employee_query_routes,
+        system_routes,
+    ]
+)
 
 app.include_router(ingest_router, prefix="/api", tags=["Ingest"])
 app.include_router(backup_routes.router, prefix="/api", tags=["backup"])
 app.include_router(metrics_routes.router, prefix="/api", tags=["Metrics"])
+app.include_router(employee_query_routes.router, prefix="/api", tags=["Employees"])
+app.include_router(system_routes.router, prefix="/api", tags=["System"])
+
+# One adapter for the lifetime of the worker, not one per invocation
+asgi_middleware = AsgiMiddleware(app)
+
 
-def main(req: func.HttpRequest, context: func.Context) -> func.HttpResponse:
-    return AsgiMiddleware(app).handle(req, context)
+async def main(req: func.HttpRequest, context: func.Context) -> func.HttpResponse:
+    # Runs on the worker's event loop, instead of handle() starting a loop per call
+    return await asgi_middleware.handle_async(req, context)
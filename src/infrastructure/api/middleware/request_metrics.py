@@ -0,0 +1,187 @@
+import bisect
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+# Upper bounds (seconds) of the request latency histogram buckets; +Inf is implicit
+LATENCY_BUCKETS_SECONDS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+# Route label of requests no route matched (404s, CORS preflights), so paths
+# probed by clients cannot grow the number of series
+UNMATCHED_ROUTE = "unmatched"
+
+
+class _RouteStats:
+    __slots__ = ("buckets", "count", "seconds", "request_bytes", "response_bytes")
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS_SECONDS) + 1)
+        self.count = 0
+        self.seconds = 0.0
+        self.request_bytes = 0
+        self.response_bytes = 0
+
+
+class RequestMetrics:
+    """
+    Latency histogram, request and response bytes and status codes per route
+    template (e.g. /api/backup/{table_name}), and the requests in flight.
+
+    Only updated from the event loop, so recording takes no lock.
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.in_flight = 0
+        self._routes: Dict[Tuple[str, str], _RouteStats] = {}
+        self._statuses: Dict[Tuple[str, str, int], int] = {}
+
+    def record(
+        self,
+        method: str,
+        route: str,
+        status: int,
+        seconds: float,
+        request_bytes: int,
+        response_bytes: int,
+    ) -> None:
+        key = (method, route)
+        stats = self._routes.get(key)
+        if stats is None:
+            stats = self._routes[key] = _RouteStats()
+        stats.buckets[bisect.bisect_left(LATENCY_BUCKETS_SECONDS, seconds)] += 1
+        stats.count += 1
+        stats.seconds += seconds
+        stats.request_bytes += request_bytes
+        stats.response_bytes += response_bytes
+        status_key = (method, route, status)
+        self._statuses[status_key] = self._statuses.get(status_key, 0) + 1
+
+    def render_prometheus(self) -> str:
+        """The metrics in the Prometheus text exposition format (0.0.4)."""
+        lines: List[str] = [
+            "# HELP http_requests_total Requests answered, by route and status code.",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, route, status), count in sorted(self._statuses.items()):
+            labels = _labels(method=method, route=route, status=str(status))
+            lines.append(f"http_requests_total{{{labels}}} {count}")
+
+        lines += [
+            "# HELP http_request_duration_seconds Time from receiving a request to "
+            "sending the last byte of its response.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        routes = sorted(self._routes.items())
+        for (method, route), stats in routes:
+            labels = _labels(method=method, route=route)
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS_SECONDS, stats.buckets):
+                cumulative += count
+                lines.append(
+                    f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} '
+                    f"{cumulative}"
+                )
+            lines.append(
+                f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} '
+                f"{stats.count}"
+            )
+            lines.append(
+                f"http_request_duration_seconds_sum{{{labels}}} {stats.seconds}"
+            )
+            lines.append(
+                f"http_request_duration_seconds_count{{{labels}}} {stats.count}"
+            )
+
+        for name, attribute, description in (
+            ("http_request_size_bytes_total", "request_bytes", "Request body bytes received"),
+            ("http_response_size_bytes_total", "response_bytes", "Response body bytes sent"),
+        ):
+            lines += [
+                f"# HELP {name} {description}, by route.",
+                f"# TYPE {name} counter",
+            ]
+            for (method, route), stats in routes:
+                labels = _labels(method=method, route=route)
+                lines.append(f"{name}{{{labels}}} {getattr(stats, attribute)}")
+
+        lines += [
+            "# HELP http_requests_in_flight Requests being handled.",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.in_flight}",
+            "# HELP process_start_time_seconds Start of the process, in Unix time.",
+            "# TYPE process_start_time_seconds gauge",
+            f"process_start_time_seconds {self.started_at}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        self._routes.clear()
+        self._statuses.clear()
+
+
+def _labels(**labels: str) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware recording every HTTP request in a RequestMetrics.
+
+    A plain ASGI wrapper rather than an @app.middleware("http") function: it
+    does not buffer streamed responses and adds a few microseconds per request.
+    """
+
+    def __init__(self, app: Callable[..., Awaitable[None]], metrics: RequestMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope: Dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics = self.metrics
+        started = time.perf_counter()
+        # status, request bytes, response bytes, seconds until the last body chunk
+        state: List[Any] = [500, 0, 0, None]
+
+        async def counting_receive() -> Dict:
+            message = await receive()
+            if message["type"] == "http.request":
+                state[1] += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message: Dict) -> None:
+            if message["type"] == "http.response.start":
+                state[0] = message["status"]
+            elif message["type"] == "http.response.body":
+                state[2] += len(message.get("body", b""))
+                if not message.get("more_body", False):
+                    state[3] = time.perf_counter() - started
+            await send(message)
+
+        metrics.in_flight += 1
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            metrics.in_flight -= 1
+            # FastAPI puts the matched route in the scope shared with the router
+            route = scope.get("route")
+            metrics.record(
+                scope["method"],
+                getattr(route, "path", UNMATCHED_ROUTE),
+                state[0],
+                state[3] if state[3] is not None else time.perf_counter() - started,
+                state[1],
+                state[2],
+            )
+
+
+# Shared by the app's middleware and the metrics route
+request_metrics = RequestMetrics()
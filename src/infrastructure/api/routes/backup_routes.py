@@ -1,19 +1,99 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
 from src.application.services.backup_service import BackupService
 from src.infrastructure.di.container import Container
+from src.infrastructure.persistance.backup_format import CODECS, FORMATS
 from dependency_injector.wiring import Provide, inject
 
 router = APIRouter()
 
 
+class DatasetRestoreRequest(BaseModel):
+    # Tables without a backup id are restored from their latest backup (as of
+    # `as_of` when given)
+    departments: Optional[str] = None
+    jobs: Optional[str] = None
+    employees: Optional[str] = None
+    # Backup set created by POST /backup, for the tables without a backup id
+    backup_set: Optional[str] = None
+    as_of: Optional[datetime] = None
+    disable_constraints: bool = False
+
+
+def _validate_format(codec: Optional[str], file_format: Optional[str]) -> None:
+    if codec is not None and codec not in CODECS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported codec '{codec}', expected one of {sorted(CODECS)}",
+        )
+    if file_format is not None and file_format not in FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported format '{file_format}', expected one of {sorted(FORMATS)}",
+        )
+
+
+@router.post("/backup")
+@inject
+async def create_dataset_backup(
+    codec: Optional[str] = Query(
+        default=None, description="Compression: null, deflate, snappy or zstd"
+    ),
+    file_format: Optional[str] = Query(
+        default=None, alias="format", description="Backup file format: avro or parquet"
+    ),
+    backup_service: BackupService = Depends(Provide[Container.backup_service]),
+):
+    _validate_format(codec, file_format)
+    try:
+        result = await backup_service.create_dataset_backup(codec, file_format)
+        return {"status": "success", "details": result}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.post("/backup/{table_name}")
 @inject
 async def create_backup(
     table_name: str,
+    codec: Optional[str] = Query(
+        default=None, description="Compression: null, deflate, snappy or zstd"
+    ),
+    file_format: Optional[str] = Query(
+        default=None, alias="format", description="Backup file format: avro or parquet"
+    ),
+    incremental: bool = Query(
+        default=False, description="Only back up rows added since the last backup"
+    ),
+    partitions: Optional[int] = Query(
+        default=None,
+        ge=1,
+        le=64,
+        description="Id ranges read and written concurrently, one file each",
+    ),
     backup_service: BackupService = Depends(Provide[Container.backup_service]),
 ):
+    _validate_format(codec, file_format)
     try:
-        result = await backup_service.create_backup(table_name)
+        result = await backup_service.create_backup(
+            table_name, codec, incremental, partitions, file_format
+        )
+        return {"status": "success", "details": result}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/backup/{table_name}/compact")
+@inject
+async def compact_backups(
+    table_name: str,
+    backup_id: Optional[str] = None,
+    backup_service: BackupService = Depends(Provide[Container.backup_service]),
+):
+    try:
+        result = await backup_service.compact_backups(table_name, backup_id)
         return {"status": "success", "details": result}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -23,11 +103,54 @@ async def create_backup(
 @inject
 async def restore_backup(
     table_name: str,
-    backup_id: str,
+    backup_id: Optional[str] = Query(
+        default=None, description="Backup to restore; the latest when omitted"
+    ),
+    as_of: Optional[datetime] = Query(
+        default=None, description="Restore the latest backup taken at or before this time"
+    ),
+    shadow: bool = Query(
+        default=False,
+        description="Load into a shadow table and swap it in, keeping the table readable",
+    ),
     backup_service: BackupService = Depends(Provide[Container.backup_service]),
 ):
     try:
-        success = await backup_service.restore_backup(backup_id, table_name)
+        success = await backup_service.restore_backup(
+            backup_id, table_name, as_of, shadow
+        )
         return {"status": "success" if success else "failure"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/restore")
+@inject
+async def restore_dataset(
+    request: DatasetRestoreRequest,
+    backup_service: BackupService = Depends(Provide[Container.backup_service]),
+):
+    backup_ids = {
+        "departments": request.departments,
+        "jobs": request.jobs,
+        "employees": request.employees,
+    }
+    try:
+        result = await backup_service.restore_dataset(
+            backup_ids, request.disable_constraints, request.as_of, request.backup_set
+        )
+        return {"status": "success", "details": result}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/backups/{table_name}")
+@inject
+async def list_backups(
+    table_name: str,
+    backup_service: BackupService = Depends(Provide[Container.backup_service]),
+):
+    try:
+        return await backup_service.list_backups(table_name)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,144 @@
+import base64
+from datetime import datetime
+from typing import AsyncIterator, List, Optional
+
+from dependency_injector.wiring import Provide, inject
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from src.application.dto.employee_dto import EmployeeDTO
+from src.domain.entities.employee import Employee
+from src.domain.repositories.employee_repository import EmployeeRepository
+from src.infrastructure.di.container import Container
+
+
+class EmployeePageResponse(BaseModel):
+    items: List[EmployeeDTO]
+    next_cursor: Optional[str] = None
+
+
+router = APIRouter()
+
+
+def _encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode()
+
+
+def _decode_cursor(cursor: Optional[str]) -> int:
+    if not cursor:
+        return 0
+    try:
+        return int(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _to_dto(employee: Employee) -> EmployeeDTO:
+    return EmployeeDTO(
+        id=employee.id,
+        name=employee.name,
+        datetime=employee.datetime,
+        department_id=employee.department_id,
+        job_id=employee.job_id,
+    )
+
+
+def _validate_filters(
+    department_id: Optional[int],
+    job_id: Optional[int],
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+) -> None:
+    date_range = start_date is not None or end_date is not None
+    if date_range and (start_date is None or end_date is None):
+        raise HTTPException(
+            status_code=400, detail="start_date and end_date must be given together"
+        )
+    if sum([department_id is not None, job_id is not None, date_range]) != 1:
+        raise HTTPException(
+            status_code=400,
+            detail="Exactly one filter is required: department_id, job_id or start_date/end_date",
+        )
+
+
+@router.get("/employees", response_model=EmployeePageResponse)
+@inject
+async def list_employees(
+    department_id: Optional[int] = Query(default=None),
+    job_id: Optional[int] = Query(default=None),
+    start_date: Optional[datetime] = Query(default=None),
+    end_date: Optional[datetime] = Query(default=None),
+    cursor: Optional[str] = Query(default=None),
+    limit: int = Query(default=1000, gt=0, le=5000),
+    employee_repository: EmployeeRepository = Depends(
+        Provide[Container.employee_repository]
+    ),
+):
+    """
+    Get one page of employees filtered by department, job or hire date range.
+
+    Pages are ordered by id. Pass the returned `next_cursor` as `cursor` to get
+    the next page; it is null on the last page.
+    """
+    _validate_filters(department_id, job_id, start_date, end_date)
+    after_id = _decode_cursor(cursor)
+
+    try:
+        if department_id is not None:
+            page = await employee_repository.find_page_by_department(
+                department_id, after_id, limit
+            )
+        elif job_id is not None:
+            page = await employee_repository.find_page_by_job(job_id, after_id, limit)
+        else:
+            page = await employee_repository.find_page_by_hire_date_range(
+                start_date, end_date, after_id, limit
+            )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Error retrieving employees: {str(e)}"
+        )
+
+    return EmployeePageResponse(
+        items=[_to_dto(employee) for employee in page],
+        next_cursor=_encode_cursor(page[-1].id) if len(page) == limit else None,
+    )
+
+
+@router.get("/employees/stream")
+@inject
+async def stream_employees(
+    department_id: Optional[int] = Query(default=None),
+    job_id: Optional[int] = Query(default=None),
+    start_date: Optional[datetime] = Query(default=None),
+    end_date: Optional[datetime] = Query(default=None),
+    page_size: int = Query(default=1000, gt=0, le=5000),
+    employee_repository: EmployeeRepository = Depends(
+        Provide[Container.employee_repository]
+    ),
+):
+    """
+    Stream all employees matching the filter as NDJSON (one JSON object per line).
+
+    The server reads the result set page by page, so memory stays constant no
+    matter how many employees match.
+    """
+    _validate_filters(department_id, job_id, start_date, end_date)
+
+    if department_id is not None:
+        pages = employee_repository.iter_by_department(department_id, page_size)
+    elif job_id is not None:
+        pages = employee_repository.iter_by_job(job_id, page_size)
+    else:
+        pages = employee_repository.iter_by_hire_date_range(
+            start_date, end_date, page_size
+        )
+
+    async def ndjson() -> AsyncIterator[bytes]:
+        async for page in pages:
+            yield "".join(
+                _to_dto(employee).model_dump_json() + "\n" for employee in page
+            ).encode("utf-8")
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
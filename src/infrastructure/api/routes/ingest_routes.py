@@ -2,8 +2,12 @@ from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Query
 from fastapi.responses import JSONResponse
 from src.application.services.ingest_service import IngestService
 from src.infrastructure.di.container import Container
+from dependency_injector.wiring import Provide, inject
 from io import BytesIO
 from typing import Optional
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -12,11 +16,12 @@ router = APIRouter()
     summary="Process and ingest data from file in batches",
     response_model=None,
 )
+@inject
 async def ingest_data(
     table_name: str,
     file: UploadFile = File(...),
     batch_size: Optional[int] = Query(default=1000, gt=0, le=5000),
-    ingest_service: IngestService = Depends(lambda: Container.ingest_service()),
+    ingest_service: IngestService = Depends(Provide[Container.ingest_service]),
 ) -> dict:
     """
     Process and ingest data from CSV file in batches.
@@ -50,7 +55,7 @@ async def ingest_data(
         
     except Exception as e:
         # Log and return an error response
-        print(f"Error in batch ingestion: {str(e)}")
+        logger.error("Error in batch ingestion: %s", e)
         raise HTTPException(
             status_code=500, 
             detail=f"An error occurred while ingesting data: {str(e)}"
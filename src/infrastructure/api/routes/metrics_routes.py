@@ -1,8 +1,18 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import PlainTextResponse
+from typing import Any, Awaitable, Callable, Dict, List, Literal, Optional, Tuple
 from pydantic import BaseModel
-from src.infrastructure.db.connection import get_db_cursor
-from settings import AZURE_SQL_CONNECTION_STRING
+from dependency_injector.wiring import Provide, inject
+from src.application.services.metrics_cache import MetricsCache
+from src.domain.exceptions.domain_exceptions import DatabaseTimeoutError
+from src.domain.repositories.metrics_repository import MetricsRepository
+from src.infrastructure.api.middleware.request_metrics import RequestMetrics
+from src.infrastructure.azure.blob_transfer import BlobTransferEngine
+from src.infrastructure.db.instrumentation import QueryLog
+from src.infrastructure.db.write_governor import WriteGovernor
+from src.infrastructure.logging.log_sink import BatchingLogHandler
+from src.infrastructure.di.container import Container
 
 class QuarterlyHiresResponse(BaseModel):
     department: str
@@ -12,6 +22,12 @@ class QuarterlyHiresResponse(BaseModel):
     Q3: int
     Q4: int
 
+class HiresByPeriodResponse(BaseModel):
+    department: str
+    job: str
+    period: str
+    hires: int
+
 class DepartmentHiresResponse(BaseModel):
     id: int  # Cambiado de str a int
     department: str
@@ -19,104 +35,299 @@ class DepartmentHiresResponse(BaseModel):
 
 router = APIRouter()
 
+# Tables each metric reads, whose data versions invalidate its cached results
+HIRES_TABLES = ("employees", "departments", "jobs")
+DEPARTMENT_HIRES_TABLES = ("employees", "departments")
+
+
+def _cache_headers(etag: str) -> Dict[str, str]:
+    # Clients may keep the result but must revalidate it with If-None-Match
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+
+def _date_range(
+    year: Optional[int], start_date: Optional[date], end_date: Optional[date]
+) -> Tuple[date, date]:
+    """Half-open [start, end) range of hire dates from a year or two dates."""
+    if year is not None:
+        if start_date is not None or end_date is not None:
+            raise HTTPException(
+                status_code=400, detail="Pass either year or start_date and end_date"
+            )
+        return date(year, 1, 1), date(year + 1, 1, 1)
+    if start_date is None or end_date is None:
+        raise HTTPException(
+            status_code=400, detail="year or start_date and end_date are required"
+        )
+    if start_date >= end_date:
+        raise HTTPException(
+            status_code=400, detail="start_date must be before end_date"
+        )
+    return start_date, end_date
+
+
+def _pivot_quarters(rows: List[Dict]) -> List[QuarterlyHiresResponse]:
+    """Quarterly rows of a single year as one row per department and job."""
+    pivoted: Dict[Tuple[str, str], Dict] = {}
+    for row in rows:
+        pair = pivoted.setdefault(
+            (row["department"], row["job"]),
+            {
+                "department": row["department"],
+                "job": row["job"],
+                **dict.fromkeys(("Q1", "Q2", "Q3", "Q4"), 0),
+            },
+        )
+        pair[row["period"][-2:]] += row["hires"]
+    return [QuarterlyHiresResponse(**pair) for pair in pivoted.values()]
+
+
+async def _cached_metric(
+    request: Request,
+    response: Response,
+    metrics_cache: MetricsCache,
+    key: str,
+    tables: Tuple[str, ...],
+    compute: Callable[[], Awaitable[List[Dict]]],
+    to_response: Callable[[List[Dict]], Any],
+    description: str,
+):
+    """Serve a metric from the cache, answering If-None-Match with a 304."""
+    try:
+        etag, rows = await metrics_cache.get_or_compute(key, tables, compute)
+    except DatabaseTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Error retrieving {description}: {str(e)}"
+        )
+    if metrics_cache.not_modified(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=_cache_headers(etag))
+    response.headers.update(_cache_headers(etag))
+    return to_response(rows)
+
+
+@router.get("/metrics/hires", response_model=List[HiresByPeriodResponse])
+@inject
+async def get_hires(
+    request: Request,
+    response: Response,
+    year: Optional[int] = Query(default=None, ge=1900, le=9998),
+    start_date: Optional[date] = Query(default=None, description="First hire date included"),
+    end_date: Optional[date] = Query(default=None, description="First hire date excluded"),
+    granularity: Literal["month", "quarter", "week"] = "quarter",
+    metrics_repository: MetricsRepository = Depends(Provide[Container.metrics_repository]),
+    metrics_cache: MetricsCache = Depends(Provide[Container.metrics_cache]),
+):
+    """
+    Get the number of employees hired for each job and department per month,
+    quarter or week (labelled by its Monday), for a year or a [start_date,
+    end_date) range. Results are ordered by department, job and period.
+    """
+    start, end = _date_range(year, start_date, end_date)
+    return await _cached_metric(
+        request,
+        response,
+        metrics_cache,
+        f"hires:{start}:{end}:{granularity}",
+        HIRES_TABLES,
+        lambda: metrics_repository.hires_by_period(start, end, granularity),
+        lambda rows: [HiresByPeriodResponse(**row) for row in rows],
+        "hires by period",
+    )
+
+
+@router.get("/metrics/departments-above-mean", response_model=List[DepartmentHiresResponse])
+@inject
+async def get_departments_above_mean(
+    request: Request,
+    response: Response,
+    year: Optional[int] = Query(default=None, ge=1900, le=9998),
+    start_date: Optional[date] = Query(default=None, description="First hire date included"),
+    end_date: Optional[date] = Query(default=None, description="First hire date excluded"),
+    metrics_repository: MetricsRepository = Depends(Provide[Container.metrics_repository]),
+    metrics_cache: MetricsCache = Depends(Provide[Container.metrics_cache]),
+):
+    """
+    Get departments that hired more employees than the mean over a year or a
+    [start_date, end_date) range, ordered by number of employees hired (descending).
+    """
+    start, end = _date_range(year, start_date, end_date)
+    return await _cached_metric(
+        request,
+        response,
+        metrics_cache,
+        f"departments_above_mean:{start}:{end}",
+        DEPARTMENT_HIRES_TABLES,
+        lambda: metrics_repository.departments_above_mean(start, end),
+        lambda rows: [DepartmentHiresResponse(**row) for row in rows],
+        "departments above mean",
+    )
+
+
+# The 2021 endpoints are aliases of the parameterized ones, sharing their cache entries
+
 @router.get("/metrics/quarterly-hires-2021", response_model=List[QuarterlyHiresResponse])
-async def get_quarterly_hires_2021():
+@inject
+async def get_quarterly_hires_2021(
+    request: Request,
+    response: Response,
+    metrics_repository: MetricsRepository = Depends(Provide[Container.metrics_repository]),
+    metrics_cache: MetricsCache = Depends(Provide[Container.metrics_cache]),
+):
     """
     Get the number of employees hired for each job and department in 2021, divided by quarter.
     Results are ordered alphabetically by department and job.
     """
-    try:
-        with get_db_cursor() as cursor:
-            query = """
-            WITH QuarterlyHires AS (
-                SELECT 
-                    d.department,
-                    j.job,
-                    DATEPART(QUARTER, e.datetime) as quarter,
-                    COUNT(*) as hires
-                FROM employees e
-                JOIN departments d ON e.department_id = d.id
-                JOIN jobs j ON e.job_id = j.id
-                WHERE YEAR(e.datetime) = 2021
-                GROUP BY d.department, j.job, DATEPART(QUARTER, e.datetime)
-            )
-            SELECT 
-                department,
-                job,
-                SUM(CASE WHEN quarter = 1 THEN hires ELSE 0 END) as Q1,
-                SUM(CASE WHEN quarter = 2 THEN hires ELSE 0 END) as Q2,
-                SUM(CASE WHEN quarter = 3 THEN hires ELSE 0 END) as Q3,
-                SUM(CASE WHEN quarter = 4 THEN hires ELSE 0 END) as Q4
-            FROM QuarterlyHires
-            GROUP BY department, job
-            ORDER BY department, job;
-            """
-            
-            cursor.execute(query)
-            rows = cursor.fetchall()
-            
-            return [
-                QuarterlyHiresResponse(
-                    department=row.department,
-                    job=row.job,
-                    Q1=row.Q1,
-                    Q2=row.Q2,
-                    Q3=row.Q3,
-                    Q4=row.Q4
-                ) for row in rows
-            ]
-            
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error retrieving quarterly hires data: {str(e)}"
-        )
+    start, end = _date_range(2021, None, None)
+    return await _cached_metric(
+        request,
+        response,
+        metrics_cache,
+        f"hires:{start}:{end}:quarter",
+        HIRES_TABLES,
+        lambda: metrics_repository.hires_by_period(start, end, "quarter"),
+        _pivot_quarters,
+        "quarterly hires data",
+    )
+
 
 @router.get("/metrics/departments-above-mean-2021", response_model=List[DepartmentHiresResponse])
-async def get_departments_above_mean_2021():
+@inject
+async def get_departments_above_mean_2021(
+    request: Request,
+    response: Response,
+    metrics_repository: MetricsRepository = Depends(Provide[Container.metrics_repository]),
+    metrics_cache: MetricsCache = Depends(Provide[Container.metrics_cache]),
+):
     """
     Get departments that hired more employees than the mean in 2021,
     ordered by number of employees hired (descending).
     """
-    try:
-        with get_db_cursor() as cursor:
-            query = """
-            WITH DepartmentHires AS (
-                SELECT 
-                    d.id,
-                    d.department,
-                    COUNT(*) as hired_count
-                FROM employees e
-                JOIN departments d ON e.department_id = d.id
-                WHERE YEAR(e.datetime) = 2021
-                GROUP BY d.id, d.department
-            ),
-            HiresMean AS (
-                SELECT AVG(CAST(hired_count AS FLOAT)) as mean_hires
-                FROM DepartmentHires
-            )
-            SELECT 
-                id,
-                department,
-                hired_count as hired
-            FROM DepartmentHires, HiresMean
-            WHERE hired_count > mean_hires
-            ORDER BY hired_count DESC;
-            """
-            
-            cursor.execute(query)
-            rows = cursor.fetchall()
-            
-            return [
-                DepartmentHiresResponse(
-                    id=row.id,
-                    department=row.department,
-                    hired=row.hired
-                ) for row in rows
-            ]
-            
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error retrieving departments above mean: {str(e)}"
-        )
\ No newline at end of file
+    start, end = _date_range(2021, None, None)
+    return await _cached_metric(
+        request,
+        response,
+        metrics_cache,
+        f"departments_above_mean:{start}:{end}",
+        DEPARTMENT_HIRES_TABLES,
+        lambda: metrics_repository.departments_above_mean(start, end),
+        lambda rows: [DepartmentHiresResponse(**row) for row in rows],
+        "departments above mean",
+    )
+
+
+@router.get("/metrics/write-governor")
+@inject
+async def get_write_governor_state(
+    write_governor: WriteGovernor = Depends(Provide[Container.write_governor]),
+):
+    """
+    Get the state of the batch write governor: current concurrency limit,
+    writes in flight and retry/throttling counters.
+    """
+    return write_governor.snapshot()
+
+
+@router.get("/metrics/logging")
+@inject
+async def get_logging_state(
+    log_sink: BatchingLogHandler = Depends(Provide[Container.log_sink]),
+):
+    """
+    Get the log sink counters: records written, dropped because the queue was
+    full and suppressed by rate limiting, batches and queued records.
+    """
+    return log_sink.stats()
+
+
+@router.get("/metrics/cache")
+@inject
+async def get_metrics_cache_state(
+    metrics_cache: MetricsCache = Depends(Provide[Container.metrics_cache]),
+):
+    """
+    Get the metrics cache counters (hits, misses, coalesced requests, 304s)
+    and the current data version of each table.
+    """
+    return metrics_cache.stats()
+
+
+@router.get("/metrics/queries")
+@inject
+async def get_query_stats(
+    limit: int = Query(50, ge=1, le=500),
+    query_log: QueryLog = Depends(Provide[Container.query_log]),
+):
+    """
+    Get the SQL statements run by this process, grouped by fingerprint, with
+    their count, rows, errors, latency percentiles and histogram and the code
+    running them; most total time first.
+    """
+    return {
+        "slow_threshold_ms": query_log.slow_threshold_ms,
+        "statements": query_log.statements(limit),
+    }
+
+
+@router.get("/metrics/slow-queries")
+@inject
+async def get_slow_queries(
+    query_log: QueryLog = Depends(Provide[Container.query_log]),
+):
+    """
+    Get the most recent SQL executions slower than DB_SLOW_QUERY_MS, newest
+    first, with their duration, rows, caller and database operation.
+    """
+    return {
+        "slow_threshold_ms": query_log.slow_threshold_ms,
+        "queries": query_log.slow_queries(),
+    }
+
+
+@router.get("/metrics/system", response_class=PlainTextResponse)
+@inject
+async def get_system_metrics(
+    request_metrics: RequestMetrics = Depends(Provide[Container.request_metrics]),
+):
+    """
+    Get per-route request latency histograms, status codes, request and
+    response bytes and the requests in flight, in the Prometheus text format.
+    Answered from memory, without touching the database.
+    """
+    return PlainTextResponse(
+        request_metrics.render_prometheus(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+@router.get("/metrics/engine")
+@inject
+async def get_metrics_engine_state(
+    metrics_repository: MetricsRepository = Depends(
+        Provide[Container.metrics_repository]
+    ),
+):
+    """
+    Get the engine answering the metrics and, for the NumPy engine, the rows,
+    memory and data versions of its in-process copy.
+    """
+    stats = getattr(metrics_repository, "stats", None)
+    return stats() if stats else {"engine": "sql"}
+
+
+@router.get("/metrics/blob-transfers")
+@inject
+async def get_blob_transfers(
+    transfer_engine: BlobTransferEngine = Depends(
+        Provide[Container.blob_transfer_engine]
+    ),
+):
+    """
+    Get the most recent blob uploads and downloads with their throughput.
+    """
+    return {
+        "block_size": transfer_engine.block_size,
+        "max_concurrency": transfer_engine.max_concurrency,
+        "transfers": transfer_engine.recent_transfers(),
+    }
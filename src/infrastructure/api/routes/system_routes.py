@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
+from dependency_injector.wiring import Provide, inject
+from src.infrastructure.di.container import Container
+from src.infrastructure.di.warmup import warm_up
+
+router = APIRouter()
+
+
+@router.post("/warmup")
+@inject
+async def warmup(container: Container = Depends(Provide[Container.__self__])):
+    """
+    Fetch the secrets, build the services and open the connections deferred by
+    LAZY_INIT, so the first real request does not pay for them. Meant for the
+    warm-up trigger or a readiness probe of a new instance; answers 503 when a
+    step failed.
+    """
+    result = await warm_up(container)
+    return JSONResponse(result, status_code=200 if result["status"] == "ok" else 503)
@@ -0,0 +1,130 @@
+"""
+Cold start profile of the Functions entry point. Every run starts a fresh
+interpreter, as a new Functions worker does:
+
+    python -m src.infrastructure.api.startup_profile --runs 5 --top 25
+
+Reports the modules taking longest to import (from `python -X importtime`) and
+the time from process start to the first response of `main()`, split into the
+import of the app and the first and second invocations.
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+ENTRY_POINT = "src.infrastructure.api.main"
+
+_IMPORT_TIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| *(\S+)")
+
+# Runs in the child interpreter; prints the wall clock times of its milestones
+_PROBE = """
+import asyncio, json, sys, time
+import azure.functions as func
+from {entry_point} import main
+
+async def invoke():
+    request = func.HttpRequest("GET", "http://localhost" + sys.argv[1], headers={{}}, body=b"")
+    response = await main(request, None)
+    return response.status_code
+
+imported = time.time()
+loop = asyncio.new_event_loop()
+status = loop.run_until_complete(invoke())
+first = time.time()
+loop.run_until_complete(invoke())
+second = time.time()
+print(json.dumps({{"imported": imported, "first": first, "second": second, "status": status}}))
+"""
+
+
+def _run(args: List[str]) -> subprocess.CompletedProcess:
+    root = os.path.dirname(
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    )
+    result = subprocess.run(
+        [sys.executable, *args], cwd=root, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        lines = [
+            line
+            for line in result.stderr.splitlines()
+            if not line.startswith("import time:")
+        ]
+        raise RuntimeError("Entry point failed to start:\n" + "\n".join(lines[-20:]))
+    return result
+
+
+def import_times() -> List[Dict]:
+    """Self and cumulative import time (ms) of every module the entry point loads."""
+    result = _run(["-X", "importtime", "-c", f"import {ENTRY_POINT}"])
+    modules = []
+    for line in result.stderr.splitlines():
+        match = _IMPORT_TIME.match(line)
+        if match:
+            modules.append(
+                {
+                    "module": match.group(3),
+                    "self_ms": int(match.group(1)) / 1000,
+                    "cumulative_ms": int(match.group(2)) / 1000,
+                }
+            )
+    return modules
+
+
+def first_response(path: str) -> Dict:
+    """Milliseconds from process start to the import, first and second response."""
+    started = time.time()
+    result = _run(["-c", _PROBE.format(entry_point=ENTRY_POINT), path])
+    # The app's JSON log lines share stdout with the probe's
+    times = next(
+        json.loads(line)
+        for line in reversed(result.stdout.splitlines())
+        if line.startswith('{"imported"')
+    )
+    return {
+        "status": times["status"],
+        "import_ms": (times["imported"] - started) * 1000,
+        "first_response_ms": (times["first"] - started) * 1000,
+        "second_response_ms": (times["second"] - times["first"]) * 1000,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5, help="cold starts to time")
+    parser.add_argument("--top", type=int, default=25, help="modules to list")
+    parser.add_argument(
+        "--path", default="/api/metrics/cache", help="route of the timed requests"
+    )
+    options = parser.parse_args()
+
+    modules = import_times()
+    entry = next(module for module in modules if module["module"] == ENTRY_POINT)
+    print(f"import {ENTRY_POINT}: {entry['cumulative_ms']:.1f} ms")
+    print(f"{'self ms':>9} {'cumul ms':>9}  module")
+    for module in sorted(modules, key=lambda module: -module["self_ms"])[
+        : options.top
+    ]:
+        print(
+            f"{module['self_ms']:9.1f} {module['cumulative_ms']:9.1f}  "
+            f"{module['module']}"
+        )
+
+    runs = [first_response(options.path) for _ in range(options.runs)]
+    print(
+        f"\nGET {options.path} (status {runs[0]['status']}), "
+        f"{options.runs} cold starts"
+    )
+    for key in ("import_ms", "first_response_ms", "second_response_ms"):
+        values = [run[key] for run in runs]
+        print(
+            f"{key:>20}: median {statistics.median(values):8.1f}"
+            f"  min {min(values):8.1f}  max {max(values):8.1f}"
+        )
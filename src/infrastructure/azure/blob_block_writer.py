@@ -0,0 +1,161 @@
+import hashlib
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Set
+
+
+class BlobBlockWriter:
+    """
+    Write-only file object that uploads to a block blob as it is written.
+
+    Data is buffered until `block_size` bytes are available and then staged as
+    an uncommitted block; `close()` stages the remainder and commits the block
+    list, which makes the blob visible atomically. With `max_concurrency` > 1
+    blocks are staged on background threads while the caller keeps writing.
+    Memory use is bounded by `block_size * (max_concurrency + 1)` no matter how
+    much is written, and nothing touches local disk.
+
+    If the writer is never closed (e.g. the producer failed), the blob is not
+    created or replaced; Azure discards uncommitted blocks after seven days.
+    """
+
+    # Azure allows at most 50,000 committed blocks per blob
+    MAX_BLOCKS = 50000
+
+    def __init__(
+        self,
+        blob_client: Any,
+        block_size: int = 4 * 1024 * 1024,
+        max_concurrency: int = 1,
+        on_commit: Optional[Callable[["BlobBlockWriter"], None]] = None,
+    ):
+        """
+        Args:
+            blob_client: BlobClient of the destination blob
+            block_size: Bytes buffered before a block is staged
+            max_concurrency: Blocks staged in parallel
+            on_commit: Called with the writer once the block list is committed
+        """
+        self.blob_client = blob_client
+        self.block_size = block_size
+        self.max_concurrency = max(1, max_concurrency)
+        self.on_commit = on_commit
+        self._buffer = bytearray()
+        self._block_ids: List[str] = []
+        # Unique per writer so concurrent uploads to the same name cannot mix blocks
+        self._block_prefix = uuid.uuid4().hex
+        self._position = 0
+        self._md5 = hashlib.md5()
+        self._closed = False
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pending: Set[Future] = set()
+        self.started_at = time.monotonic()
+        self.committed_at: Optional[float] = None
+        # Blob metadata set on commit; may be filled in while writing
+        self.metadata: Dict[str, str] = {}
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def blocks_staged(self) -> int:
+        return len(self._block_ids)
+
+    @property
+    def content_md5(self) -> str:
+        """Hex MD5 of everything written so far."""
+        return self._md5.hexdigest()
+
+    def write(self, data: bytes) -> int:
+        if self._closed:
+            raise ValueError("write to closed BlobBlockWriter")
+        self._md5.update(data)
+        self._buffer += data
+        self._position += len(data)
+        while len(self._buffer) >= self.block_size:
+            self._stage(bytes(self._buffer[: self.block_size]))
+            del self._buffer[: self.block_size]
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        # Blocks are staged by size only; staging on every flush would create
+        # many tiny blocks and exhaust the per-blob block limit
+        pass
+
+    def close(self) -> None:
+        """Stage the buffered data and commit all blocks to the blob."""
+        if self._closed:
+            return
+        try:
+            if self._buffer or not self._block_ids:
+                self._stage(bytes(self._buffer))
+                self._buffer.clear()
+            self._wait_pending(0)
+            self.blob_client.commit_block_list(
+                self._block_ids, metadata=self.metadata or None
+            )
+        except Exception:
+            self.abort()
+            raise
+        self._closed = True
+        self._shutdown_pool()
+        self.committed_at = time.monotonic()
+        if self.on_commit:
+            self.on_commit(self)
+
+    def abort(self) -> None:
+        """Drop buffered data without committing anything."""
+        self._buffer.clear()
+        self._closed = True
+        for future in self._pending:
+            future.cancel()
+        self._pending.clear()
+        self._shutdown_pool()
+
+    def _stage(self, data: bytes) -> None:
+        if len(self._block_ids) >= self.MAX_BLOCKS:
+            raise ValueError(
+                f"Blob exceeds {self.MAX_BLOCKS} blocks; increase the block size"
+            )
+        # Block ids must have equal length within a blob; the SDK base64-encodes them
+        block_id = f"{self._block_prefix}-{len(self._block_ids):06d}"
+        self._block_ids.append(block_id)
+        if self.max_concurrency == 1:
+            self.blob_client.stage_block(block_id=block_id, data=data)
+            return
+
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.max_concurrency, thread_name_prefix="blob-upload"
+            )
+        # Back-pressure: never hold more than `max_concurrency` blocks in flight
+        self._wait_pending(self.max_concurrency - 1)
+        self._pending.add(
+            self._pool.submit(self.blob_client.stage_block, block_id=block_id, data=data)
+        )
+
+    def _wait_pending(self, max_pending: int) -> None:
+        while len(self._pending) > max_pending:
+            done, self._pending = wait(self._pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                # Re-raise the first failed upload in the writer's thread
+                future.result()
+
+    def _shutdown_pool(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
@@ -1,6 +1,9 @@
 from src.application.interfaces.storage_service import StorageService
 from azure.storage.blob import BlobServiceClient
 from typing import BinaryIO
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 class AzureBlobStorageService(StorageService):
@@ -34,12 +37,14 @@ class AzureBlobStorageService(StorageService):
             blob_client = container_client.get_blob_client(filename)
             file_content.seek(0)
             blob_client.upload_blob(file_content, overwrite=True)
-            print(
-                f"[INFO] File '{filename}' successfully stored in container '{self.container_name}'."
+            logger.info(
+                "File '%s' successfully stored in container '%s'.",
+                filename,
+                self.container_name,
             )
             return True
         except Exception as e:
-            print(f"[ERROR] Error storing file '{filename}': {str(e)}")
+            logger.error("Error storing file '%s': %s", filename, e)
             return False
 
     async def retrieve_file(self, filename: str) -> BinaryIO:
@@ -49,5 +54,5 @@ class AzureBlobStorageService(StorageService):
             )
             return blob_client.download_blob().readall()
         except Exception as e:
-            print(f"Error retrieving file: {str(e)}")
+            logger.error("Error retrieving file: %s", e)
             raise
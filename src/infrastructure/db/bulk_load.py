@@ -0,0 +1,218 @@
+import re
+from typing import Any, Dict, List
+
+
+class AzureSQLBulkLoad:
+    """
+    Azure SQL statements to speed up a full reload of a table: nonclustered
+    indexes are disabled and foreign keys stop being checked during the load,
+    then the indexes are rebuilt and the foreign keys re-validated.
+    """
+
+    def disable(self, cursor: Any, table_name: str) -> List[str]:
+        """Disable nonclustered indexes and FK checks; returns the indexes disabled."""
+        cursor.execute(
+            "SELECT name FROM sys.indexes "
+            "WHERE object_id = OBJECT_ID(?) AND type_desc = 'NONCLUSTERED' "
+            "AND is_disabled = 0",
+            table_name,
+        )
+        indexes = [row[0] for row in cursor.fetchall()]
+        for index in indexes:
+            cursor.execute(f"ALTER INDEX [{index}] ON {table_name} DISABLE")
+        cursor.execute(f"ALTER TABLE {table_name} NOCHECK CONSTRAINT ALL")
+        return indexes
+
+    def enable(self, cursor: Any, table_name: str) -> List[str]:
+        """
+        Rebuild the disabled indexes and re-enable the foreign keys WITH CHECK,
+        which validates every row; returns the indexes rebuilt.
+
+        Raises:
+            The database error when a row violates a foreign key
+        """
+        cursor.execute(
+            "SELECT name FROM sys.indexes "
+            "WHERE object_id = OBJECT_ID(?) AND is_disabled = 1",
+            table_name,
+        )
+        indexes = [row[0] for row in cursor.fetchall()]
+        for index in indexes:
+            cursor.execute(f"ALTER INDEX [{index}] ON {table_name} REBUILD")
+        cursor.execute(f"ALTER TABLE {table_name} WITH CHECK CHECK CONSTRAINT ALL")
+        return indexes
+
+    # Shadow restores: rows are loaded into `<table>__shadow`, then swapped in
+    # with ALTER TABLE ... SWITCH, which only moves metadata. SWITCH needs an
+    # empty target with the same indexes and constraints, so the live rows are
+    # first switched out into `<table>__old`.
+
+    def create_shadow(self, cursor: Any, table_name: str) -> str:
+        """Create an empty copy of the table with its primary key; returns its name."""
+        shadow = f"{table_name}__shadow"
+        self.drop_shadow(cursor, table_name)
+        self._create_copy(cursor, table_name, shadow)
+        return shadow
+
+    def finish_shadow(self, cursor: Any, table_name: str) -> None:
+        """
+        Build the nonclustered indexes and foreign keys (WITH CHECK, so every
+        row is validated) on the loaded shadow, and prepare the switch-out table.
+        """
+        self._create_copy(cursor, table_name, f"{table_name}__old")
+        for target in (f"{table_name}__shadow", f"{table_name}__old"):
+            for name, unique, keys, included, condition in self._nonclustered_indexes(
+                cursor, table_name
+            ):
+                # SWITCH needs identical indexes, included columns and filter too
+                statement = (
+                    f"CREATE {'UNIQUE ' if unique else ''}INDEX [{name}] "
+                    f"ON {target} ({keys})"
+                )
+                if included:
+                    statement += f" INCLUDE ({included})"
+                if condition:
+                    statement += f" WHERE {condition}"
+                cursor.execute(statement)
+            for name, column, referenced, referenced_column in self._foreign_keys(
+                cursor, table_name
+            ):
+                cursor.execute(
+                    f"ALTER TABLE {target} WITH CHECK ADD CONSTRAINT "
+                    f"[{name}__{target}] FOREIGN KEY ({column}) "
+                    f"REFERENCES {referenced} ({referenced_column})"
+                )
+
+    def swap(self, cursor: Any, table_name: str) -> None:
+        """Swap the shadow in; run inside the caller's transaction."""
+        cursor.execute(f"ALTER TABLE {table_name} SWITCH TO {table_name}__old")
+        cursor.execute(f"ALTER TABLE {table_name}__shadow SWITCH TO {table_name}")
+
+    def drop_shadow(self, cursor: Any, table_name: str) -> None:
+        cursor.execute(f"DROP TABLE IF EXISTS {table_name}__shadow")
+        cursor.execute(f"DROP TABLE IF EXISTS {table_name}__old")
+
+    def _create_copy(self, cursor: Any, table_name: str, target: str) -> None:
+        cursor.execute(
+            "SELECT c.name FROM sys.indexes i "
+            "JOIN sys.index_columns ic ON ic.object_id = i.object_id "
+            "AND ic.index_id = i.index_id "
+            "JOIN sys.columns c ON c.object_id = ic.object_id "
+            "AND c.column_id = ic.column_id "
+            "WHERE i.object_id = OBJECT_ID(?) AND i.is_primary_key = 1 "
+            "ORDER BY ic.key_ordinal",
+            table_name,
+        )
+        key = ", ".join(row[0] for row in cursor.fetchall())
+        cursor.execute(f"SELECT TOP 0 * INTO {target} FROM {table_name}")
+        cursor.execute(
+            f"ALTER TABLE {target} ADD CONSTRAINT [PK_{target}] "
+            f"PRIMARY KEY CLUSTERED ({key})"
+        )
+
+    def _nonclustered_indexes(self, cursor: Any, table_name: str) -> List[tuple]:
+        """Name, uniqueness, key columns, included columns and filter of each index."""
+        cursor.execute(
+            "SELECT i.name, i.is_unique, "
+            "STRING_AGG(CASE WHEN ic.is_included_column = 0 THEN c.name END, ', ') "
+            "WITHIN GROUP (ORDER BY ic.key_ordinal), "
+            "STRING_AGG(CASE WHEN ic.is_included_column = 1 THEN c.name END, ', ') "
+            "WITHIN GROUP (ORDER BY ic.index_column_id), "
+            "i.filter_definition "
+            "FROM sys.indexes i "
+            "JOIN sys.index_columns ic ON ic.object_id = i.object_id "
+            "AND ic.index_id = i.index_id "
+            "JOIN sys.columns c ON c.object_id = ic.object_id "
+            "AND c.column_id = ic.column_id "
+            "WHERE i.object_id = OBJECT_ID(?) AND i.type_desc = 'NONCLUSTERED' "
+            "AND i.is_primary_key = 0 "
+            "GROUP BY i.name, i.is_unique, i.filter_definition",
+            table_name,
+        )
+        return [tuple(row) for row in cursor.fetchall()]
+
+    def _foreign_keys(self, cursor: Any, table_name: str) -> List[tuple]:
+        cursor.execute(
+            "SELECT fk.name, COL_NAME(fkc.parent_object_id, fkc.parent_column_id), "
+            "OBJECT_NAME(fk.referenced_object_id), "
+            "COL_NAME(fkc.referenced_object_id, fkc.referenced_column_id) "
+            "FROM sys.foreign_keys fk "
+            "JOIN sys.foreign_key_columns fkc "
+            "ON fkc.constraint_object_id = fk.object_id "
+            "WHERE fk.parent_object_id = OBJECT_ID(?)",
+            table_name,
+        )
+        return [tuple(row) for row in cursor.fetchall()]
+
+
+class SQLiteBulkLoad:
+    """
+    SQLite equivalent: indexes cannot be disabled, so they are dropped and
+    recreated from their stored definition. Foreign keys are not enforced
+    (PRAGMA foreign_keys is off), so they are checked with foreign_key_check.
+
+    SQLite cannot rename indexes, so a shadow table cannot take over the live
+    table's index names; the swap instead copies the staged rows into the live
+    table in one transaction. WAL readers keep seeing the previous snapshot
+    until it commits.
+    """
+
+    def __init__(self):
+        self._dropped: Dict[str, List[str]] = {}
+
+    def disable(self, cursor: Any, table_name: str) -> List[str]:
+        cursor.execute(
+            "SELECT name, sql FROM sqlite_master "
+            "WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+            (table_name,),
+        )
+        indexes = cursor.fetchall()
+        for name, _ in indexes:
+            cursor.execute(f"DROP INDEX {name}")
+        self._dropped.setdefault(table_name, []).extend(sql for _, sql in indexes)
+        return [name for name, _ in indexes]
+
+    def enable(self, cursor: Any, table_name: str) -> List[str]:
+        statements = self._dropped.pop(table_name, [])
+        for statement in statements:
+            cursor.execute(statement)
+        cursor.execute(f"PRAGMA foreign_key_check({table_name})")
+        violations = cursor.fetchall()
+        if violations:
+            raise ValueError(
+                f"{len(violations)} rows in {table_name} violate a foreign key"
+            )
+        return statements
+
+    def create_shadow(self, cursor: Any, table_name: str) -> str:
+        shadow = f"{table_name}__shadow"
+        self.drop_shadow(cursor, table_name)
+        cursor.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (table_name,),
+        )
+        definition = cursor.fetchone()[0]
+        cursor.execute(
+            re.sub(
+                rf"^CREATE TABLE (IF NOT EXISTS )?\"?{table_name}\"?",
+                f"CREATE TABLE {shadow}",
+                definition,
+                flags=re.IGNORECASE,
+            )
+        )
+        return shadow
+
+    def finish_shadow(self, cursor: Any, table_name: str) -> None:
+        cursor.execute(f"PRAGMA foreign_key_check({table_name}__shadow)")
+        violations = cursor.fetchall()
+        if violations:
+            raise ValueError(
+                f"{len(violations)} restored rows of {table_name} violate a foreign key"
+            )
+
+    def swap(self, cursor: Any, table_name: str) -> None:
+        cursor.execute(f"DELETE FROM {table_name}")
+        cursor.execute(f"INSERT INTO {table_name} SELECT * FROM {table_name}__shadow")
+
+    def drop_shadow(self, cursor: Any, table_name: str) -> None:
+        cursor.execute(f"DROP TABLE IF EXISTS {table_name}__shadow")
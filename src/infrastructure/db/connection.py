@@ -1,16 +1,29 @@
-import pyodbc
 from contextlib import contextmanager
-from settings import AZURE_SQL_CONNECTION_STRING
+from settings import get_secret
+from src.infrastructure.db.instrumentation import instrument
+
+
+def connect(connection_string: str):
+    """
+    Open a pyodbc connection whose statements are timed by the SQL
+    instrumentation. Use it instead of pyodbc.connect.
+    """
+    # Imported on first use: the ODBC driver manager is only needed with Azure SQL
+    import pyodbc
+
+    return instrument(pyodbc.connect(connection_string))
+
 
 def get_db_connection():
     """
     Creates and returns a new database connection using the connection string from settings.
     """
-    if not AZURE_SQL_CONNECTION_STRING:
+    connection_string = get_secret("AZURE_SQL_CONNECTION_STRING")
+    if not connection_string:
         raise ValueError("Database connection string is not available in settings.")
 
     try:
-        conn = pyodbc.connect(AZURE_SQL_CONNECTION_STRING)
+        conn = connect(connection_string)
         return conn
     except Exception as e:
         raise ConnectionError(f"Failed to connect to the database: {str(e)}")
@@ -0,0 +1,15 @@
+import datetime
+
+
+def to_sql_datetime(value):
+    """Convert ISO 8601 strings (as read from the CSV files) to naive UTC datetimes."""
+    if isinstance(value, str):
+        try:
+            parsed = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            # Let the database report the row as invalid
+            return value
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        return parsed
+    return value
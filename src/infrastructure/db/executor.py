@@ -0,0 +1,127 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional
+
+from src.domain.exceptions.domain_exceptions import (
+    DatabaseCancelledError,
+    DatabaseTimeoutError,
+)
+from src.infrastructure.db import instrumentation
+
+
+class OperationHandle:
+    """
+    Handle passed to every blocking database operation run by the executor.
+
+    The operation registers the cursors it opens with `track` so that, when the
+    awaiting coroutine times out or is cancelled, the running statement can be
+    aborted on the server with `cursor.cancel()` instead of holding a worker
+    thread until it completes.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._cursors: List[Any] = []
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def track(self, cursor: Any) -> Any:
+        """Register a cursor so it can be cancelled, and return it."""
+        with self._lock:
+            if self._cancelled.is_set():
+                raise DatabaseCancelledError(f"Operation '{self.name}' was cancelled")
+            self._cursors.append(cursor)
+        return cursor
+
+    def check(self) -> None:
+        """Raise if the operation was cancelled; call it between statements."""
+        if self._cancelled.is_set():
+            raise DatabaseCancelledError(f"Operation '{self.name}' was cancelled")
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+        with self._lock:
+            cursors = list(self._cursors)
+        for cursor in cursors:
+            try:
+                cursor.cancel()
+            except Exception:
+                # The statement may already be finished or the cursor closed
+                pass
+
+
+def _run(handle: OperationHandle, func: Callable[..., Any], args: tuple, kwargs: dict):
+    # Statements run by the operation are logged under its name
+    with instrumentation.operation(handle.name):
+        return func(handle, *args, **kwargs)
+
+
+class DatabaseExecutor:
+    """
+    Runs blocking database work (pyodbc calls) on a bounded, dedicated thread
+    pool so that it never stalls the event loop serving the API.
+
+    Every call gets a timeout; when it expires, or when the awaiting task is
+    cancelled, the operation is cancelled through its `OperationHandle`.
+    """
+
+    def __init__(self, max_workers: int = 8, default_timeout: float = 30.0):
+        """
+        Args:
+            max_workers: Maximum number of threads running database work at once
+            default_timeout: Seconds allowed per operation unless overridden
+        """
+        self.max_workers = max_workers
+        self.default_timeout = default_timeout
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="db-executor"
+        )
+
+    async def run(
+        self,
+        func: Callable[..., Any],
+        *args: Any,
+        timeout: Optional[float] = None,
+        operation: Optional[str] = None,
+        **kwargs: Any,
+    ) -> Any:
+        """
+        Run `func(handle, *args, **kwargs)` on the database thread pool.
+
+        Args:
+            func: Blocking callable; receives an `OperationHandle` as first argument
+            timeout: Seconds allowed for this call (defaults to `default_timeout`,
+                a value <= 0 disables the timeout)
+            operation: Name used in error messages (defaults to the function name)
+
+        Raises:
+            DatabaseTimeoutError: If the operation did not finish in time
+        """
+        handle = OperationHandle(operation or getattr(func, "__name__", "operation"))
+        effective_timeout = self.default_timeout if timeout is None else timeout
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(
+            self._pool, functools.partial(_run, handle, func, args, kwargs)
+        )
+        try:
+            if effective_timeout and effective_timeout > 0:
+                return await asyncio.wait_for(future, effective_timeout)
+            return await future
+        except asyncio.TimeoutError:
+            handle.cancel()
+            raise DatabaseTimeoutError(
+                f"Database operation '{handle.name}' timed out after {effective_timeout}s"
+            )
+        except asyncio.CancelledError:
+            handle.cancel()
+            raise
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
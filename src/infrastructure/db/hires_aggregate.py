@@ -0,0 +1,109 @@
+import datetime
+from collections import Counter
+from typing import Any, Iterable, List, Tuple
+
+# Hires per department, job, year and quarter. The metrics read this table
+# instead of scanning employees; each employee batch adds its own counts in
+# the transaction that inserts it, and restores rebuild it from employees.
+TABLE = "hires_by_quarter"
+
+
+def quarter_index(day: datetime.date) -> int:
+    """Quarters since year 0; consecutive quarters have consecutive indexes."""
+    return day.year * 4 + (day.month - 1) // 3
+
+
+def covers_whole_quarters(start: datetime.date, end: datetime.date) -> bool:
+    """Whether [start, end) starts and ends on quarter boundaries."""
+    return all(day.day == 1 and day.month in (1, 4, 7, 10) for day in (start, end))
+
+
+def quarter_deltas(rows: Iterable[Tuple[Any, int, int]]) -> List[tuple]:
+    """
+    Count hires per (department_id, job_id, year, quarter) from
+    (hire datetime, department_id, job_id) rows. Datetimes may be datetime
+    objects or 'YYYY-MM-DD HH:MM:SS' text. Sorted, so concurrent batches
+    update the aggregate rows in the same order.
+    """
+    counts: Counter = Counter()
+    for hired_at, department_id, job_id in rows:
+        if isinstance(hired_at, datetime.datetime):
+            year, month = hired_at.year, hired_at.month
+        else:
+            year, month = int(hired_at[0:4]), int(hired_at[5:7])
+        counts[(department_id, job_id, year, (month + 2) // 3)] += 1
+    return [(*key, hires) for key, hires in sorted(counts.items())]
+
+
+class AzureSQLHiresAggregate:
+    """Azure SQL statements maintaining `hires_by_quarter`."""
+
+    def add(self, cursor: Any, rows: Iterable[Tuple[Any, int, int]]) -> None:
+        """Add the hires of inserted employees; run in the inserting transaction."""
+        deltas = quarter_deltas(rows)
+        if not deltas:
+            return
+        # HOLDLOCK keeps concurrent batches from inserting the same key twice
+        cursor.executemany(
+            f"""
+            MERGE {TABLE} WITH (HOLDLOCK) AS target
+            USING (SELECT ? AS department_id, ? AS job_id, ? AS year,
+                          ? AS quarter, ? AS hires) AS source
+            ON target.department_id = source.department_id
+               AND target.job_id = source.job_id
+               AND target.year = source.year
+               AND target.quarter = source.quarter
+            WHEN MATCHED THEN
+                UPDATE SET hires = target.hires + source.hires
+            WHEN NOT MATCHED THEN
+                INSERT (department_id, job_id, year, quarter, hires)
+                VALUES (source.department_id, source.job_id, source.year,
+                        source.quarter, source.hires);
+            """,
+            deltas,
+        )
+
+    def rebuild(self, cursor: Any) -> None:
+        """Recompute the aggregate from employees; run inside one transaction."""
+        cursor.execute(f"DELETE FROM {TABLE}")
+        cursor.execute(
+            f"""
+            INSERT INTO {TABLE} (department_id, job_id, year, quarter, hires)
+            SELECT department_id, job_id, YEAR(datetime), DATEPART(QUARTER, datetime),
+                   COUNT(*)
+            FROM employees
+            GROUP BY department_id, job_id, YEAR(datetime), DATEPART(QUARTER, datetime)
+            """
+        )
+
+
+class SQLiteHiresAggregate:
+    """SQLite equivalent, with an INSERT ... ON CONFLICT upsert."""
+
+    def add(self, cursor: Any, rows: Iterable[Tuple[Any, int, int]]) -> None:
+        deltas = quarter_deltas(rows)
+        if not deltas:
+            return
+        cursor.executemany(
+            f"""
+            INSERT INTO {TABLE} (department_id, job_id, year, quarter, hires)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (department_id, job_id, year, quarter)
+            DO UPDATE SET hires = hires + excluded.hires
+            """,
+            deltas,
+        )
+
+    def rebuild(self, cursor: Any) -> None:
+        cursor.execute(f"DELETE FROM {TABLE}")
+        cursor.execute(
+            f"""
+            INSERT INTO {TABLE} (department_id, job_id, year, quarter, hires)
+            SELECT department_id, job_id,
+                   CAST(strftime('%Y', datetime) AS INTEGER) AS year,
+                   (CAST(strftime('%m', datetime) AS INTEGER) + 2) / 3 AS quarter,
+                   COUNT(*)
+            FROM employees
+            GROUP BY department_id, job_id, year, quarter
+            """
+        )
@@ -0,0 +1,398 @@
+import bisect
+import functools
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is unbounded
+LATENCY_BUCKETS_MS = (
+    0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000
+)
+
+_STRING_LITERALS = re.compile(r"N?'(?:[^']|'')*'")
+_NUMBER_LITERALS = re.compile(r"(?<![\w.@])\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LISTS = re.compile(r"\?(?:\s*,\s*\?)+")
+_ROW_LISTS = re.compile(r"\(\?, \.\.\.\)(?:\s*,\s*\(\?, \.\.\.\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class _Current(threading.local):
+    # Database operation (executor call) running on this thread
+    operation: Optional[str] = None
+
+
+_current = _Current()
+_THIS_FILE = __file__
+
+
+@functools.lru_cache(maxsize=2048)
+def fingerprint(statement: str) -> str:
+    """
+    Normalized statement text: literals replaced by '?', lists of placeholders
+    collapsed and whitespace squeezed, so executions differing only in their
+    values are counted together.
+    """
+    text = _STRING_LITERALS.sub("?", statement)
+    text = _NUMBER_LITERALS.sub("?", text)
+    text = _PLACEHOLDER_LISTS.sub("?, ...", text)
+    text = _ROW_LISTS.sub("(?, ...), ...", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+@contextmanager
+def operation(name: str) -> Iterator[None]:
+    """Attribute the statements run by this thread to a named operation."""
+    previous = _current.operation
+    _current.operation = name
+    try:
+        yield
+    finally:
+        _current.operation = previous
+
+
+@functools.lru_cache(maxsize=256)
+def _module_name(filename: str) -> str:
+    return os.path.splitext(os.path.basename(filename))[0]
+
+
+def _caller() -> str:
+    # First frame outside this module: the repository method (or helper) that
+    # ran the statement
+    frame = sys._getframe(2)
+    while frame and frame.f_code.co_filename == _THIS_FILE:
+        frame = frame.f_back
+    if frame is None:
+        return "unknown"
+    code = frame.f_code
+    return f"{_module_name(code.co_filename)}.{code.co_name}:{frame.f_lineno}"
+
+
+class QueryLog:
+    """
+    Timings of the SQL statements run through instrumented connections.
+
+    Statements are grouped by fingerprint, each with its execution count, rows,
+    errors and a latency histogram. Executions slower than `slow_threshold_ms`
+    are also kept, newest first, in a bounded ring buffer.
+    """
+
+    def __init__(
+        self,
+        slow_threshold_ms: float = 500.0,
+        slow_log_size: int = 100,
+        max_fingerprints: int = 500,
+        enabled: bool = True,
+    ):
+        """
+        Args:
+            slow_threshold_ms: Executions at least this slow go to the slow log
+            slow_log_size: Slow executions kept, oldest dropped first
+            max_fingerprints: Statements tracked, least recently run dropped first
+            enabled: Record anything at all
+        """
+        self.slow_threshold_ms = slow_threshold_ms
+        self.max_fingerprints = max_fingerprints
+        self.enabled = enabled
+        self._statements: "OrderedDict[str, Dict]" = OrderedDict()
+        self._slow: deque = deque(maxlen=slow_log_size)
+        self._lock = threading.Lock()
+
+    def configure(
+        self, slow_threshold_ms: float, slow_log_size: int, enabled: bool
+    ) -> None:
+        with self._lock:
+            self.slow_threshold_ms = slow_threshold_ms
+            self.enabled = enabled
+            self._slow = deque(self._slow, maxlen=slow_log_size)
+
+    def record(
+        self,
+        statement: str,
+        seconds: float,
+        rows: int,
+        caller: str,
+        operation: Optional[str] = None,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        statement = fingerprint(statement)
+        milliseconds = seconds * 1000
+        bucket = bisect.bisect_left(LATENCY_BUCKETS_MS, milliseconds)
+
+        with self._lock:
+            stats = self._statements.get(statement)
+            if stats is None:
+                stats = self._statements[statement] = {
+                    "count": 0,
+                    "errors": 0,
+                    "rows": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "buckets": [0] * (len(LATENCY_BUCKETS_MS) + 1),
+                    "callers": {},
+                }
+                while len(self._statements) > self.max_fingerprints:
+                    self._statements.popitem(last=False)
+            else:
+                self._statements.move_to_end(statement)
+            stats["count"] += 1
+            stats["errors"] += error is not None
+            stats["rows"] += rows
+            stats["total_ms"] += milliseconds
+            stats["max_ms"] = max(stats["max_ms"], milliseconds)
+            stats["buckets"][bucket] += 1
+            callers = stats["callers"]
+            if caller in callers or len(callers) < 5:
+                callers[caller] = callers.get(caller, 0) + 1
+
+            if milliseconds >= self.slow_threshold_ms:
+                self._slow.append(
+                    {
+                        "at": datetime.now(timezone.utc).isoformat(),
+                        "statement": statement,
+                        "ms": round(milliseconds, 3),
+                        "rows": rows,
+                        "caller": caller,
+                        "operation": operation,
+                        "error": str(error) if error is not None else None,
+                    }
+                )
+
+    def slow_queries(self) -> List[Dict]:
+        """Slow executions, newest first."""
+        with self._lock:
+            return list(reversed(self._slow))
+
+    def statements(self, limit: int = 50) -> List[Dict]:
+        """Statement stats, by total time spent descending."""
+        with self._lock:
+            items = [
+                (statement, dict(stats, buckets=list(stats["buckets"])))
+                for statement, stats in self._statements.items()
+            ]
+        items.sort(key=lambda item: item[1]["total_ms"], reverse=True)
+        return [
+            {
+                "statement": statement,
+                "count": stats["count"],
+                "errors": stats["errors"],
+                "rows": stats["rows"],
+                "total_ms": round(stats["total_ms"], 3),
+                "mean_ms": round(stats["total_ms"] / stats["count"], 3),
+                "p50_ms": self._percentile(stats, 0.50),
+                "p95_ms": self._percentile(stats, 0.95),
+                "p99_ms": self._percentile(stats, 0.99),
+                "max_ms": round(stats["max_ms"], 3),
+                "histogram": self._histogram(stats["buckets"]),
+                "callers": dict(stats["callers"]),
+            }
+            for statement, stats in items[:limit]
+        ]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._statements.clear()
+            self._slow.clear()
+
+    @staticmethod
+    def _percentile(stats: Dict, fraction: float) -> float:
+        # Upper bound of the bucket holding the percentile (the maximum for the
+        # unbounded bucket)
+        rank = fraction * stats["count"]
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, stats["buckets"]):
+            seen += count
+            if seen >= rank:
+                return min(float(bound), round(stats["max_ms"], 3))
+        return round(stats["max_ms"], 3)
+
+    @staticmethod
+    def _histogram(buckets: List[int]) -> Dict[str, int]:
+        labels = [f"le_{bound}" for bound in LATENCY_BUCKETS_MS] + ["le_inf"]
+        return dict(zip(labels, buckets))
+
+
+class _Execution:
+    """A statement whose rows may still be being fetched."""
+
+    __slots__ = ("statement", "seconds", "rows", "caller", "operation")
+
+    def __init__(self, statement: str, seconds: float, rows: int, caller: str):
+        self.statement = statement
+        self.seconds = seconds
+        self.rows = rows
+        self.caller = caller
+        self.operation = _current.operation
+
+
+class InstrumentedCursor:
+    """
+    DB-API cursor proxy timing execute/executemany and the fetches of their
+    results. An execution is recorded once its rows are exhausted, or when the
+    cursor runs the next statement, is closed or is released.
+    """
+
+    __slots__ = ("_cursor", "_log", "_execution")
+
+    def __init__(self, cursor: Any, log: QueryLog):
+        object.__setattr__(self, "_cursor", cursor)
+        object.__setattr__(self, "_log", log)
+        object.__setattr__(self, "_execution", None)
+
+    def execute(self, statement: str, *params: Any) -> "InstrumentedCursor":
+        self._run(self._cursor.execute, statement, params, None)
+        return self
+
+    def executemany(self, statement: str, rows: Any) -> "InstrumentedCursor":
+        self._run(
+            self._cursor.executemany,
+            statement,
+            (rows,),
+            len(rows) if hasattr(rows, "__len__") else None,
+        )
+        return self
+
+    def fetchone(self) -> Any:
+        started = time.perf_counter()
+        row = self._cursor.fetchone()
+        self._fetched(started, 0 if row is None else 1, done=row is None)
+        return row
+
+    def fetchmany(self, *size: Any) -> List:
+        started = time.perf_counter()
+        rows = self._cursor.fetchmany(*size)
+        self._fetched(started, len(rows), done=not rows)
+        return rows
+
+    def fetchall(self) -> List:
+        started = time.perf_counter()
+        rows = self._cursor.fetchall()
+        self._fetched(started, len(rows), done=True)
+        return rows
+
+    def __iter__(self) -> Iterator:
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def close(self) -> None:
+        self._finish()
+        self._cursor.close()
+
+    def __enter__(self) -> "InstrumentedCursor":
+        self._cursor.__enter__()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> Any:
+        self._finish()
+        return self._cursor.__exit__(*exc_info)
+
+    def __del__(self) -> None:
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        # e.g. pyodbc's fast_executemany
+        setattr(self._cursor, name, value)
+
+    def _run(self, method: Any, statement: str, params: tuple, rows: Optional[int]):
+        self._finish()
+        caller = _caller()
+        started = time.perf_counter()
+        try:
+            method(statement, *params)
+        except BaseException as e:
+            self._log.record(
+                statement,
+                time.perf_counter() - started,
+                0,
+                caller,
+                _current.operation,
+                e,
+            )
+            raise
+        seconds = time.perf_counter() - started
+        if rows is None:
+            rowcount = getattr(self._cursor, "rowcount", -1)
+            rows = rowcount if isinstance(rowcount, int) and rowcount > 0 else 0
+        object.__setattr__(
+            self, "_execution", _Execution(statement, seconds, rows, caller)
+        )
+
+    def _fetched(self, started: float, rows: int, done: bool) -> None:
+        execution = self._execution
+        if execution is None:
+            return
+        execution.seconds += time.perf_counter() - started
+        execution.rows += rows
+        if done:
+            self._finish()
+
+    def _finish(self) -> None:
+        execution = self._execution
+        if execution is None:
+            return
+        object.__setattr__(self, "_execution", None)
+        self._log.record(
+            execution.statement,
+            execution.seconds,
+            execution.rows,
+            execution.caller,
+            execution.operation,
+        )
+
+
+class InstrumentedConnection:
+    """DB-API connection proxy whose cursors are instrumented."""
+
+    __slots__ = ("_connection", "_log")
+
+    def __init__(self, connection: Any, log: QueryLog):
+        object.__setattr__(self, "_connection", connection)
+        object.__setattr__(self, "_log", log)
+
+    def cursor(self, *args: Any) -> InstrumentedCursor:
+        return InstrumentedCursor(self._connection.cursor(*args), self._log)
+
+    def execute(self, statement: str, *params: Any) -> InstrumentedCursor:
+        # sqlite3 and pyodbc shortcut running a statement on a new cursor
+        return self.cursor().execute(statement, *params)
+
+    def executemany(self, statement: str, rows: Any) -> InstrumentedCursor:
+        return self.cursor().executemany(statement, rows)
+
+    def __enter__(self) -> "InstrumentedConnection":
+        self._connection.__enter__()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> Any:
+        return self._connection.__exit__(*exc_info)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._connection, name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._connection, name, value)
+
+
+# Shared by every connection of the process; the container applies the settings
+query_log = QueryLog()
+
+
+def instrument(connection: Any) -> Any:
+    """Wrap a DB-API connection so its statements are recorded in `query_log`."""
+    if not query_log.enabled:
+        return connection
+    return InstrumentedConnection(connection, query_log)
@@ -0,0 +1,42 @@
+from typing import Any, Iterable
+
+
+class AzureSQLSnapshot:
+    """
+    Azure SQL statements to read several tables over separate connections as of
+    one point in time.
+
+    Each reader runs a SNAPSHOT isolation transaction, whose snapshot is fixed by
+    its first read. While the readers make that read, a coordinating connection
+    holds shared table locks (TABLOCK, HOLDLOCK) that wait for in-flight writes
+    to commit and keep new ones out, so every snapshot sees the same committed
+    state. The locks are released as soon as all snapshots are fixed; the
+    readers then stream without blocking writers.
+    """
+
+    def freeze(self, cursor: Any, tables: Iterable[str]) -> None:
+        """Block writes to the tables until the coordinating transaction ends."""
+        for table in tables:
+            cursor.execute(f"SELECT TOP 0 1 FROM {table} WITH (TABLOCK, HOLDLOCK)")
+
+    def begin(self, cursor: Any, table_name: str) -> None:
+        """Start a snapshot transaction and fix its snapshot with a first read."""
+        cursor.execute("SET TRANSACTION ISOLATION LEVEL SNAPSHOT")
+        cursor.execute(f"SELECT TOP 1 1 FROM {table_name}")
+        cursor.fetchall()
+
+
+class SQLiteSnapshot:
+    """
+    SQLite equivalent: the coordinating connection takes the write lock with
+    BEGIN IMMEDIATE, and each reader opens a read transaction, which in WAL mode
+    keeps seeing the database as of its first read.
+    """
+
+    def freeze(self, cursor: Any, tables: Iterable[str]) -> None:
+        cursor.execute("BEGIN IMMEDIATE")
+
+    def begin(self, cursor: Any, table_name: str) -> None:
+        cursor.execute("BEGIN")
+        cursor.execute(f"SELECT 1 FROM {table_name} LIMIT 1")
+        cursor.fetchall()
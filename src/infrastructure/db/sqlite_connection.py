@@ -0,0 +1,73 @@
+import datetime
+import hashlib
+import sqlite3
+from pathlib import Path
+
+from src.infrastructure.db.instrumentation import instrument
+
+SCHEMA_SCRIPT = (
+    Path(__file__).resolve().parent.parent / "persistance" / "scripts" / "init_sqlite.sql"
+)
+
+_initialized_paths = set()
+
+# Same 'YYYY-MM-DD HH:MM:SS' text the repositories write; the implicit default
+# adapter is deprecated since Python 3.12
+sqlite3.register_adapter(datetime.datetime, lambda value: value.isoformat(sep=" "))
+
+
+class _TableDigest:
+    """
+    Aggregate `table_digest(id, columns...)`: SHA-256 over the rows' hashes in
+    id order, so any changed, moved or swapped value changes it. SQLite has no
+    hash function; backups use it to detect changed tables.
+    """
+
+    def __init__(self):
+        self.rows = []
+
+    def step(self, *values) -> None:
+        self.rows.append((values[0], hashlib.sha256(repr(values).encode()).digest()))
+
+    def finalize(self):
+        if not self.rows:
+            return None
+        self.rows.sort(key=lambda row: row[0])
+        digest = hashlib.sha256()
+        for _, row_hash in self.rows:
+            digest.update(row_hash)
+        return digest.hexdigest()
+
+
+def get_sqlite_connection(database_path: str) -> sqlite3.Connection:
+    """
+    Open a connection to the embedded SQLite database, creating the schema on
+    first use. Connections are cheap, so callers open one per operation just like
+    the pyodbc repositories do.
+    """
+    if database_path != ":memory:":
+        Path(database_path).parent.mkdir(parents=True, exist_ok=True)
+
+    # A generous busy timeout lets concurrent writers queue on the database lock
+    conn = sqlite3.connect(database_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.create_aggregate("table_digest", -1, _TableDigest)
+    if database_path not in _initialized_paths:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA_SCRIPT.read_text())
+        _initialized_paths.add(database_path)
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return instrument(conn)
+
+
+class SQLiteCancelHandle:
+    """
+    Adapter registered with `OperationHandle.track`: sqlite3 cursors cannot be
+    cancelled, but the connection can interrupt the running statement.
+    """
+
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+
+    def cancel(self) -> None:
+        self.connection.interrupt()
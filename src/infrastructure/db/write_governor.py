@@ -0,0 +1,249 @@
+import asyncio
+import logging
+import random
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from src.domain.exceptions.domain_exceptions import DatabaseTimeoutError
+
+logger = logging.getLogger(__name__)
+
+# Azure SQL native error codes that indicate throttling, failover or a
+# dropped connection; the same batch is expected to succeed on a later attempt.
+# https://learn.microsoft.com/azure/azure-sql/database/troubleshoot-common-errors-issues
+TRANSIENT_SQL_ERROR_CODES = {
+    233,  # Connection initialization error
+    1205,  # Deadlock victim
+    4060,  # Cannot open database requested by the login
+    4221,  # Login to read-secondary failed due to long wait on HADR
+    10053,  # Transport-level error
+    10054,  # Connection forcibly closed by the remote host
+    10060,  # Network-related error
+    10928,  # Resource limit reached
+    10929,  # Resource limit reached (minimum guarantee)
+    40143,  # Service encountered an error processing the request
+    40197,  # Service error processing the request (failover / upgrade)
+    40501,  # Service is busy
+    40540,  # Service encountered an error processing the request
+    40613,  # Database not currently available
+    49918,  # Not enough resources to process request
+    49919,  # Too many create or update operations in progress
+    49920,  # Too many operations in progress
+}
+
+# ODBC SQLSTATEs for communication failures, timeouts and serialization failures
+TRANSIENT_SQLSTATES = {"08S01", "08001", "08004", "HYT00", "HYT01", "40001"}
+
+_NATIVE_CODE_PATTERN = re.compile(r"\((\d{3,5})\)")
+
+
+def is_transient_error(error: Exception) -> bool:
+    """
+    Classify a database error as transient (worth retrying) or permanent.
+
+    pyodbc raises errors whose first argument is the SQLSTATE and whose message
+    embeds the native SQL Server error number in parentheses, e.g.
+    "[SQL Server]The service is currently busy. (40501) (SQLExecDirectW)".
+
+    Executor timeouts are not transient: cancelling the statement is best
+    effort, so the batch may still commit and must not be written again.
+    """
+    args = getattr(error, "args", ())
+    if args and isinstance(args[0], str) and args[0] in TRANSIENT_SQLSTATES:
+        return True
+
+    # The embedded SQLite backend reports lock contention as an OperationalError
+    if "database is locked" in str(error):
+        return True
+
+    codes = {int(code) for code in _NATIVE_CODE_PATTERN.findall(str(error))}
+    return bool(codes & TRANSIENT_SQL_ERROR_CODES)
+
+
+class WriteGovernor:
+    """
+    Admission control and retry policy for batch writes against Azure SQL.
+
+    The number of batches written concurrently is adjusted with an AIMD
+    (additive increase, multiplicative decrease) controller: every full round of
+    successful batches raises the limit by `additive_increase`, and a throttling
+    or transient error cuts it by `decrease_factor`. The limit therefore settles
+    around the concurrency the database tier can sustain. Batches failing with a
+    transient error are retried as a whole with full-jitter exponential backoff.
+    A batch that times out also cuts the limit but is not retried, since it may
+    still have been committed.
+    """
+
+    def __init__(
+        self,
+        initial_concurrency: int = 4,
+        min_concurrency: int = 1,
+        max_concurrency: int = 16,
+        additive_increase: int = 1,
+        decrease_factor: float = 0.5,
+        max_retries: int = 5,
+        base_backoff: float = 0.5,
+        max_backoff: float = 30.0,
+    ):
+        """
+        Args:
+            initial_concurrency: Concurrent batch writes allowed at start
+            min_concurrency: Lower bound for the concurrency limit
+            max_concurrency: Upper bound for the concurrency limit
+            additive_increase: Limit increase after a round of successful batches
+            decrease_factor: Multiplier applied to the limit on throttling
+            max_retries: Retries of a batch after a transient error
+            base_backoff: Base delay in seconds for the exponential backoff
+            max_backoff: Maximum delay in seconds between two attempts
+        """
+        self.min_concurrency = max(1, min_concurrency)
+        self.max_concurrency = max(self.min_concurrency, max_concurrency)
+        self.limit = min(
+            max(initial_concurrency, self.min_concurrency), self.max_concurrency
+        )
+        self.additive_increase = additive_increase
+        self.decrease_factor = decrease_factor
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self.in_flight = 0
+        self.waiting = 0
+        self._successes_in_round = 0
+        self._last_decrease_at = 0.0
+        # Created on first use so it binds to the loop that serves requests
+        self._condition: Optional[asyncio.Condition] = None
+
+        self._stats = {
+            "batches_succeeded": 0,
+            "batches_failed": 0,
+            "transient_errors": 0,
+            "retries": 0,
+            "timeouts": 0,
+            "limit_increases": 0,
+            "limit_decreases": 0,
+        }
+        self._last_error: Optional[str] = None
+
+    async def submit(
+        self, write: Callable[[], Awaitable[Any]], name: str = "batch"
+    ) -> Any:
+        """
+        Run a batch write under the governor.
+
+        Args:
+            write: Coroutine factory performing the whole batch write; it is
+                called again for every retry, so it must be safe to repeat
+            name: Name used in log messages
+
+        Raises:
+            The last error when it is permanent or the retries are exhausted
+        """
+        attempt = 0
+        while True:
+            await self._acquire()
+            started_at = time.monotonic()
+            error: Optional[Exception] = None
+            try:
+                result = await write()
+            except Exception as e:
+                error = e
+            finally:
+                await self._release()
+
+            if error is None:
+                self._on_success()
+                return result
+
+            self._last_error = str(error)
+            if isinstance(error, DatabaseTimeoutError):
+                self._stats["timeouts"] += 1
+                self._stats["batches_failed"] += 1
+                self._on_throttle(started_at)
+                logger.error(
+                    "Timed out writing %s, not retrying as it may have been "
+                    "committed (concurrency limit %s): %s",
+                    name,
+                    self.limit,
+                    error,
+                )
+                raise error
+
+            if not is_transient_error(error):
+                self._stats["batches_failed"] += 1
+                raise error
+
+            self._stats["transient_errors"] += 1
+            self._on_throttle(started_at)
+            if attempt >= self.max_retries:
+                self._stats["batches_failed"] += 1
+                raise error
+
+            delay = self._backoff_delay(attempt)
+            attempt += 1
+            self._stats["retries"] += 1
+            logger.warning(
+                "Transient error writing %s, retry %s/%s in %.2fs "
+                "(concurrency limit %s): %s",
+                name,
+                attempt,
+                self.max_retries,
+                delay,
+                self.limit,
+                error,
+            )
+            await asyncio.sleep(delay)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current controller state and counters, for the metrics endpoint."""
+        return {
+            "concurrency_limit": self.limit,
+            "min_concurrency": self.min_concurrency,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            **self._stats,
+            "last_error": self._last_error,
+        }
+
+    async def _acquire(self) -> None:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        async with self._condition:
+            self.waiting += 1
+            try:
+                await self._condition.wait_for(lambda: self.in_flight < self.limit)
+            finally:
+                self.waiting -= 1
+            self.in_flight += 1
+
+    async def _release(self) -> None:
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def _on_success(self) -> None:
+        self._stats["batches_succeeded"] += 1
+        self._successes_in_round += 1
+        # Additive increase once per "round trip": after `limit` successful batches
+        if self._successes_in_round >= self.limit and self.limit < self.max_concurrency:
+            self.limit = min(self.max_concurrency, self.limit + self.additive_increase)
+            self._successes_in_round = 0
+            self._stats["limit_increases"] += 1
+
+    def _on_throttle(self, started_at: float) -> None:
+        self._successes_in_round = 0
+        # Batches that were already running when the limit was cut report the
+        # same congestion event; only decrease once per event
+        if started_at < self._last_decrease_at:
+            return
+        new_limit = max(self.min_concurrency, int(self.limit * self.decrease_factor))
+        if new_limit < self.limit:
+            self.limit = new_limit
+            self._stats["limit_decreases"] += 1
+        self._last_decrease_at = time.monotonic()
+
+    def _backoff_delay(self, attempt: int) -> float:
+        # Full jitter: spreads retries of concurrent writers over the window
+        return random.uniform(0, min(self.max_backoff, self.base_backoff * (2 ** attempt)))
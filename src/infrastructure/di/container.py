@@ -4,55 +4,299 @@ from src.infrastructure.persistance.azure_backup_repository import AzureBackupRe
 from src.infrastructure.persistance.azure_sql_repository import (
     AzureSQLEmployeeRepository,
     AzureSQLDepartmentRepository,
-    AzureSQLJobRepository
+    AzureSQLJobRepository,
+    AzureSQLMetricsRepository,
+)
+from src.infrastructure.persistance.columnar_metrics_repository import (
+    ColumnarMetricsRepository,
+)
+from src.infrastructure.persistance.sqlite_repository import (
+    SQLiteEmployeeRepository,
+    SQLiteDepartmentRepository,
+    SQLiteJobRepository,
+    SQLiteMetricsRepository,
 )
-from src.infrastructure.azure.storage_service import AzureBlobStorageService
 from src.infrastructure.logging.azure_logger import AzureLogger
+from src.infrastructure.logging.log_sink import log_sink as app_log_sink
 from src.application.services.ingest_service import IngestService
+from src.application.services.metrics_cache import DataVersions, MetricsCache
 from src.infrastructure.services.azure_blob_storage_service import (
     AzureBlobStorageServiceInfrastructure,
 )
+from src.infrastructure.db.connection import get_db_connection
+from src.infrastructure.db.executor import DatabaseExecutor
+from src.infrastructure.db.instrumentation import query_log as sql_query_log
+from src.infrastructure.api.middleware.request_metrics import (
+    request_metrics as http_request_metrics,
+)
+from src.infrastructure.db.write_governor import WriteGovernor
+from src.infrastructure.db.sqlite_connection import get_sqlite_connection
+from src.infrastructure.db.bulk_load import SQLiteBulkLoad
+from src.infrastructure.db.snapshot import SQLiteSnapshot
+from src.infrastructure.db.hires_aggregate import SQLiteHiresAggregate
+from src.infrastructure.azure.blob_transfer import BlobTransferEngine
+from src.infrastructure.persistance.avro_engine import get_avro_engine
+import functools
 import os
 
 from settings import (
-    AZURE_STORAGE_CONNECTION_STRING,
-    AZURE_BLOB_CONTAINER_ROW_DATA,
-    AZURE_BLOB_CONTAINER_BACKUPS,
-    AZURE_SQL_CONNECTION_STRING,
+    get_secret,
+    LAZY_INIT,
+    DB_EXECUTOR_MAX_WORKERS,
+    DB_QUERY_TIMEOUT_SECONDS,
+    DB_WRITE_TIMEOUT_SECONDS,
+    DB_BACKUP_TIMEOUT_SECONDS,
+    DB_WRITE_CONCURRENCY_INITIAL,
+    DB_WRITE_CONCURRENCY_MAX,
+    DB_WRITE_MAX_RETRIES,
+    INGEST_MAX_PENDING_BATCHES,
+    DB_BACKEND,
+    SQLITE_DATABASE_PATH,
+    BACKUP_FETCH_SIZE,
+    BACKUP_CODEC,
+    AVRO_ENGINE,
+    RESTORE_BATCH_SIZE,
+    BACKUP_MAX_CHAIN_LENGTH,
+    BACKUP_PARTITIONS,
+    RESTORE_PARALLELISM,
+    BACKUP_CATALOG_TTL_SECONDS,
+    BACKUP_CATALOG_SEGMENT_SIZE,
+    BACKUP_FORMAT,
+    PARQUET_ROW_GROUP_SIZE,
+    METRICS_CACHE_TTL_SECONDS,
+    METRICS_CACHE_MAX_ENTRIES,
+    METRICS_ENGINE,
+    METRICS_ENGINE_REFRESH_SECONDS,
+    BLOB_BLOCK_SIZE_BYTES,
+    BLOB_MAX_CONCURRENCY,
+    DB_INSTRUMENTATION,
+    DB_SLOW_QUERY_MS,
+    DB_SLOW_QUERY_LOG_SIZE,
+    LOG_LEVEL,
+    LOG_QUEUE_SIZE,
+    LOG_BATCH_SIZE,
+    LOG_FLUSH_INTERVAL_SECONDS,
+    LOG_RATE_LIMIT_BURST,
+    LOG_RATE_LIMIT_WINDOW_SECONDS,
+    LOG_SAMPLE_EVERY,
+)
+
+# Connections are also opened outside the container (get_db_cursor), so the SQL
+# instrumentation is process-wide and configured once here
+sql_query_log.configure(
+    slow_threshold_ms=DB_SLOW_QUERY_MS,
+    slow_log_size=DB_SLOW_QUERY_LOG_SIZE,
+    enabled=DB_INSTRUMENTATION,
+)
+
+# Likewise for logging: every module logs through `logging.getLogger(__name__)`
+# and the records under `src` are written by the non-blocking sink
+app_log_sink.configure(
+    level=LOG_LEVEL,
+    capacity=LOG_QUEUE_SIZE,
+    batch_size=LOG_BATCH_SIZE,
+    flush_interval=LOG_FLUSH_INTERVAL_SECONDS,
+    burst=LOG_RATE_LIMIT_BURST,
+    window=LOG_RATE_LIMIT_WINDOW_SECONDS,
+    sample_every=LOG_SAMPLE_EVERY,
 )
+app_log_sink.install("src")
 
 
 class Container(containers.DeclarativeContainer):
     # Load settings
     config = providers.Configuration()
-    config.azure_storage_connection_string.override(AZURE_STORAGE_CONNECTION_STRING)
-    config.azure_storage_container_name.override(AZURE_BLOB_CONTAINER_ROW_DATA)
-    config.azure_storage_container_backup.override(AZURE_BLOB_CONTAINER_BACKUPS)
-    config.azure_sql_connection_string.override(AZURE_SQL_CONNECTION_STRING)
+    config.lazy_init.override(LAZY_INIT)
+    config.db_executor_max_workers.override(DB_EXECUTOR_MAX_WORKERS)
+    config.db_query_timeout.override(DB_QUERY_TIMEOUT_SECONDS)
+    config.db_write_timeout.override(DB_WRITE_TIMEOUT_SECONDS)
+    config.db_backup_timeout.override(DB_BACKUP_TIMEOUT_SECONDS)
+    config.db_write_concurrency_initial.override(DB_WRITE_CONCURRENCY_INITIAL)
+    config.db_write_concurrency_max.override(DB_WRITE_CONCURRENCY_MAX)
+    config.db_write_max_retries.override(DB_WRITE_MAX_RETRIES)
+    config.ingest_max_pending_batches.override(INGEST_MAX_PENDING_BATCHES)
+    config.db_backend.override(DB_BACKEND)
+    config.sqlite_database_path.override(SQLITE_DATABASE_PATH)
+    config.backup_fetch_size.override(BACKUP_FETCH_SIZE)
+    config.backup_codec.override(BACKUP_CODEC)
+    config.avro_engine.override(AVRO_ENGINE)
+    config.restore_batch_size.override(RESTORE_BATCH_SIZE)
+    config.backup_max_chain_length.override(BACKUP_MAX_CHAIN_LENGTH)
+    config.backup_partitions.override(BACKUP_PARTITIONS)
+    config.restore_parallelism.override(RESTORE_PARALLELISM)
+    config.backup_catalog_ttl.override(BACKUP_CATALOG_TTL_SECONDS)
+    config.backup_catalog_segment_size.override(BACKUP_CATALOG_SEGMENT_SIZE)
+    config.backup_format.override(BACKUP_FORMAT)
+    config.parquet_row_group_size.override(PARQUET_ROW_GROUP_SIZE)
+    config.metrics_cache_ttl.override(METRICS_CACHE_TTL_SECONDS)
+    config.metrics_cache_max_entries.override(METRICS_CACHE_MAX_ENTRIES)
+    config.metrics_engine.override(METRICS_ENGINE)
+    config.metrics_engine_refresh.override(METRICS_ENGINE_REFRESH_SECONDS)
+    config.blob_block_size.override(BLOB_BLOCK_SIZE_BYTES)
+    config.blob_max_concurrency.override(BLOB_MAX_CONCURRENCY)
     # config.azure_monitor_connection_string.override(AZURE_MONITOR_CONNECTION_STRING)
 
+    # Secrets are read when the first provider using them is built, so with
+    # LAZY_INIT no Key Vault call is made before the first request needs one
+    azure_storage_connection_string = providers.Callable(
+        get_secret, "AZURE_STORAGE_CONNECTION_STRING"
+    )
+    azure_storage_container_name = providers.Callable(
+        get_secret, "AZURE_BLOB_CONTAINER_ROW_DATA"
+    )
+    azure_storage_container_backup = providers.Callable(
+        get_secret, "AZURE_BLOB_CONTAINER_BACKUPS"
+    )
+    azure_sql_connection_string = providers.Callable(
+        get_secret, "AZURE_SQL_CONNECTION_STRING"
+    )
+
     # Infrastructure
     logger = providers.Singleton(
         AzureLogger, connection_string=config.azure_monitor_connection_string
     )
 
-    employee_repository = providers.Singleton(
-        AzureSQLEmployeeRepository, connection_string=config.azure_sql_connection_string
+    # Timings of every SQL statement and the slow query log, shared process-wide
+    query_log = providers.Object(sql_query_log)
+
+    # Latency, sizes and status codes of the API requests, recorded by the
+    # RequestMetricsMiddleware of the app
+    request_metrics = providers.Object(http_request_metrics)
+
+    log_sink = providers.Object(app_log_sink)
+
+    # Thread pool that keeps blocking pyodbc calls off the event loop
+    db_executor = providers.Singleton(
+        DatabaseExecutor,
+        max_workers=config.db_executor_max_workers,
+        default_timeout=config.db_query_timeout,
+    )
+
+    # Shared by all repositories so the concurrency limit reflects the whole database
+    write_governor = providers.Singleton(
+        WriteGovernor,
+        initial_concurrency=config.db_write_concurrency_initial,
+        max_concurrency=config.db_write_concurrency_max,
+        max_retries=config.db_write_max_retries,
+    )
+
+    # AVRO encoder/decoder of the backups (compiled, falling back to avro-python3)
+    avro_engine = providers.Singleton(get_avro_engine, config.avro_engine)
+
+    # Parallel block uploads and ranged downloads for backups and raw files
+    blob_transfer_engine = providers.Singleton(
+        BlobTransferEngine,
+        block_size=config.blob_block_size,
+        max_concurrency=config.blob_max_concurrency,
+    )
+
+    # Repositories are selected by DB_BACKEND: Azure SQL or the embedded SQLite database
+    employee_repository = providers.Selector(
+        config.db_backend,
+        azure_sql=providers.Singleton(
+            AzureSQLEmployeeRepository,
+            connection_string=azure_sql_connection_string,
+            executor=db_executor,
+            write_timeout=config.db_write_timeout,
+            write_governor=write_governor,
+            lazy_init=config.lazy_init,
+        ),
+        sqlite=providers.Singleton(
+            SQLiteEmployeeRepository,
+            database_path=config.sqlite_database_path,
+            executor=db_executor,
+            write_timeout=config.db_write_timeout,
+            write_governor=write_governor,
+        ),
     )
 
-    department_repository = providers.Singleton(
-        AzureSQLDepartmentRepository, connection_string=config.azure_sql_connection_string
+    department_repository = providers.Selector(
+        config.db_backend,
+        azure_sql=providers.Singleton(
+            AzureSQLDepartmentRepository,
+            connection_string=azure_sql_connection_string,
+            executor=db_executor,
+            write_timeout=config.db_write_timeout,
+            write_governor=write_governor,
+            lazy_init=config.lazy_init,
+        ),
+        sqlite=providers.Singleton(
+            SQLiteDepartmentRepository,
+            database_path=config.sqlite_database_path,
+            executor=db_executor,
+            write_timeout=config.db_write_timeout,
+            write_governor=write_governor,
+        ),
     )
 
-    job_repository = providers.Singleton(
-        AzureSQLJobRepository, connection_string=config.azure_sql_connection_string
+    job_repository = providers.Selector(
+        config.db_backend,
+        azure_sql=providers.Singleton(
+            AzureSQLJobRepository,
+            connection_string=azure_sql_connection_string,
+            executor=db_executor,
+            write_timeout=config.db_write_timeout,
+            write_governor=write_governor,
+            lazy_init=config.lazy_init,
+        ),
+        sqlite=providers.Singleton(
+            SQLiteJobRepository,
+            database_path=config.sqlite_database_path,
+            executor=db_executor,
+            write_timeout=config.db_write_timeout,
+            write_governor=write_governor,
+        ),
     )
 
+    # Opens a new connection to the selected database
+    db_connection_factory = providers.Selector(
+        config.db_backend,
+        azure_sql=providers.Object(get_db_connection),
+        sqlite=providers.Callable(
+            functools.partial, get_sqlite_connection, config.sqlite_database_path
+        ),
+    )
+
+    # Table versions bumped by ingests and restores; cached metrics depend on them
+    data_versions = providers.Singleton(DataVersions)
+
+    sql_metrics_repository = providers.Selector(
+        config.db_backend,
+        azure_sql=providers.Singleton(AzureSQLMetricsRepository, executor=db_executor),
+        sqlite=providers.Singleton(
+            SQLiteMetricsRepository,
+            database_path=config.sqlite_database_path,
+            executor=db_executor,
+        ),
+    )
+
+    # Metrics are selected by METRICS_ENGINE: SQL queries, or NumPy arrays kept
+    # in process that fall back to SQL while they cannot be refreshed
+    metrics_repository = providers.Selector(
+        config.metrics_engine,
+        sql=sql_metrics_repository,
+        numpy=providers.Singleton(
+            ColumnarMetricsRepository,
+            connection_factory=db_connection_factory,
+            executor=db_executor,
+            data_versions=data_versions,
+            fallback=sql_metrics_repository,
+            refresh_interval=config.metrics_engine_refresh,
+        ),
+    )
+
+    metrics_cache = providers.Singleton(
+        MetricsCache,
+        data_versions=data_versions,
+        ttl=config.metrics_cache_ttl,
+        max_entries=config.metrics_cache_max_entries,
+    )
 
     storage_service = providers.Singleton(
         AzureBlobStorageServiceInfrastructure,  # Updated class name
-        connection_string=config.azure_storage_connection_string,
-        container_name=config.azure_storage_container_name,
+        connection_string=azure_storage_connection_string,
+        container_name=azure_storage_container_name,
+        transfer_engine=blob_transfer_engine,
     )
 
     # Application Services
@@ -62,12 +306,61 @@ class Container(containers.DeclarativeContainer):
         department_repository=department_repository,
         job_repository=job_repository,
         storage_service=storage_service,
+        max_pending_batches=config.ingest_max_pending_batches,
+        data_versions=data_versions,
     )
     # Repositorio de respaldos
-    backup_repository = providers.Singleton(
-        AzureBackupRepository,
-        blob_connection_string=config.azure_storage_connection_string,
-        container_name=config.azure_storage_container_backup,
+    backup_repository = providers.Selector(
+        config.db_backend,
+        azure_sql=providers.Singleton(
+            AzureBackupRepository,
+            blob_connection_string=azure_storage_connection_string,
+            container_name=azure_storage_container_backup,
+            executor=db_executor,
+            operation_timeout=config.db_backup_timeout,
+            fetch_size=config.backup_fetch_size,
+            codec=config.backup_codec,
+            avro_engine=avro_engine,
+            restore_batch_size=config.restore_batch_size,
+            max_chain_length=config.backup_max_chain_length,
+            partitions=config.backup_partitions,
+            restore_parallelism=config.restore_parallelism,
+            catalog_ttl=config.backup_catalog_ttl,
+            catalog_segment_size=config.backup_catalog_segment_size,
+            file_format=config.backup_format,
+            parquet_row_group_size=config.parquet_row_group_size,
+            transfer_engine=blob_transfer_engine,
+            connection_factory=db_connection_factory,
+            lazy_init=config.lazy_init,
+        ),
+        sqlite=providers.Singleton(
+            AzureBackupRepository,
+            blob_connection_string=azure_storage_connection_string,
+            container_name=azure_storage_container_backup,
+            executor=db_executor,
+            operation_timeout=config.db_backup_timeout,
+            fetch_size=config.backup_fetch_size,
+            codec=config.backup_codec,
+            avro_engine=avro_engine,
+            restore_batch_size=config.restore_batch_size,
+            max_chain_length=config.backup_max_chain_length,
+            partitions=config.backup_partitions,
+            restore_parallelism=config.restore_parallelism,
+            catalog_ttl=config.backup_catalog_ttl,
+            catalog_segment_size=config.backup_catalog_segment_size,
+            file_format=config.backup_format,
+            parquet_row_group_size=config.parquet_row_group_size,
+            transfer_engine=blob_transfer_engine,
+            connection_factory=db_connection_factory,
+            lazy_init=config.lazy_init,
+            truncate_statement="DELETE FROM {table}",
+            bulk_load=providers.Singleton(SQLiteBulkLoad),
+            snapshot=providers.Singleton(SQLiteSnapshot),
+            hires_aggregate=providers.Singleton(SQLiteHiresAggregate),
+            signature_statement=(
+                "SELECT COUNT(*), MAX(id), table_digest({columns}) FROM {table}"
+            ),
+        ),
     )
 
     # Servicio de respaldos
@@ -75,4 +368,5 @@ class Container(containers.DeclarativeContainer):
         BackupService,
         backup_repository=backup_repository,
         logger=logger,
+        data_versions=data_versions,
     )
@@ -0,0 +1,81 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict
+
+from settings import get_secrets
+
+logger = logging.getLogger(__name__)
+
+
+def _probe_database(container: Any) -> None:
+    # Azure SQL repositories keep a connection checking the database is
+    # reachable; opened here rather than by the first request with LAZY_INIT
+    for repository in (
+        container.employee_repository(),
+        container.department_repository(),
+        container.job_repository(),
+    ):
+        getattr(repository, "connection", None)
+    conn = container.db_connection_factory()()
+    try:
+        conn.cursor().execute("SELECT 1").fetchall()
+    finally:
+        conn.close()
+
+
+def _probe_backup_storage(container: Any) -> None:
+    # Creates the blob client and the backup container when missing
+    container.backup_repository().blob_service_client
+
+
+async def _step(func: Callable[[], Any]) -> Dict:
+    started = time.perf_counter()
+    try:
+        await asyncio.to_thread(func)
+    except Exception as e:
+        logger.warning("Warm-up step failed: %s", e)
+        return {
+            "status": "error",
+            "seconds": round(time.perf_counter() - started, 3),
+            "error": str(e),
+        }
+    return {"status": "ok", "seconds": round(time.perf_counter() - started, 3)}
+
+
+async def warm_up(container: Any) -> Dict:
+    """
+    Do the work deferred by LAZY_INIT ahead of the first request: fetch the
+    secrets, build the repositories and services, then open the database and
+    check the backup container concurrently.
+
+    Args:
+        container: Application container
+
+    Returns:
+        Status, seconds and error of every step, and the total seconds
+    """
+    started = time.perf_counter()
+    steps = {"secrets": await _step(get_secrets)}
+
+    def build_services():
+        # One thread at a time builds the singletons; without LAZY_INIT their
+        # constructors connect, which must not block the event loop
+        container.ingest_service()
+        container.backup_service()
+        container.metrics_repository()
+
+    steps["services"] = await _step(build_services)
+    database, backup_storage = await asyncio.gather(
+        _step(lambda: _probe_database(container)),
+        _step(lambda: _probe_backup_storage(container)),
+    )
+    steps["database"] = database
+    steps["backup_storage"] = backup_storage
+    return {
+        "status": (
+            "ok" if all(step["status"] == "ok" for step in steps.values()) else "error"
+        ),
+        "seconds": round(time.perf_counter() - started, 3),
+        "steps": steps,
+    }
@@ -1,20 +1,21 @@
 from typing import Any, Dict, Optional
-import json
+import logging
 
 
 class AzureLogger:
+    """
+    Application Logger writing structured records through the app's log sink:
+    the calls only queue the record, the sink writes it in the background.
+    """
+
     def __init__(self, connection_string: str):
         self.connection_string = (
             connection_string  # Retenido por si es necesario más adelante
         )
-
-    def _format_log(self, message: str, **kwargs: Dict[str, Any]) -> str:
-        log_data = {"message": message}
-        log_data.update(kwargs)
-        return json.dumps(log_data)
+        self._logger = logging.getLogger(__name__)
 
     async def info(self, message: str, **kwargs: Dict[str, Any]) -> None:
-        print(f"INFO: {self._format_log(message, **kwargs)}")
+        self._logger.info(message, extra={"fields": kwargs})
 
     async def error(
         self, message: str, error: Optional[Exception] = None, **kwargs: Dict[str, Any]
@@ -23,11 +24,10 @@ class AzureLogger:
             "error_type": error.__class__.__name__ if error else None,
             "error_message": str(error) if error else None,
         }
-        log_message = self._format_log(message, **kwargs, **error_details)
-        print(f"ERROR: {log_message}")
+        self._logger.error(message, extra={"fields": {**kwargs, **error_details}})
 
     async def warning(self, message: str, **kwargs: Dict[str, Any]) -> None:
-        print(f"WARNING: {self._format_log(message, **kwargs)}")
+        self._logger.warning(message, extra={"fields": kwargs})
 
     async def debug(self, message: str, **kwargs: Dict[str, Any]) -> None:
-        print(f"DEBUG: {self._format_log(message, **kwargs)}")
+        self._logger.debug(message, extra={"fields": kwargs})
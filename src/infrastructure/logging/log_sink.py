@@ -0,0 +1,222 @@
+import json
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, TextIO, Tuple
+
+# Attributes of every LogRecord; the others were passed with `extra=` and are
+# written as fields of the entry
+_RECORD_ATTRIBUTES = frozenset(
+    vars(logging.LogRecord("", 0, "", 0, "", None, None))
+) | {"message", "asctime", "fields", "suppressed"}
+
+_exception_formatter = logging.Formatter()
+
+
+class BatchingLogHandler(logging.Handler):
+    """
+    Logging handler that never blocks the caller on output. Records go into a
+    bounded in-memory queue that a background thread writes as JSON lines, in
+    batches, to stdout. Records arriving while the queue is full are dropped
+    and counted.
+
+    Repeated messages are rate limited by their template (the unformatted
+    `msg`), so an error logged for every row of a batch costs a few lines: past
+    `burst` records of a template per `window` seconds only one in
+    `sample_every` is written, with the number suppressed since the previous.
+    """
+
+    # Templates whose rate is tracked, least recently logged dropped first
+    MAX_TEMPLATES = 1024
+
+    def __init__(
+        self,
+        capacity: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 0.5,
+        burst: int = 20,
+        window: float = 10.0,
+        sample_every: int = 100,
+        stream: Optional[TextIO] = None,
+    ):
+        """
+        Args:
+            capacity: Records queued at most; further records are dropped
+            batch_size: Records written together at most
+            flush_interval: Seconds a record waits at most before being written
+            burst: Records of a template written per window before sampling
+            window: Seconds of a rate limiting window
+            sample_every: Past the burst, one record in this many is written
+            stream: Output; sys.stdout at the time of writing by default
+        """
+        super().__init__()
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.burst = burst
+        self.window = window
+        self.sample_every = max(1, sample_every)
+        self.stream = stream
+        self._queue: deque = deque()
+        # Template -> [window start, records in the window, suppressed and not
+        # yet reported]
+        self._templates: "OrderedDict[Tuple, List]" = OrderedDict()
+        self._stats = {
+            "written": 0,
+            "dropped": 0,
+            "suppressed": 0,
+            "batches": 0,
+            "write_errors": 0,
+        }
+        self._wake = threading.Event()
+        self._write_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def configure(
+        self,
+        level: str,
+        capacity: int,
+        batch_size: int,
+        flush_interval: float,
+        burst: int,
+        window: float,
+        sample_every: int,
+    ) -> None:
+        self.setLevel(level.upper())
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.burst = burst
+        self.window = window
+        self.sample_every = max(1, sample_every)
+
+    def install(self, logger_name: str = "src") -> None:
+        """Send the records of a logger tree (the app's modules) here only."""
+        logger = logging.getLogger(logger_name)
+        if self not in logger.handlers:
+            logger.addHandler(self)
+        logger.setLevel(self.level)
+        logger.propagate = False
+
+    def emit(self, record: logging.LogRecord) -> None:
+        # Called with the handler lock held (Handler.handle)
+        try:
+            if self._rate_limited(record):
+                return
+            if len(self._queue) >= self.capacity:
+                self._stats["dropped"] += 1
+                return
+            # Formatted now, so arguments changed later are logged as they were
+            # and tracebacks do not keep frames alive until the write
+            record.message = record.getMessage()
+            if record.exc_info:
+                record.exc_text = _exception_formatter.formatException(
+                    record.exc_info
+                )
+                record.exc_info = None
+            record.args = None
+            self._queue.append(record)
+        except Exception:
+            self.handleError(record)
+            return
+
+        if self._thread is None:
+            self._start()
+        if len(self._queue) >= self.batch_size:
+            self._wake.set()
+
+    def flush(self) -> None:
+        """Write everything queued so far, from the calling thread."""
+        self._drain()
+
+    def close(self) -> None:
+        self.flush()
+        super().close()
+
+    def stats(self) -> Dict:
+        return {
+            **self._stats,
+            "queued": len(self._queue),
+            "capacity": self.capacity,
+            "level": logging.getLevelName(self.level),
+        }
+
+    def _rate_limited(self, record: logging.LogRecord) -> bool:
+        key = (record.name, record.levelno, str(record.msg))
+        now = time.monotonic()
+        template = self._templates.get(key)
+        if template is None or now - template[0] >= self.window:
+            suppressed = template[2] if template is not None else 0
+            template = self._templates[key] = [now, 0, suppressed]
+            while len(self._templates) > self.MAX_TEMPLATES:
+                self._templates.popitem(last=False)
+        self._templates.move_to_end(key)
+        template[1] += 1
+        excess = template[1] - self.burst
+        if excess > 0 and excess % self.sample_every:
+            template[2] += 1
+            self._stats["suppressed"] += 1
+            return True
+        if template[2]:
+            record.suppressed = template[2]
+            template[2] = 0
+        return False
+
+    def _start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run, name="log-sink", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self._drain()
+
+    def _drain(self) -> None:
+        with self._write_lock:
+            while self._queue:
+                batch = []
+                while self._queue and len(batch) < self.batch_size:
+                    batch.append(self._queue.popleft())
+                lines = "".join(self._format(record) + "\n" for record in batch)
+                try:
+                    stream = self.stream or sys.stdout
+                    stream.write(lines)
+                    stream.flush()
+                except Exception:
+                    self._stats["write_errors"] += 1
+                    continue
+                self._stats["written"] += len(batch)
+                self._stats["batches"] += 1
+
+    @staticmethod
+    def _format(record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "timestamp": datetime.fromtimestamp(
+                record.created, timezone.utc
+            ).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.message,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        # Fields of the application Logger, without shadowing the ones above
+        for key, value in getattr(record, "fields", {}).items():
+            entry.setdefault(key, value)
+        if getattr(record, "suppressed", 0):
+            entry["suppressed"] = record.suppressed
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+# Handles the records of every module under `src`; the container applies the
+# settings and installs it
+log_sink = BatchingLogHandler()
@@ -0,0 +1,651 @@
+import bz2
+import functools
+import io
+import json
+import lzma
+import os
+import struct
+import zlib
+from abc import ABC, abstractmethod
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+
+from avro.datafile import DataFileReader, DataFileWriter
+from avro.io import DatumReader, DatumWriter
+import avro.schema
+
+try:
+    import snappy
+except ImportError:
+    snappy = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MAGIC = b"Obj\x01"
+SYNC_SIZE = 16
+
+
+class UnsupportedSchemaError(ValueError):
+    """The schema uses types the compiled engine does not generate code for."""
+
+
+class AvroBatchWriter(ABC):
+    """Writes an AVRO object container file from batches of records."""
+
+    #: Encoded record bytes before block compression
+    encoded_bytes: int = 0
+
+    @abstractmethod
+    def write_batch(self, records: List[Dict]) -> None:
+        pass
+
+    @abstractmethod
+    def flush(self) -> None:
+        """Write the buffered records as a block."""
+
+    def finish(self) -> None:
+        """
+        Write everything still buffered, including any file trailer, without
+        closing the stream; no records may be written afterwards.
+        """
+        self.flush()
+
+    @abstractmethod
+    def close(self) -> None:
+        """Flush and close the underlying stream."""
+
+
+class AvroBatchReader(ABC):
+    """Reads an AVRO object container file as batches of records."""
+
+    #: Header metadata (avro.schema, avro.codec and user keys)
+    metadata: Dict[str, str]
+
+    @abstractmethod
+    def iter_batches(self) -> Iterator[List[Dict]]:
+        pass
+
+
+class AvroEngine(ABC):
+    """Encoder/decoder of AVRO object container files used by the backups."""
+
+    name = ""
+
+    @abstractmethod
+    def open_writer(
+        self,
+        stream: BinaryIO,
+        schema: Dict,
+        codec: str = "null",
+        metadata: Optional[Dict[str, str]] = None,
+    ) -> AvroBatchWriter:
+        """
+        Args:
+            stream: Writable file object; closed by the writer's `close()`
+            schema: AVRO schema as a dict
+            codec: AVRO codec name (null, deflate, snappy, zstandard, bzip2, xz)
+            metadata: Extra header metadata
+        """
+
+    @abstractmethod
+    def open_reader(self, stream: BinaryIO) -> AvroBatchReader:
+        pass
+
+
+# ---------------------------------------------------------------------------
+# avro-python3 (reference implementation, used as the fallback)
+
+
+class CountingDatumWriter(DatumWriter):
+    """DatumWriter that counts the encoded (pre-compression) bytes it writes."""
+
+    def __init__(self, writer_schema=None):
+        super().__init__(writer_schema)
+        self.bytes_written = 0
+
+    def write(self, datum, encoder):
+        start = encoder.writer.tell()
+        super().write(datum, encoder)
+        self.bytes_written += encoder.writer.tell() - start
+
+
+class _AvroPython3Writer(AvroBatchWriter):
+    def __init__(self, stream, schema, codec, metadata):
+        self._datum_writer = CountingDatumWriter()
+        self._writer = DataFileWriter(
+            stream,
+            self._datum_writer,
+            avro.schema.parse(json.dumps(schema)),
+            codec=codec,
+        )
+        for key, value in (metadata or {}).items():
+            self._writer.SetMeta(key, value)
+
+    @property
+    def encoded_bytes(self) -> int:
+        return self._datum_writer.bytes_written
+
+    def write_batch(self, records: List[Dict]) -> None:
+        for record in records:
+            self._writer.append(record)
+
+    def flush(self) -> None:
+        self._writer.flush()
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+class _AvroPython3Reader(AvroBatchReader):
+    def __init__(self, stream, batch_size: int):
+        if not stream.seekable():
+            # DataFileReader seeks to find the file length
+            stream = io.BytesIO(stream.read())
+        self._reader = DataFileReader(stream, DatumReader())
+        self._batch_size = batch_size
+        self.metadata = {
+            key: value.decode("utf-8") for key, value in self._reader.meta.items()
+        }
+
+    def iter_batches(self) -> Iterator[List[Dict]]:
+        batch = []
+        for record in self._reader:
+            batch.append(record)
+            if len(batch) >= self._batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+class AvroPython3Engine(AvroEngine):
+    """The avro-python3 library: generic record-by-record DatumWriter/DatumReader."""
+
+    name = "avro-python3"
+
+    def __init__(self, batch_size: int = 5000):
+        self.batch_size = batch_size
+
+    def open_writer(self, stream, schema, codec="null", metadata=None):
+        return _AvroPython3Writer(stream, schema, codec, metadata)
+
+    def open_reader(self, stream):
+        return _AvroPython3Reader(stream, self.batch_size)
+
+
+# ---------------------------------------------------------------------------
+# Compiled engine
+#
+# For each record schema a Python function is generated that encodes (or
+# decodes) a whole batch of records with the field layout unrolled and the
+# zig-zag varint loops inlined. This removes the per-datum schema dispatch and
+# validation that dominate avro-python3, while producing the same bytes.
+
+_PRIMITIVES = {"null", "boolean", "int", "long", "float", "double", "bytes", "string"}
+
+
+def _field_type(field_type: Any) -> Tuple[str, bool, int]:
+    """(primitive type, nullable, index of null in the union)"""
+    if isinstance(field_type, list):
+        branches = [_field_type(branch)[0] for branch in field_type]
+        if len(branches) == 2 and "null" in branches:
+            null_index = branches.index("null")
+            return branches[1 - null_index], True, null_index
+        raise UnsupportedSchemaError(f"Unsupported union: {field_type}")
+    if isinstance(field_type, dict):
+        # Logical types are encoded as their underlying type
+        return _field_type(field_type["type"])
+    if field_type not in _PRIMITIVES:
+        raise UnsupportedSchemaError(f"Unsupported type: {field_type}")
+    return field_type, False, -1
+
+
+def _record_fields(schema: Dict) -> List[Tuple[str, str, bool, int]]:
+    if not isinstance(schema, dict) or schema.get("type") != "record":
+        raise UnsupportedSchemaError("Only record schemas are compiled")
+    return [(field["name"],) + _field_type(field["type"]) for field in schema["fields"]]
+
+
+def _emit_long(lines: List[str], indent: str, expression: str) -> None:
+    lines += [
+        f"{indent}n = {expression}",
+        f"{indent}n = (n << 1) ^ (n >> 63)",
+        f"{indent}while n > 0x7F:",
+        f"{indent}    append((n & 0x7F) | 0x80)",
+        f"{indent}    n >>= 7",
+        f"{indent}append(n)",
+    ]
+
+
+def _emit_encode(lines: List[str], indent: str, kind: str, value: str) -> None:
+    if kind in ("int", "long"):
+        _emit_long(lines, indent, value)
+    elif kind == "string":
+        lines.append(f"{indent}s = {value}.encode('utf-8')")
+        _emit_long(lines, indent, "len(s)")
+        lines.append(f"{indent}out += s")
+    elif kind == "bytes":
+        lines.append(f"{indent}s = {value}")
+        _emit_long(lines, indent, "len(s)")
+        lines.append(f"{indent}out += s")
+    elif kind == "boolean":
+        lines.append(f"{indent}append(1 if {value} else 0)")
+    elif kind == "float":
+        lines.append(f"{indent}out += pack_float({value})")
+    elif kind == "double":
+        lines.append(f"{indent}out += pack_double({value})")
+    # null: nothing to write
+
+
+def _emit_read_long(lines: List[str], indent: str, target: str) -> None:
+    lines += [
+        f"{indent}b = buf[pos]",
+        f"{indent}pos += 1",
+        f"{indent}n = b & 0x7F",
+        f"{indent}shift = 7",
+        f"{indent}while b & 0x80:",
+        f"{indent}    b = buf[pos]",
+        f"{indent}    pos += 1",
+        f"{indent}    n |= (b & 0x7F) << shift",
+        f"{indent}    shift += 7",
+        f"{indent}{target} = (n >> 1) ^ -(n & 1)",
+    ]
+
+
+def _emit_decode(lines: List[str], indent: str, kind: str, target: str) -> None:
+    if kind in ("int", "long"):
+        _emit_read_long(lines, indent, target)
+    elif kind in ("string", "bytes"):
+        _emit_read_long(lines, indent, "size")
+        value = "buf[pos:pos + size]"
+        if kind == "string":
+            value = f"str({value}, 'utf-8')"
+        lines += [f"{indent}{target} = {value}", f"{indent}pos += size"]
+    elif kind == "boolean":
+        lines += [f"{indent}{target} = buf[pos] == 1", f"{indent}pos += 1"]
+    elif kind == "float":
+        lines += [f"{indent}{target} = unpack_float(buf, pos)[0]", f"{indent}pos += 4"]
+    elif kind == "double":
+        lines += [f"{indent}{target} = unpack_double(buf, pos)[0]", f"{indent}pos += 8"]
+    else:
+        lines.append(f"{indent}{target} = None")
+
+
+_NAMESPACE = {
+    "pack_float": struct.Struct("<f").pack,
+    "pack_double": struct.Struct("<d").pack,
+    "unpack_float": struct.Struct("<f").unpack_from,
+    "unpack_double": struct.Struct("<d").unpack_from,
+}
+
+
+@functools.lru_cache(maxsize=64)
+def _compile(schema_json: str) -> Tuple[Callable, Callable]:
+    fields = _record_fields(json.loads(schema_json))
+
+    encode = ["def encode_batch(records, out):", "    append = out.append", "    for r in records:"]
+    decode = ["def decode_block(buf, count):", "    pos = 0", "    records = []", "    for _ in range(count):"]
+    for index, (name, kind, nullable, null_index) in enumerate(fields):
+        value, target = f"v{index}", f"f{index}"
+        encode.append(f"        {value} = r[{name!r}]")
+        if nullable:
+            # Union branch index, zig-zag encoded: 0 -> 0, 1 -> 2
+            encode += [
+                f"        if {value} is None:",
+                f"            append({2 * null_index})",
+                "        else:",
+                f"            append({2 * (1 - null_index)})",
+            ]
+            _emit_encode(encode, " " * 12, kind, value)
+
+            _emit_read_long(decode, " " * 8, "branch")
+            decode.append(f"        if branch == {null_index}:")
+            decode.append(f"            {target} = None")
+            decode.append("        else:")
+            _emit_decode(decode, " " * 12, kind, target)
+        else:
+            _emit_encode(encode, " " * 8, kind, value)
+            _emit_decode(decode, " " * 8, kind, target)
+
+    record = ", ".join(f"{name!r}: f{index}" for index, (name, *_) in enumerate(fields))
+    decode += [f"        records.append({{{record}}})", "    return records"]
+
+    namespace = dict(_NAMESPACE)
+    exec("\n".join(encode), namespace)
+    exec("\n".join(decode), namespace)
+    return namespace["encode_batch"], namespace["decode_block"]
+
+
+def compile_schema(schema: Dict) -> Tuple[Callable, Callable]:
+    """
+    Generated (encode_batch, decode_block) functions for a record schema.
+    Compiled once per schema and cached.
+
+    Raises:
+        UnsupportedSchemaError: For schemas other than flat records of
+            primitives and nullable primitives
+    """
+    return _compile(json.dumps(schema, sort_keys=True))
+
+
+def _write_long(out: bytearray, value: int) -> None:
+    value = (value << 1) ^ (value >> 63)
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_long(stream: BinaryIO) -> Optional[int]:
+    """Read a zig-zag varint from a stream; None at end of stream."""
+    shift = result = 0
+    while True:
+        byte = stream.read(1)
+        if not byte:
+            if shift:
+                raise EOFError("Truncated AVRO long")
+            return None
+        b = byte[0]
+        result |= (b & 0x7F) << shift
+        if not b & 0x80:
+            return (result >> 1) ^ -(result & 1)
+        shift += 7
+
+
+def _read_exact(stream: BinaryIO, size: int) -> bytes:
+    data = stream.read(size)
+    if len(data) != size:
+        raise EOFError("Truncated AVRO container file")
+    return data
+
+
+def _compress(codec: str, data: bytes) -> bytes:
+    if codec == "null":
+        return data
+    if codec == "deflate":
+        compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+        return compressor.compress(data) + compressor.flush()
+    if codec == "snappy" and snappy is not None:
+        return snappy.compress(data) + struct.pack(">I", zlib.crc32(data) & 0xFFFFFFFF)
+    if codec == "zstandard" and zstandard is not None:
+        return zstandard.ZstdCompressor().compress(data)
+    if codec == "bzip2":
+        return bz2.compress(data)
+    if codec == "xz":
+        return lzma.compress(data)
+    raise ValueError(f"Unsupported codec: {codec}")
+
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    if codec == "null":
+        return data
+    if codec == "deflate":
+        return zlib.decompress(data, -15)
+    if codec == "snappy" and snappy is not None:
+        uncompressed = snappy.decompress(data[:-4])
+        if struct.unpack(">I", data[-4:])[0] != zlib.crc32(uncompressed) & 0xFFFFFFFF:
+            raise ValueError("Snappy block checksum mismatch")
+        return uncompressed
+    if codec == "zstandard" and zstandard is not None:
+        # Frames written by streaming compressors carry no content size
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    if codec == "bzip2":
+        return bz2.decompress(data)
+    if codec == "xz":
+        return lzma.decompress(data)
+    raise ValueError(f"Unsupported codec: {codec}")
+
+
+class _CompiledWriter(AvroBatchWriter):
+    def __init__(self, stream, schema, codec, metadata, encode_batch, block_size):
+        self._stream = stream
+        self._codec = codec
+        self._encode_batch = encode_batch
+        self._block_size = block_size
+        self._sync_marker = os.urandom(SYNC_SIZE)
+        self._buffer = bytearray()
+        self._block_count = 0
+        self.encoded_bytes = 0
+
+        meta = {"avro.schema": json.dumps(schema), "avro.codec": codec, **(metadata or {})}
+        header = bytearray(MAGIC)
+        _write_long(header, len(meta))
+        for key, value in meta.items():
+            for item in (key.encode("utf-8"), value.encode("utf-8")):
+                _write_long(header, len(item))
+                header += item
+        _write_long(header, 0)
+        header += self._sync_marker
+        self._stream.write(bytes(header))
+
+    def write_batch(self, records: List[Dict]) -> None:
+        start = len(self._buffer)
+        self._encode_batch(records, self._buffer)
+        self.encoded_bytes += len(self._buffer) - start
+        self._block_count += len(records)
+        if len(self._buffer) >= self._block_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._block_count:
+            return
+        data = _compress(self._codec, bytes(self._buffer))
+        block = bytearray()
+        _write_long(block, self._block_count)
+        _write_long(block, len(data))
+        self._stream.write(bytes(block))
+        self._stream.write(data)
+        self._stream.write(self._sync_marker)
+        self._buffer.clear()
+        self._block_count = 0
+
+    def close(self) -> None:
+        self.flush()
+        self._stream.close()
+
+
+class _CompiledReader(AvroBatchReader):
+    def __init__(self, stream, decode_block, codec, sync_marker, metadata):
+        self._stream = stream
+        self._decode_block = decode_block
+        self._codec = codec
+        self._sync_marker = sync_marker
+        self.metadata = metadata
+
+    def iter_batches(self) -> Iterator[List[Dict]]:
+        while True:
+            count = _read_long(self._stream)
+            if count is None:
+                return
+            size = _read_long(self._stream)
+            data = _decompress(self._codec, _read_exact(self._stream, size))
+            if _read_exact(self._stream, SYNC_SIZE) != self._sync_marker:
+                raise ValueError("Invalid AVRO sync marker")
+            if count:
+                yield self._decode_block(data, count)
+
+
+class CompiledAvroEngine(AvroEngine):
+    """
+    AVRO engine with encoders and decoders generated per schema.
+
+    Whole batches are encoded into a single block buffer and whole blocks are
+    decoded at once. The files are standard object container files, readable
+    by avro-python3 and any other AVRO implementation, and every file those
+    write is readable here. Schemas the generator does not cover (nested
+    records, arrays, maps, enums, fixed) go to the avro-python3 engine.
+    """
+
+    name = "compiled"
+
+    def __init__(
+        self,
+        block_size: int = 64 * 1024,
+        fallback: Optional[AvroEngine] = None,
+    ):
+        """
+        Args:
+            block_size: Encoded bytes buffered before a block is written
+            fallback: Engine used for schemas that cannot be compiled
+        """
+        self.block_size = block_size
+        self.fallback = fallback or AvroPython3Engine()
+
+    def open_writer(self, stream, schema, codec="null", metadata=None):
+        try:
+            encode_batch, _ = compile_schema(schema)
+        except UnsupportedSchemaError:
+            return self.fallback.open_writer(stream, schema, codec, metadata)
+        return _CompiledWriter(stream, schema, codec, metadata, encode_batch, self.block_size)
+
+    def open_reader(self, stream):
+        header = _RecordingReader(stream)
+        if _read_exact(header, len(MAGIC)) != MAGIC:
+            raise ValueError("Not an AVRO object container file")
+        metadata = {}
+        while True:
+            count = _read_long(header)
+            if not count:
+                break
+            if count < 0:
+                # Negative counts are followed by the block size in bytes
+                _read_long(header)
+                count = -count
+            for _ in range(count):
+                key = _read_exact(header, _read_long(header)).decode("utf-8")
+                metadata[key] = _read_exact(header, _read_long(header)).decode("utf-8")
+        sync_marker = _read_exact(header, SYNC_SIZE)
+
+        try:
+            _, decode_block = compile_schema(json.loads(metadata["avro.schema"]))
+        except UnsupportedSchemaError:
+            if stream.seekable():
+                stream.seek(0)
+            else:
+                stream = io.BytesIO(bytes(header.data) + stream.read())
+            return self.fallback.open_reader(stream)
+        return _CompiledReader(
+            stream,
+            decode_block,
+            metadata.get("avro.codec", "null"),
+            sync_marker,
+            metadata,
+        )
+
+
+class _RecordingReader:
+    """Keeps the bytes read through it, to hand the header to the fallback."""
+
+    def __init__(self, stream: BinaryIO):
+        self.stream = stream
+        self.data = bytearray()
+
+    def read(self, size: int) -> bytes:
+        chunk = self.stream.read(size)
+        self.data += chunk
+        return chunk
+
+
+AVRO_ENGINES = {
+    CompiledAvroEngine.name: CompiledAvroEngine,
+    AvroPython3Engine.name: AvroPython3Engine,
+}
+
+
+def get_avro_engine(name: str = CompiledAvroEngine.name) -> AvroEngine:
+    """
+    Raises:
+        ValueError: If the engine name is unknown
+    """
+    if name not in AVRO_ENGINES:
+        raise ValueError(
+            f"Unsupported AVRO engine '{name}', expected one of {sorted(AVRO_ENGINES)}"
+        )
+    return AVRO_ENGINES[name]()
+
+
+if __name__ == "__main__":
+    # Benchmark and compatibility check of the engines on synthetic employees:
+    #   python -m src.infrastructure.persistance.avro_engine
+    import datetime
+    import random
+    import time
+
+    from src.infrastructure.persistance.backup_format import (
+        CODECS,
+        SCHEMAS_V2,
+        resolve_codec,
+    )
+
+    schema = SCHEMAS_V2["employees"]
+    start = datetime.datetime(2021, 1, 1)
+    records = [
+        {
+            "id": i,
+            "name": f"Employee {i} {'ñ' * (i % 3)}",
+            "datetime": int(
+                (start + datetime.timedelta(seconds=random.randint(0, 31_536_000))).timestamp()
+                * 1000
+            ),
+            "department_id": random.randint(1, 12),
+            "job_id": random.randint(1, 180),
+        }
+        for i in range(1, 200_001)
+    ]
+    batches = [records[i:i + 5000] for i in range(0, len(records), 5000)]
+    engines = [AvroPython3Engine(), CompiledAvroEngine()]
+
+    def write(engine, codec):
+        stream = io.BytesIO()
+        stream.close = lambda: None  # keep the buffer readable after close()
+        writer = engine.open_writer(stream, schema, codec, {"etl.schema_version": "2"})
+        for batch in batches:
+            writer.write_batch(batch)
+        writer.close()
+        return stream.getvalue()
+
+    def read(engine, data):
+        reader = engine.open_reader(io.BytesIO(data))
+        return [record for batch in reader.iter_batches() for record in batch]
+
+    # Same record encoding as the reference implementation, byte for byte
+    from avro.io import BinaryEncoder, DatumWriter
+
+    reference = io.BytesIO()
+    datum_writer = DatumWriter(avro.schema.parse(json.dumps(schema)))
+    encoder = BinaryEncoder(reference)
+    for record in records[:10_000]:
+        datum_writer.write(record, encoder)
+    compiled = bytearray()
+    compile_schema(schema)[0](records[:10_000], compiled)
+    assert bytes(compiled) == reference.getvalue(), "encoded records differ"
+
+    print(f"{len(records)} records")
+    print(f"{'codec':<9}{'engine':<14}{'bytes':>10}{'write s':>9}{'read s':>8}{'speedup':>9}")
+    for codec in CODECS:
+        try:
+            avro_codec = resolve_codec(codec)
+        except ValueError as e:
+            print(f"{codec:<9}skipped: {e}")
+            continue
+        baseline = None
+        files = {}
+        for engine in engines:
+            started = time.perf_counter()
+            data = write(engine, avro_codec)
+            write_seconds = time.perf_counter() - started
+            started = time.perf_counter()
+            assert read(engine, data) == records
+            read_seconds = time.perf_counter() - started
+            files[engine.name] = data
+            total = write_seconds + read_seconds
+            baseline = baseline or total
+            print(
+                f"{codec:<9}{engine.name:<14}{len(data):>10}"
+                f"{write_seconds:>9.2f}{read_seconds:>8.2f}{baseline / total:>8.1f}x"
+            )
+        # Files are interchangeable between the engines
+        assert read(engines[0], files["compiled"]) == records
+        assert read(engines[1], files["avro-python3"]) == records
@@ -1,16 +1,49 @@
 from datetime import datetime, timezone
-from typing import Optional, List, Dict
-import avro.schema
-from avro.datafile import DataFileWriter, DataFileReader
-from avro.io import DatumWriter, DatumReader
-from azure.storage.blob import BlobServiceClient
-import pyodbc
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+import asyncio
+import hashlib
 import json
+import logging
+import math
+import threading
+import time
+import uuid
+from azure.core import MatchConditions
+from azure.core.exceptions import (
+    ResourceExistsError,
+    ResourceModifiedError,
+    ResourceNotFoundError,
+)
 import os
-from pathlib import Path
 
 from src.domain.exceptions.domain_exceptions import BackupError, RestoreError
 from src.application.interfaces.backup_repository import BackupRepository
+from src.infrastructure.azure.blob_transfer import BlobTransferEngine
+from src.infrastructure.db.bulk_load import AzureSQLBulkLoad
+from src.infrastructure.db.connection import connect
+from src.infrastructure.db.hires_aggregate import AzureSQLHiresAggregate
+from src.infrastructure.db.snapshot import AzureSQLSnapshot
+from src.infrastructure.db.executor import DatabaseExecutor, OperationHandle
+from src.infrastructure.persistance import backup_format
+from src.infrastructure.persistance.avro_engine import AvroEngine, CompiledAvroEngine
+from src.infrastructure.persistance.parquet_engine import ParquetEngine
+
+if TYPE_CHECKING:
+    from azure.storage.blob import BlobServiceClient
+
+logger = logging.getLogger(__name__)
 
 
 class AzureBackupRepository(BackupRepository):
@@ -19,201 +52,1611 @@ class AzureBackupRepository(BackupRepository):
     Supports backing up and restoring three main tables: employees, departments, and jobs.
     """
 
-    # Define AVRO schemas for each table structure
-    SCHEMAS = {
-        "employees": {
-            "name": "Employee",
-            "type": "record",
-            "fields": [
-                {"name": "id", "type": "int"},
-                {"name": "name", "type": "string"},
-                {"name": "datetime", "type": "string"},
-                {"name": "department_id", "type": "int"},
-                {"name": "job_id", "type": "int"},
-            ],
-        },
-        "departments": {
-            "name": "Department",
-            "type": "record",
-            "fields": [
-                {"name": "id", "type": "int"},
-                {"name": "department", "type": "string"},
-            ],
-        },
-        "jobs": {
-            "name": "Job",
-            "type": "record",
-            "fields": [
-                {"name": "id", "type": "int"},
-                {"name": "job", "type": "string"},
-            ],
-        },
-    }
+    # AVRO schemas of the original (version 1) backup layout
+    SCHEMAS = backup_format.SCHEMAS_V1
+
+    # Whole-dataset restores load each group concurrently, in FK order
+    DATASET_PHASES = (("departments", "jobs"), ("employees",))
+
+    # Per-table catalogs live outside the table prefixes
+    CATALOG_PREFIX = "_catalog"
+
+    # Backup metadata recorded in the catalog
+    CATALOG_FIELDS = (
+        "format",
+        "kind",
+        "parent_id",
+        "base_id",
+        "chain_length",
+        "compacted_from",
+        "signature",
+        "watermark",
+        "rows",
+        "min_id",
+        "max_id",
+        "schema_version",
+        "codec",
+        "checksum",
+        "seconds",
+        "stored_bytes",
+        "partitions",
+        "backup_set",
+    )
 
-    def __init__(self, blob_connection_string: str, container_name: str = "backups"):
+    # Manifests of backup sets, the tables backed up together from one snapshot
+    SET_PREFIX = "_sets"
+
+    # Tables referenced by a foreign key cannot be truncated on SQL Server
+    REFERENCED_TABLES = ("departments", "jobs")
+
+    def __init__(
+        self,
+        blob_connection_string: str,
+        container_name: str = "backups",
+        executor: Optional[DatabaseExecutor] = None,
+        operation_timeout: Optional[float] = None,
+        connection_factory: Optional[Callable[[], Any]] = None,
+        truncate_statement: str = "TRUNCATE TABLE {table}",
+        fetch_size: int = 5000,
+        transfer_engine: Optional[BlobTransferEngine] = None,
+        codec: str = "deflate",
+        avro_engine: Optional[AvroEngine] = None,
+        restore_batch_size: int = 10000,
+        bulk_load: Optional[Any] = None,
+        signature_statement: str = (
+            # SHA-256 of the rows' SHA-256 (of their JSON) in id order; unlike
+            # CHECKSUM_AGG, any edit changes it short of a hash collision
+            "SELECT COUNT_BIG(*), MAX(id), CONVERT(CHAR(64), HASHBYTES('SHA2_256', "
+            "STRING_AGG(CONVERT(NVARCHAR(MAX), row_hash, 2), '') "
+            "WITHIN GROUP (ORDER BY id)), 2) "
+            "FROM {table} CROSS APPLY (SELECT HASHBYTES('SHA2_256', (SELECT {columns} "
+            "FOR JSON PATH, WITHOUT_ARRAY_WRAPPER, INCLUDE_NULL_VALUES)) AS row_hash) r"
+        ),
+        max_chain_length: int = 10,
+        partitions: int = 1,
+        restore_parallelism: int = 4,
+        catalog_ttl: float = 30.0,
+        catalog_segment_size: int = 500,
+        file_format: str = "avro",
+        parquet_row_group_size: int = 65536,
+        snapshot: Optional[Any] = None,
+        hires_aggregate: Optional[Any] = None,
+        lazy_init: bool = False,
+    ):
         """
         Initialize the backup repository.
 
         Args:
             blob_connection_string: Azure Blob Storage connection string
             container_name: Name of the container for storing backups
+            executor: Executor running the blocking database and blob work
+            operation_timeout: Seconds allowed for a whole backup or restore
+            connection_factory: Returns a DB-API connection to the source database
+                (defaults to pyodbc with AZURE_SQL_CONNECTION_STRING)
+            truncate_statement: Statement clearing a table before a restore
+            fetch_size: Rows fetched from the database per round trip
+            transfer_engine: Parallel block transfers for backup blobs
+            codec: Default AVRO block compression (null, deflate, snappy or zstd)
+            avro_engine: Encoder/decoder of the AVRO files
+            restore_batch_size: Rows inserted per executemany during a restore
+            bulk_load: Disables and rebuilds indexes and FK checks around a
+                whole-dataset restore (defaults to the Azure SQL statements)
+            signature_statement: Query returning the row count, highest id and
+                a digest of {columns} of a table, to detect changes; unchanged
+                tables are not backed up again, so it must not miss edits
+            max_chain_length: Incremental backups on top of a full backup before
+                the chain is compacted into a new full backup (0 disables it)
+            partitions: Default number of id ranges a backup is split into, each
+                read and encoded concurrently over its own connection
+            restore_parallelism: Partitions of a backup loaded at once on restore
+            catalog_ttl: Seconds a table's backup catalog is served from memory
+            catalog_segment_size: Oldest catalog entries moved together into an
+                archived segment once the catalog holds twice as many (0 disables it)
+            file_format: Default backup file format (avro or parquet)
+            parquet_row_group_size: Rows per Parquet row group
+            snapshot: Opens transactions reading several tables as of one point
+                in time (defaults to the Azure SQL statements)
+            hires_aggregate: Rebuilds the hires aggregate after employees are
+                restored (defaults to the Azure SQL statements)
+            lazy_init: Create the blob client and check the backup container on
+                first use instead of here
         """
-        self.blob_service_client = BlobServiceClient.from_connection_string(
-            blob_connection_string
-        )
-        self.sql_connection_string = os.getenv(
-            "AZURE_SQL_CONNECTION_STRING"
-        )  # Use the environment variable
-        if not self.sql_connection_string:
-            raise ValueError(
-                "AZURE_SQL_CONNECTION_STRING is not set in environment variables"
-            )
+        self.executor = executor or DatabaseExecutor()
+        self.operation_timeout = operation_timeout
+        self.truncate_statement = truncate_statement
+        self.fetch_size = fetch_size
+        self.transfer_engine = transfer_engine or BlobTransferEngine()
+        backup_format.resolve_codec(codec)
+        self.codec = codec
+        self.avro_engine = avro_engine or CompiledAvroEngine()
+        self.restore_batch_size = restore_batch_size
+        self.bulk_load = bulk_load or AzureSQLBulkLoad()
+        self.snapshot = snapshot or AzureSQLSnapshot()
+        self.hires_aggregate = hires_aggregate or AzureSQLHiresAggregate()
+        self.signature_statement = signature_statement
+        self.max_chain_length = max_chain_length
+        self.partitions = max(1, partitions)
+        self.restore_parallelism = max(1, restore_parallelism)
+        self.catalog_ttl = catalog_ttl
+        self.catalog_segment_size = catalog_segment_size
+        self.file_format = backup_format.resolve_format(file_format)
+        self.parquet_row_group_size = parquet_row_group_size
+        self._parquet_engine: Optional[ParquetEngine] = None
+        self._catalog_cache: Dict[str, Tuple[float, Dict]] = {}
+        self._catalog_lock = threading.Lock()
+        # Archived segments are never modified, so they are cached for good
+        self._segment_cache: Dict[str, List[Dict]] = {}
+        self.blob_connection_string = blob_connection_string
+        self._blob_service_client: Optional["BlobServiceClient"] = None
+        self._blob_client_lock = threading.Lock()
+        if connection_factory is None:
+            self.sql_connection_string = os.getenv(
+                "AZURE_SQL_CONNECTION_STRING"
+            )  # Use the environment variable
+            if not self.sql_connection_string:
+                raise ValueError(
+                    "AZURE_SQL_CONNECTION_STRING is not set in environment variables"
+                )
+        self.connection_factory = connection_factory or self._connect_sql_database
         self.container_name = container_name
-        self._ensure_container_exists()
+        if not lazy_init:
+            self._ensure_container_exists()
+
+    @property
+    def blob_service_client(self) -> "BlobServiceClient":
+        if self._blob_service_client is None:
+            self._ensure_container_exists()
+        return self._blob_service_client
+
+    def _connect_sql_database(self):
+        return connect(self.sql_connection_string)
 
     def _ensure_container_exists(self):
-        """Ensure the backup container exists in Azure Blob Storage"""
-        try:
-            container_client = self.blob_service_client.get_container_client(
-                self.container_name
+        """
+        Create the blob client and ensure the backup container exists in Azure
+        Blob Storage, once
+        """
+        with self._blob_client_lock:
+            if self._blob_service_client is not None:
+                return
+            # The blob SDK is imported with the first client, not with the app
+            from azure.storage.blob import BlobServiceClient
+
+            client = BlobServiceClient.from_connection_string(
+                self.blob_connection_string
             )
-            if not container_client.exists():
-                container_client.create_container()
-        except Exception as e:
-            raise BackupError(f"Failed to ensure container exists: {str(e)}")
+            try:
+                container_client = client.get_container_client(self.container_name)
+                if not container_client.exists():
+                    container_client.create_container()
+            except Exception as e:
+                raise BackupError(f"Failed to ensure container exists: {str(e)}")
+            self._blob_service_client = client
 
-    def _ensure_temp_directory(self, file_path: str):
-        """Ensure the directory for the temp file exists."""
-        directory = os.path.dirname(file_path)
-        Path(directory).mkdir(parents=True, exist_ok=True)
+    async def create_backup(
+        self,
+        table_name: str,
+        codec: Optional[str] = None,
+        incremental: bool = False,
+        partitions: Optional[int] = None,
+        file_format: Optional[str] = None,
+    ) -> Optional[Dict]:
+        return await self.executor.run(
+            self._create_backup,
+            table_name,
+            codec or self.codec,
+            incremental,
+            partitions or self.partitions,
+            file_format or self.file_format,
+            timeout=self.operation_timeout,
+            operation=f"backup.{table_name}",
+        )
 
-    async def create_backup(self, table_name: str) -> Optional[str]:
+    def _create_backup(
+        self,
+        handle: OperationHandle,
+        table_name: str,
+        codec: str,
+        incremental: bool = False,
+        partitions: int = 1,
+        file_format: str = "avro",
+    ) -> Optional[Dict]:
         try:
             if table_name not in self.SCHEMAS:
                 raise BackupError(f"No schema defined for table: {table_name}")
+            file_format = backup_format.resolve_format(file_format)
+            extension = backup_format.FORMATS[file_format]
 
-            timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
-            backup_name = f"{table_name}/{timestamp}.avro"
-            data = self._fetch_table_data(table_name)
-            schema = avro.schema.parse(json.dumps(self.SCHEMAS[table_name]))
-            temp_file_path = f"/tmp/{backup_name}"
+            head = self._chain_head(table_name)
+            with self.connection_factory() as conn:
+                cursor = handle.track(conn.cursor())
+                signature = self._table_signature(cursor, table_name)
+                # The head only stands in for this backup when it was written in
+                # the requested format and codec
+                if (
+                    head
+                    and head.get("signature") == signature
+                    and head.get("format", "avro") == file_format
+                    and head.get("codec") == codec
+                ):
+                    logger.info(
+                        "%s unchanged since backup %s, skipping", table_name, head["id"]
+                    )
+                    return {"backup_id": head["id"], "skipped": True}
 
-            # Ensure the temp directory exists
-            self._ensure_temp_directory(temp_file_path)
+                # An incremental only holds rows past the watermark, which is
+                # valid while every row up to it is exactly as backed up
+                chain = {"kind": "full", "chain_length": 0}
+                after_id = None
+                if (
+                    incremental
+                    and head
+                    and head.get("watermark")
+                    and self._table_signature(
+                        cursor, table_name, int(head["watermark"])
+                    )
+                    == head["signature"]
+                ):
+                    after_id = int(head["watermark"])
+                    chain = {
+                        "kind": "incremental",
+                        "base_id": head.get("base_id") or head["id"],
+                        "parent_id": head["id"],
+                        "chain_length": int(head.get("chain_length", 0)) + 1,
+                    }
+                elif incremental:
+                    logger.info(
+                        "No valid base for an incremental backup of %s, "
+                        "taking a full backup",
+                        table_name,
+                    )
 
-            with DataFileWriter(
-                open(temp_file_path, "wb"), DatumWriter(), schema
-            ) as writer:
-                for record in data:
-                    writer.append(self._format_record(record, table_name))
+                # The backup covers exactly the rows the signature was taken over
+                watermark = self._signature_max_id(signature)
+                low_id = after_id
+                if partitions > 1 and after_id is None:
+                    cursor.execute(f"SELECT MIN(id) FROM {table_name}")
+                    min_id = cursor.fetchone()[0]
+                    low_id = None if min_id is None else min_id - 1
 
-            with open(temp_file_path, "rb") as data:
-                blob_client = self.blob_service_client.get_blob_client(
-                    container=self.container_name, blob=backup_name
+            timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S_%f")
+            name = f"{table_name}/{timestamp}"
+            if chain["kind"] == "incremental":
+                name += ".incr"
+            chain_metadata = {
+                **chain,
+                "signature": signature,
+                "watermark": "" if watermark is None else watermark,
+            }
+            ranges = self._partition_ranges(low_id, watermark, partitions)
+            if len(ranges) > 1:
+                result = self._write_partitioned_backup(
+                    handle, table_name, name, extension, codec, ranges, chain_metadata
+                )
+            else:
+                result = self._write_backup(
+                    table_name,
+                    f"{name}{extension}",
+                    codec,
+                    self._iter_table_batches(
+                        table_name, handle, after_id=after_id, until_id=watermark
+                    ),
+                    chain_metadata,
                 )
-                blob_client.upload_blob(data)
+            self._record_in_catalog(table_name, result)
 
-            return backup_name
+            if (
+                chain["kind"] == "incremental"
+                and self.max_chain_length
+                and chain["chain_length"] >= self.max_chain_length
+            ):
+                compacted = self._compact_chain(handle, result["backup_id"], codec)
+                result["compacted_into"] = compacted["backup_id"]
+            return result
         except Exception as e:
             raise BackupError(f"Failed to create backup: {str(e)}")
 
-    def _fetch_table_data(self, table_name: str) -> List[Dict]:
+    def _write_backup(
+        self,
+        table_name: str,
+        backup_name: str,
+        codec: str,
+        batches: Iterable[List[Dict]],
+        chain_metadata: Dict,
+    ) -> Dict:
         """
-        Fetch all records from the specified SQL table.
+        Encode batches of database records into a new backup blob, in the
+        format given by the extension of its name.
 
         Args:
-            table_name: Name of the table to fetch
+            table_name: Table the records belong to
+            backup_name: Name of the blob to create
+            codec: Block (AVRO) or column chunk (Parquet) compression
+            batches: Batches of records, as returned by the database
+            chain_metadata: Kind, parent, watermark and signature of the backup
 
         Returns:
-            List of dictionaries containing table records
+            Dictionary with the backup id and its metadata
         """
+        started_at = time.monotonic()
+        avro_codec = backup_format.resolve_codec(codec)
+        blob_client = self.blob_service_client.get_blob_client(
+            container=self.container_name, blob=backup_name
+        )
+
+        # AVRO blocks or Parquet row groups are encoded as rows arrive and
+        # uploaded as staged blob blocks; the blob only appears once the writer
+        # commits on close
+        engine = self._engine_for(backup_name)
+        blob_writer = self.transfer_engine.open_writer(blob_client)
+        writer = engine.open_writer(
+            blob_writer,
+            backup_format.SCHEMAS[backup_format.SCHEMA_VERSION][table_name],
+            avro_codec,
+            {backup_format.SCHEMA_VERSION_KEY: str(backup_format.SCHEMA_VERSION)},
+        )
+        rows = 0
+        min_id = max_id = None
         try:
-            with pyodbc.connect(self.sql_connection_string) as conn:
+            for batch in batches:
+                writer.write_batch(
+                    [self._format_record(record, table_name) for record in batch]
+                )
+                rows += len(batch)
+                if batch:
+                    ids = [record["id"] for record in batch]
+                    low, high = min(ids), max(ids)
+                    min_id = low if min_id is None else min(min_id, low)
+                    max_id = high if max_id is None else max(max_id, high)
+            writer.finish()
+        except Exception:
+            blob_writer.abort()
+            raise
+
+        seconds = time.monotonic() - started_at
+        encoded_bytes = writer.encoded_bytes
+        stored_bytes = blob_writer.tell()
+        metadata = {
+            **chain_metadata,
+            "rows": rows,
+            "min_id": min_id,
+            "max_id": max_id,
+            "format": backup_format.format_of(backup_name),
+            "codec": codec,
+            "engine": engine.name,
+            "schema_version": backup_format.SCHEMA_VERSION,
+            "checksum": f"md5:{blob_writer.content_md5}",
+            "encoded_bytes": encoded_bytes,
+            "stored_bytes": stored_bytes,
+            "compression_ratio": (
+                round(encoded_bytes / stored_bytes, 2) if stored_bytes else None
+            ),
+            "seconds": round(seconds, 3),
+            "rows_per_second": round(rows / seconds) if seconds else None,
+            "encoded_mib_per_second": (
+                round(encoded_bytes / (1024 * 1024) / seconds, 2) if seconds else None
+            ),
+        }
+        # Blob metadata values must be strings
+        blob_writer.metadata = {key: str(value) for key, value in metadata.items()}
+        writer.close()
+
+        return {"backup_id": backup_name, **metadata}
+
+    @staticmethod
+    def _partition_ranges(
+        after_id: Optional[int], until_id: Optional[int], partitions: int
+    ) -> List[Tuple[Optional[int], Optional[int]]]:
+        """
+        Split the ids in (after_id, until_id] into up to `partitions` ranges of
+        equal width, as (after_id, until_id) pairs.
+        """
+        if partitions <= 1 or after_id is None or until_id is None:
+            return [(after_id, until_id)]
+        step = max(1, math.ceil((until_id - after_id) / partitions))
+        return [
+            (low, min(low + step, until_id))
+            for low in range(after_id, until_id, step)
+        ]
+
+    def _write_partitioned_backup(
+        self,
+        handle: OperationHandle,
+        table_name: str,
+        name: str,
+        extension: str,
+        codec: str,
+        ranges: List[Tuple[Optional[int], Optional[int]]],
+        chain_metadata: Dict,
+    ) -> Dict:
+        """
+        Write one file per id range concurrently, each read over its own
+        connection, then a manifest listing them. The manifest is the backup id
+        and is only written once every partition is committed.
+        """
+        started_at = time.monotonic()
+        backup_name = f"{name}.parts.json"
+        with ThreadPoolExecutor(
+            max_workers=len(ranges), thread_name_prefix="backup-partition"
+        ) as pool:
+            futures = [
+                pool.submit(
+                    self._write_backup,
+                    table_name,
+                    f"{name}/part-{index:05d}{extension}",
+                    codec,
+                    self._iter_table_batches(
+                        table_name, handle, after_id=after_id, until_id=until_id
+                    ),
+                    {"partition_of": backup_name},
+                )
+                for index, (after_id, until_id) in enumerate(ranges)
+            ]
+        parts, errors = [], []
+        for future in futures:
+            try:
+                parts.append(future.result())
+            except Exception as e:
+                errors.append(e)
+        if errors:
+            for part in parts:
+                self.blob_service_client.get_blob_client(
+                    container=self.container_name, blob=part["backup_id"]
+                ).delete_blob()
+            raise errors[0]
+
+        seconds = time.monotonic() - started_at
+        rows = sum(part["rows"] for part in parts)
+        min_ids = [part["min_id"] for part in parts if part["min_id"] is not None]
+        max_ids = [part["max_id"] for part in parts if part["max_id"] is not None]
+        encoded_bytes = sum(part["encoded_bytes"] for part in parts)
+        stored_bytes = sum(part["stored_bytes"] for part in parts)
+        metadata = {
+            **chain_metadata,
+            "rows": rows,
+            "min_id": min(min_ids) if min_ids else None,
+            "max_id": max(max_ids) if max_ids else None,
+            "format": parts[0]["format"],
+            "codec": codec,
+            "engine": parts[0]["engine"],
+            "schema_version": backup_format.SCHEMA_VERSION,
+            # Digest of the partition digests, in partition order
+            "checksum": "md5:"
+            + hashlib.md5(
+                "".join(part["checksum"] for part in parts).encode()
+            ).hexdigest(),
+            "partitions": len(parts),
+            "encoded_bytes": encoded_bytes,
+            "stored_bytes": stored_bytes,
+            "compression_ratio": (
+                round(encoded_bytes / stored_bytes, 2) if stored_bytes else None
+            ),
+            "seconds": round(seconds, 3),
+            "rows_per_second": round(rows / seconds) if seconds else None,
+        }
+        manifest = {
+            "table_name": table_name,
+            "parts": [
+                {
+                    "id": part["backup_id"],
+                    "after_id": after_id,
+                    "until_id": until_id,
+                    "rows": part["rows"],
+                    "stored_bytes": part["stored_bytes"],
+                    "checksum": part["checksum"],
+                }
+                for part, (after_id, until_id) in zip(parts, ranges)
+            ],
+        }
+        self.blob_service_client.get_blob_client(
+            container=self.container_name, blob=backup_name
+        ).upload_blob(
+            json.dumps(manifest),
+            overwrite=True,
+            metadata={key: str(value) for key, value in metadata.items()},
+        )
+        logger.info(
+            "Backed up %s rows of %s in %s partitions in %.2fs",
+            rows,
+            table_name,
+            len(parts),
+            seconds,
+        )
+        return {"backup_id": backup_name, **metadata}
+
+    def _backup_blobs(self, backup_id: str) -> List[str]:
+        """AVRO blobs holding a backup: its partitions, or the backup itself."""
+        if not backup_id.endswith(".parts.json"):
+            return [backup_id]
+        manifest = json.loads(
+            self.transfer_engine.download_bytes(
+                self.blob_service_client.get_blob_client(
+                    container=self.container_name, blob=backup_id
+                )
+            )
+        )
+        return [part["id"] for part in manifest["parts"]]
+
+    def _table_signature(
+        self, cursor: Any, table_name: str, until_id: Optional[int] = None
+    ) -> str:
+        """
+        Row count, highest id and checksum of a table, optionally only over the
+        rows up to `until_id`. Equal signatures mean the rows are unchanged.
+        """
+        columns = [field["name"] for field in self.SCHEMAS[table_name]["fields"]]
+        query = self.signature_statement.format(
+            table=table_name, columns=", ".join(columns)
+        )
+        if until_id is None:
+            cursor.execute(query)
+        else:
+            cursor.execute(f"{query} WHERE id <= ?", (until_id,))
+        count, max_id, checksum = cursor.fetchone()
+        return f"{count}:{'' if max_id is None else max_id}:{checksum or 0}"
+
+    @staticmethod
+    def _signature_max_id(signature: str) -> Optional[int]:
+        max_id = signature.split(":")[1]
+        return int(max_id) if max_id else None
+
+    def _chain_head(self, table_name: str) -> Optional[Dict]:
+        """
+        Catalog entry of the newest backup of a table that records a signature,
+        or None if there is none (e.g. only backups made before change tracking).
+        """
+        catalog, _ = self._fetch_catalog(table_name)
+        for entry in reversed(catalog["backups"]):
+            if entry.get("signature") is not None:
+                return entry
+        return None
+
+    def _catalog_blob(self, table_name: str) -> Any:
+        return self.blob_service_client.get_blob_client(
+            container=self.container_name, blob=f"{self.CATALOG_PREFIX}/{table_name}.json"
+        )
+
+    def _fetch_catalog(self, table_name: str) -> Tuple[Dict, Optional[str]]:
+        """
+        Download the catalog of a table with its ETag, refreshing the cache.
+        Tables backed up before the catalog existed get one built from the
+        container listing (ETag None until it is first saved).
+        """
+        try:
+            downloader = self._catalog_blob(table_name).download_blob()
+            catalog = json.loads(downloader.readall())
+            etag = downloader.properties.etag
+        except ResourceNotFoundError:
+            catalog, etag = self._build_catalog(table_name), None
+        with self._catalog_lock:
+            self._catalog_cache[table_name] = (time.monotonic(), catalog)
+        return catalog, etag
+
+    def _read_catalog(self, table_name: str) -> Dict:
+        """Catalog of a table, served from memory for `catalog_ttl` seconds."""
+        with self._catalog_lock:
+            cached = self._catalog_cache.get(table_name)
+        if cached and time.monotonic() - cached[0] < self.catalog_ttl:
+            return cached[1]
+        return self._fetch_catalog(table_name)[0]
+
+    def _build_catalog(self, table_name: str) -> Dict:
+        container_client = self.blob_service_client.get_container_client(
+            self.container_name
+        )
+        backups = []
+        for blob in container_client.list_blobs(
+            name_starts_with=f"{table_name}/", include=["metadata"]
+        ):
+            metadata = blob.metadata or {}
+            if "partition_of" in metadata:
+                continue
+            entry = {
+                "id": blob.name,
+                "created_at": blob.creation_time.isoformat(),
+                "stored_bytes": blob.size,
+            }
+            for field in self.CATALOG_FIELDS:
+                value = metadata.get(field)
+                if value not in (None, "", "None"):
+                    entry[field] = self._parse_metadata_value(value)
+            backups.append(entry)
+        # Ordered by creation time like a recorded catalog; names start with the
+        # creation timestamp, which breaks ties
+        backups.sort(key=lambda entry: (self._created_at(entry), entry["id"]))
+        return {"table_name": table_name, "backups": backups}
+
+    @staticmethod
+    def _parse_metadata_value(value: str) -> Any:
+        # Blob metadata only holds strings; restore the numbers
+        for parse in (int, float):
+            try:
+                return parse(value)
+            except ValueError:
+                pass
+        return value
+
+    def _record_in_catalog(
+        self, table_name: str, result: Dict, created_at: Optional[datetime] = None
+    ) -> None:
+        """
+        Add a finished backup to the catalog of its table, in `created_at` order
+        (the time it is recorded by default).
+
+        The catalog is replaced in a single upload, conditional on the ETag it
+        was read with, so concurrent backups never lose each other's entries.
+        Past twice `catalog_segment_size` entries, the oldest are moved into an
+        archived segment blob so the catalog rewritten on every backup stays small.
+        """
+        fields = {
+            field: result[field]
+            for field in self.CATALOG_FIELDS
+            if result.get(field) is not None
+        }
+        blob_client = self._catalog_blob(table_name)
+        for _ in range(10):
+            catalog, etag = self._fetch_catalog(table_name)
+            # Timestamped on every attempt, so an entry retried after another
+            # writer's is still the newest
+            entry = {
+                "id": result["backup_id"],
+                "created_at": (created_at or datetime.now(timezone.utc)).isoformat(),
+                **fields,
+            }
+            # A catalog built from the listing may already hold this backup
+            backups = [
+                existing
+                for existing in catalog["backups"]
+                if existing["id"] != entry["id"]
+            ]
+            index = bisect_right(
+                [self._created_at(existing) for existing in backups],
+                self._created_at(entry),
+            )
+            backups.insert(index, entry)
+            catalog["backups"] = backups
+            segment = self._archive_oldest(table_name, catalog)
+            data = json.dumps(catalog)
+            try:
+                if etag is None:
+                    blob_client.upload_blob(data, overwrite=False)
+                else:
+                    blob_client.upload_blob(
+                        data,
+                        overwrite=True,
+                        etag=etag,
+                        match_condition=MatchConditions.IfNotModified,
+                    )
+            except (ResourceExistsError, ResourceModifiedError):
+                # Another backup updated the catalog first; re-read and retry
+                if segment:
+                    self._segment_blob(segment).delete_blob()
+                continue
+            with self._catalog_lock:
+                self._catalog_cache[table_name] = (time.monotonic(), catalog)
+            return
+        raise BackupError(f"Could not update the backup catalog of {table_name}")
+
+    @staticmethod
+    def _created_at(entry: Dict) -> datetime:
+        return datetime.fromisoformat(entry["created_at"])
+
+    def _archive_oldest(self, table_name: str, catalog: Dict) -> Optional[str]:
+        """
+        Move the oldest `catalog_segment_size` entries of a catalog holding
+        twice as many into a new segment blob; returns the segment's name.
+        """
+        size = self.catalog_segment_size
+        if not size or len(catalog["backups"]) < 2 * size:
+            return None
+        archived = catalog["backups"][:size]
+        # Unique per attempt, so a writer losing the ETag race cannot overwrite
+        # the segment of the one that won
+        name = f"{self.CATALOG_PREFIX}/{table_name}/{uuid.uuid4().hex}.json"
+        self._segment_blob(name).upload_blob(
+            json.dumps({"table_name": table_name, "backups": archived}),
+            overwrite=False,
+        )
+        catalog["backups"] = catalog["backups"][size:]
+        catalog.setdefault("segments", []).append(
+            {
+                "id": name,
+                "first": archived[0]["created_at"],
+                "last": archived[-1]["created_at"],
+                "count": len(archived),
+            }
+        )
+        return name
+
+    def _segment_blob(self, name: str) -> Any:
+        return self.blob_service_client.get_blob_client(
+            container=self.container_name, blob=name
+        )
+
+    def _read_segment(self, name: str) -> List[Dict]:
+        with self._catalog_lock:
+            cached = self._segment_cache.get(name)
+        if cached is None:
+            cached = json.loads(
+                self.transfer_engine.download_bytes(self._segment_blob(name))
+            )["backups"]
+            with self._catalog_lock:
+                self._segment_cache[name] = cached
+        return cached
+
+    def _resolve_backup_id(
+        self, table_name: str, as_of: Optional[datetime] = None
+    ) -> str:
+        """
+        Id of the latest backup of a table, or of the latest one created at or
+        before `as_of`, looked up in the catalog without listing the container.
+        Archived segments are only read when `as_of` predates the catalog's
+        entries at or before it.
+        """
+        catalog = self._fetch_catalog(table_name)[0]
+        backups = catalog["backups"]
+        if as_of is None:
+            if not backups:
+                raise RestoreError(f"No backup of {table_name}")
+            # Segments only ever hold entries older than the catalog's
+            return backups[-1]["id"]
+
+        if as_of.tzinfo is None:
+            as_of = as_of.replace(tzinfo=timezone.utc)
+        best = self._latest_as_of(backups, as_of)
+        for segment in reversed(catalog.get("segments", [])):
+            # Skip segments holding nothing at or before as_of that is newer
+            # than the best entry found so far
+            if datetime.fromisoformat(segment["first"]) > as_of or (
+                best
+                and datetime.fromisoformat(segment["last"]) <= self._created_at(best)
+            ):
+                continue
+            candidate = self._latest_as_of(self._read_segment(segment["id"]), as_of)
+            if candidate and (
+                best is None or self._created_at(candidate) > self._created_at(best)
+            ):
+                best = candidate
+        if best is None:
+            raise RestoreError(f"No backup of {table_name} as of {as_of.isoformat()}")
+        return best["id"]
+
+    def _catalog_entry(self, table_name: str, backup_id: str) -> Optional[Dict]:
+        """Catalog entry of a backup, archived or not, or None if not recorded."""
+        catalog = self._fetch_catalog(table_name)[0]
+        for entry in catalog["backups"]:
+            if entry["id"] == backup_id:
+                return entry
+        for segment in reversed(catalog.get("segments", [])):
+            for entry in self._read_segment(segment["id"]):
+                if entry["id"] == backup_id:
+                    return entry
+        return None
+
+    def _latest_as_of(self, entries: List[Dict], as_of: datetime) -> Optional[Dict]:
+        # Entries are kept ordered by creation time
+        index = bisect_right([self._created_at(entry) for entry in entries], as_of)
+        return entries[index - 1] if index else None
+
+    def _iter_table_batches(
+        self,
+        table_name: str,
+        handle: Optional[OperationHandle] = None,
+        after_id: Optional[int] = None,
+        until_id: Optional[int] = None,
+    ) -> Iterator[List[Dict]]:
+        """
+        Stream all records from the specified SQL table.
+
+        Rows are pulled `fetch_size` at a time, so only one batch is held in
+        memory regardless of the table size.
+
+        Args:
+            table_name: Name of the table to fetch
+            handle: Handle of the running operation, used to cancel the query
+            after_id: Only rows with a greater id
+            until_id: Only rows with an id up to this one
+
+        Yields:
+            Batches of dictionaries containing table records
+        """
+        conditions, params = [], []
+        if after_id is not None:
+            conditions.append("id > ?")
+            params.append(after_id)
+        if until_id is not None:
+            conditions.append("id <= ?")
+            params.append(until_id)
+        query = f"SELECT * FROM {table_name}"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        try:
+            with self.connection_factory() as conn:
                 cursor = conn.cursor()
-                cursor.execute(f"SELECT * FROM {table_name}")
-                columns = [column[0] for column in cursor.description]
-                return [dict(zip(columns, row)) for row in cursor.fetchall()]
+                if handle:
+                    handle.track(cursor)
+                if params:
+                    cursor.execute(query, tuple(params))
+                else:
+                    cursor.execute(query)
+                yield from self._iter_cursor_batches(cursor, handle)
         except Exception as e:
             raise BackupError(f"Failed to fetch table data: {str(e)}")
 
-    def _format_record(self, record: Dict, table_name: str) -> Dict:
+    def _iter_cursor_batches(
+        self, cursor: Any, handle: Optional[OperationHandle] = None
+    ) -> Iterator[List[Dict]]:
+        """Pull the rows of an executed query `fetch_size` at a time."""
+        columns = [column[0] for column in cursor.description]
+        while True:
+            if handle:
+                handle.check()
+            rows = cursor.fetchmany(self.fetch_size)
+            if not rows:
+                break
+            yield [dict(zip(columns, row)) for row in rows]
+
+    def _engine_for(self, blob_name: str) -> AvroEngine:
+        """Engine reading and writing the format of a backup blob."""
+        if backup_format.format_of(blob_name) == "parquet":
+            if self._parquet_engine is None:
+                self._parquet_engine = ParquetEngine(self.parquet_row_group_size)
+            return self._parquet_engine
+        return self.avro_engine
+
+    def _format_record(
+        self,
+        record: Dict,
+        table_name: str,
+        version: int = backup_format.SCHEMA_VERSION,
+    ) -> Dict:
         """
         Format a database record according to the table's AVRO schema.
         """
         try:
-            if table_name == "employees":
-                return {
-                    "id": record["id"],
-                    "name": record["name"],
-                    "datetime": (
-                        record["datetime"].isoformat()
-                        if isinstance(record["datetime"], datetime)
-                        else record["datetime"]
-                    ),
-                    "department_id": record["department_id"],
-                    "job_id": record["job_id"],
-                }
-            elif table_name == "departments":
-                return {"id": record["id"], "department": record["department"]}
-            elif table_name == "jobs":
-                return {"id": record["id"], "job": record["job"]}
-            return record
+            return backup_format.encode_record(record, table_name, version)
         except Exception as e:
             raise BackupError(f"Failed to format record: {str(e)}")
 
-    async def restore_backup(self, backup_id: str, table_name: str) -> bool:
+    async def restore_backup(
+        self,
+        backup_id: Optional[str],
+        table_name: str,
+        as_of: Optional[datetime] = None,
+        shadow: bool = False,
+    ) -> bool:
         """
-        Restore a table from an AVRO backup.
+        Restore a table from an AVRO backup; without `backup_id`, from the
+        latest backup, or the latest one taken at or before `as_of`. With
+        `shadow`, the backup is loaded into a copy of the table that is swapped
+        in at the end, so readers never see a partially restored table.
+        """
+        return await self.executor.run(
+            self._restore_backup,
+            backup_id,
+            table_name,
+            as_of,
+            shadow,
+            timeout=self.operation_timeout,
+            operation=f"restore.{table_name}",
+        )
+
+    def _restore_backup(
+        self,
+        handle: OperationHandle,
+        backup_id: Optional[str],
+        table_name: str,
+        as_of: Optional[datetime] = None,
+        shadow: bool = False,
+    ) -> bool:
+        self._restore_table(handle, backup_id, table_name, as_of, shadow)
+        return True
+
+    def _restore_table(
+        self,
+        handle: OperationHandle,
+        backup_id: Optional[str],
+        table_name: str,
+        as_of: Optional[datetime] = None,
+        shadow: bool = False,
+        staged: bool = True,
+    ) -> Dict:
+        """
+        Replace the contents of a table with a backup.
+
+        Partitioned backups are loaded in parallel into a shadow table that is
+        swapped in at the end, so a failure leaves the table as it was. Without
+        `staged`, and for tables that cannot be swapped, they are loaded over one
+        connection in a single transaction instead.
+
+        Returns:
+            Dictionary with the backup id, rows restored and seconds taken
         """
         try:
-            blob_client = self.blob_service_client.get_blob_client(
-                container=self.container_name, blob=backup_id
+            if table_name not in self.SCHEMAS:
+                raise RestoreError(f"No schema defined for table: {table_name}")
+            if backup_id is None:
+                backup_id = self._resolve_backup_id(table_name, as_of)
+
+            started_at = time.monotonic()
+            columns = [field["name"] for field in self.SCHEMAS[table_name]["fields"]]
+            clear_statement = (
+                "DELETE FROM {table}"
+                if table_name in self.REFERENCED_TABLES
+                else self.truncate_statement
+            )
+            # An incremental backup is replayed on top of its base and the
+            # deltas before it
+            chain = self._resolve_chain(backup_id)
+            blobs = [blob for backup in chain for blob in self._backup_blobs(backup)]
+
+            partitioned = len(blobs) > len(chain)
+            if table_name not in self.REFERENCED_TABLES and (
+                shadow or (partitioned and staged)
+            ):
+                rows_restored, swap_seconds = self._restore_into_shadow(
+                    handle, table_name, columns, chain, blobs
+                )
+            else:
+                # Referenced tables cannot be swapped under their foreign keys;
+                # they are replaced in a single transaction, so snapshot readers
+                # keep seeing the old rows until it commits
+                rows_restored = self._load_chain(
+                    handle,
+                    table_name,
+                    table_name,
+                    columns,
+                    blobs,
+                    clear_statement.format(table=table_name),
+                )
+                swap_seconds = None
+                if table_name == "employees":
+                    with self.connection_factory() as conn:
+                        self.hires_aggregate.rebuild(handle.track(conn.cursor()))
+                        conn.commit()
+
+            seconds = time.monotonic() - started_at
+            logger.info(
+                "Restored %s rows into %s in %.2fs", rows_restored, table_name, seconds
             )
-            temp_file_path = f"/tmp/restore_{table_name}.avro"
+            result = {
+                "backup_id": backup_id,
+                "chain": chain,
+                "rows": rows_restored,
+                "seconds": round(seconds, 3),
+            }
+            if swap_seconds is not None:
+                result["swap_seconds"] = round(swap_seconds, 4)
+            return result
+        except Exception as e:
+            raise RestoreError(f"Failed to restore backup: {str(e)}")
 
-            with open(temp_file_path, "wb") as file:
-                blob_data = blob_client.download_blob()
-                file.write(blob_data.readall())
+    def _load_chain(
+        self,
+        handle: OperationHandle,
+        table_name: str,
+        target: str,
+        columns: List[str],
+        blobs: List[str],
+        clear_statement: str,
+        parallel: bool = False,
+    ) -> int:
+        """
+        Clear `target` and insert the records of `blobs` into it. Returns the
+        rows inserted.
+        """
+        query = (
+            f"INSERT INTO {target} ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' for _ in columns)})"
+        )
+        if not parallel or self.restore_parallelism == 1:
+            # The whole chain is loaded in one transaction
+            return self._load_blobs(
+                handle, table_name, columns, query, blobs, clear_statement
+            )
 
-            with DataFileReader(open(temp_file_path, "rb"), DatumReader()) as reader:
-                records = list(reader)
+        # Partitions cover disjoint id ranges, so they are loaded concurrently
+        # over separate connections, each committing on its own once the
+        # target has been cleared. Only used for shadow tables: a failure
+        # leaves the live table untouched
+        with self.connection_factory() as conn:
+            cursor = handle.track(conn.cursor())
+            cursor.execute(clear_statement)
+            conn.commit()
+        with ThreadPoolExecutor(
+            max_workers=min(self.restore_parallelism, len(blobs)),
+            thread_name_prefix="restore-partition",
+        ) as pool:
+            return sum(
+                pool.map(
+                    lambda blob: self._load_blobs(
+                        handle, table_name, columns, query, [blob]
+                    ),
+                    blobs,
+                )
+            )
 
-            with pyodbc.connect(self.sql_connection_string) as conn:
-                cursor = conn.cursor()
-                cursor.execute(f"TRUNCATE TABLE {table_name}")
-                for record in records:
-                    fields = ", ".join(record.keys())
-                    placeholders = ", ".join(["?" for _ in record])
-                    query = (
-                        f"INSERT INTO {table_name} ({fields}) VALUES ({placeholders})"
+    def _restore_into_shadow(
+        self,
+        handle: OperationHandle,
+        table_name: str,
+        columns: List[str],
+        chain: List[str],
+        blobs: List[str],
+    ) -> Tuple[int, float]:
+        """
+        Load a backup into a shadow copy of the table while the live table keeps
+        serving reads, validate it, and swap it in as one short transaction.
+
+        Returns:
+            Rows restored and seconds the swap took
+        """
+        try:
+            with self.connection_factory() as conn:
+                cursor = handle.track(conn.cursor())
+                shadow = self.bulk_load.create_shadow(cursor, table_name)
+                conn.commit()
+
+            rows_restored = self._load_chain(
+                handle,
+                table_name,
+                shadow,
+                columns,
+                blobs,
+                f"DELETE FROM {shadow}",
+                parallel=len(blobs) > len(chain),
+            )
+
+            # Entries of backups made before the catalog carry no row count
+            entries = {
+                entry["id"]: entry
+                for entry in self._read_catalog(table_name)["backups"]
+            }
+            recorded = [entries.get(backup, {}).get("rows") for backup in chain]
+            expected = rows_restored if None in recorded else sum(recorded)
+
+            with self.connection_factory() as conn:
+                cursor = handle.track(conn.cursor())
+                self.bulk_load.finish_shadow(cursor, table_name)
+                cursor.execute(f"SELECT COUNT(*) FROM {shadow}")
+                staged = cursor.fetchone()[0]
+                if staged != rows_restored or staged != expected:
+                    raise RestoreError(
+                        f"Shadow table of {table_name} holds {staged} rows, "
+                        f"expected {expected}"
                     )
-                    cursor.execute(query, list(record.values()))
+                handle.check()
+                swap_started = time.monotonic()
+                self.bulk_load.swap(cursor, table_name)
+                if table_name == "employees":
+                    # Same transaction, so the aggregate never lags the swap
+                    self.hires_aggregate.rebuild(cursor)
+                conn.commit()
+                swap_seconds = time.monotonic() - swap_started
+            logger.info(
+                "Swapped %s rows into %s in %.1fms",
+                staged,
+                table_name,
+                swap_seconds * 1000,
+            )
+            return rows_restored, swap_seconds
+        finally:
+            with self.connection_factory() as conn:
+                self.bulk_load.drop_shadow(conn.cursor(), table_name)
                 conn.commit()
-            return True
+
+    def _load_blobs(
+        self,
+        handle: OperationHandle,
+        table_name: str,
+        columns: List[str],
+        query: str,
+        blobs: List[str],
+        clear_statement: Optional[str] = None,
+    ) -> int:
+        """
+        Insert the records of `blobs` over one connection and commit, optionally
+        clearing the table first in the same transaction. Returns the rows inserted.
+        """
+        rows_restored = 0
+        with self.connection_factory() as conn:
+            cursor = handle.track(conn.cursor())
+            if hasattr(cursor, "fast_executemany"):
+                cursor.fast_executemany = True
+            if clear_statement:
+                cursor.execute(clear_statement)
+
+            rows = []
+            for blob_name in blobs:
+                for batch in self._iter_backup_records(blob_name, table_name):
+                    rows.extend(
+                        tuple(record[column] for column in columns) for record in batch
+                    )
+                    if len(rows) >= self.restore_batch_size:
+                        handle.check()
+                        cursor.executemany(query, rows)
+                        rows_restored += len(rows)
+                        rows = []
+            if rows:
+                handle.check()
+                cursor.executemany(query, rows)
+                rows_restored += len(rows)
+            conn.commit()
+        return rows_restored
+
+    def _iter_backup_records(
+        self, backup_id: str, table_name: str
+    ) -> Iterator[List[Dict]]:
+        """
+        Stream the records of one backup blob as database rows.
+
+        AVRO blocks are decoded while the next ranges download, so memory stays
+        bounded by the transfer window and one block of records.
+        """
+        blob_client = self.blob_service_client.get_blob_client(
+            container=self.container_name, blob=backup_id
+        )
+        with self.transfer_engine.open_reader(blob_client) as stream:
+            reader = self._engine_for(backup_id).open_reader(stream)
+            # Backups written before schema versioning are read as version 1
+            version = backup_format.read_schema_version(reader.metadata)
+            for batch in reader.iter_batches():
+                yield [
+                    backup_format.decode_record(datum, table_name, version)
+                    for datum in batch
+                ]
+
+    def _resolve_chain(self, backup_id: str) -> List[str]:
+        """
+        Backups to replay to restore `backup_id`: its full base first, then
+        every incremental up to and including `backup_id`.
+        """
+        chain = [backup_id]
+        while True:
+            metadata = (
+                self.blob_service_client.get_blob_client(
+                    container=self.container_name, blob=chain[0]
+                )
+                .get_blob_properties()
+                .metadata
+                or {}
+            )
+            if metadata.get("kind") != "incremental":
+                return chain
+            parent_id = metadata.get("parent_id")
+            if not parent_id or parent_id in chain:
+                raise RestoreError(f"Broken backup chain at {chain[0]}")
+            chain.insert(0, parent_id)
+
+    async def compact_backups(
+        self, table_name: str, backup_id: Optional[str] = None
+    ) -> Dict:
+        """
+        Merge a chain of incremental backups into a new full backup.
+
+        Args:
+            table_name: Table the backups belong to
+            backup_id: Last backup of the chain (defaults to the newest backup)
+        """
+        return await self.executor.run(
+            self._compact_backups,
+            table_name,
+            backup_id,
+            timeout=self.operation_timeout,
+            operation=f"compact.{table_name}",
+        )
+
+    def _compact_backups(
+        self, handle: OperationHandle, table_name: str, backup_id: Optional[str]
+    ) -> Dict:
+        try:
+            if table_name not in self.SCHEMAS:
+                raise BackupError(f"No schema defined for table: {table_name}")
+            if backup_id is None:
+                head = self._chain_head(table_name)
+                if head is None:
+                    raise BackupError(f"No backups to compact for table: {table_name}")
+                backup_id = head["id"]
+            return self._compact_chain(handle, backup_id, self.codec)
         except Exception as e:
-            raise RestoreError(f"Failed to restore backup: {str(e)}")
+            raise BackupError(f"Failed to compact backups: {str(e)}")
 
-    async def list_backups(self, table_name: str) -> List[dict]:
+    def _compact_chain(
+        self, handle: OperationHandle, backup_id: str, codec: str
+    ) -> Dict:
+        table_name = backup_id.split("/", 1)[0]
+        chain = self._resolve_chain(backup_id)
+        if len(chain) == 1:
+            return {"backup_id": backup_id, "skipped": True}
+
+        properties = self.blob_service_client.get_blob_client(
+            container=self.container_name, blob=backup_id
+        ).get_blob_properties()
+        head = properties.metadata
+
+        def batches() -> Iterator[List[Dict]]:
+            # Incrementals only add rows past the previous watermark, so the
+            # chain concatenated in order is the table as of the last backup
+            for backup in chain:
+                for blob_name in self._backup_blobs(backup):
+                    for batch in self._iter_backup_records(blob_name, table_name):
+                        handle.check()
+                        yield batch
+
+        # The compacted backup keeps the format of the chain's last backup
+        extension = backup_format.FORMATS[head.get("format", "avro")]
+        timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S_%f")
+        result = self._write_backup(
+            table_name,
+            f"{table_name}/{timestamp}{extension}",
+            codec,
+            batches(),
+            {
+                "kind": "full",
+                "chain_length": 0,
+                "compacted_from": backup_id,
+                "signature": head["signature"],
+                "watermark": head["watermark"],
+            },
+        )
+        # The compacted backup holds the data as of the chain's last backup, so
+        # it is placed right after it: compacting an older chain must not make
+        # it the latest backup or the next incremental's base
+        source = self._catalog_entry(table_name, backup_id)
+        self._record_in_catalog(
+            table_name,
+            result,
+            created_at=(
+                self._created_at(source) if source else properties.creation_time
+            ),
+        )
+        logger.info(
+            "Compacted %s backups of %s into %s",
+            len(chain),
+            table_name,
+            result["backup_id"],
+        )
+        return result
+
+    async def create_dataset_backup(
+        self, codec: Optional[str] = None, file_format: Optional[str] = None
+    ) -> Dict:
         """
-        List all available backups for a specific table.
+        Back up departments, jobs and employees as of one point in time.
+
+        Every table is read over its own connection and written concurrently,
+        each reader in a snapshot fixed while writes are held off, so no
+        employee in the set references a department or job missing from it.
+        Each table backup is a full backup recorded in its catalog; a manifest
+        under `_sets/` groups them under the backup set id.
+
+        Args:
+            codec: Block compression; the repository default when omitted
+            file_format: avro or parquet; the repository default when omitted
+
+        Returns:
+            Dictionary with the backup set id, the snapshot time and the result
+            per table
         """
+        return await self.executor.run(
+            self._create_dataset_backup,
+            codec or self.codec,
+            file_format or self.file_format,
+            timeout=self.operation_timeout,
+            operation="backup_dataset",
+        )
+
+    def _create_dataset_backup(
+        self, handle: OperationHandle, codec: str, file_format: str
+    ) -> Dict:
         try:
-            container_client = self.blob_service_client.get_container_client(
-                self.container_name
+            extension = backup_format.FORMATS[backup_format.resolve_format(file_format)]
+            tables = [table for phase in self.DATASET_PHASES for table in phase]
+            started_at = time.monotonic()
+            backup_set = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S_%f")
+            # The readers and the coordinator meet here once every snapshot is fixed
+            fixed = threading.Barrier(len(tables) + 1)
+
+            with ThreadPoolExecutor(
+                max_workers=len(tables), thread_name_prefix="backup-snapshot"
+            ) as pool:
+                with self.connection_factory() as conn:
+                    cursor = handle.track(conn.cursor())
+                    self.snapshot.freeze(cursor, tables)
+                    futures = [
+                        pool.submit(
+                            self._backup_snapshot_table,
+                            handle,
+                            fixed,
+                            table,
+                            f"{table}/{backup_set}{extension}",
+                            codec,
+                            backup_set,
+                        )
+                        for table in tables
+                    ]
+                    try:
+                        fixed.wait()
+                    except threading.BrokenBarrierError:
+                        pass  # A reader failed; its error is raised below
+                    finally:
+                        # Writers resume as soon as the snapshots are fixed
+                        conn.rollback()
+                    snapshot_at = datetime.now(timezone.utc)
+
+            results, errors = {}, []
+            for table, future in zip(tables, futures):
+                try:
+                    results[table] = future.result()
+                except Exception as e:
+                    errors.append(e)
+            if errors:
+                for result in results.values():
+                    self.blob_service_client.get_blob_client(
+                        container=self.container_name, blob=result["backup_id"]
+                    ).delete_blob()
+                # Readers released by the failed one report a broken barrier
+                errors.sort(key=lambda e: isinstance(e, threading.BrokenBarrierError))
+                raise errors[0]
+
+            for table, result in results.items():
+                self._record_in_catalog(table, result)
+            manifest = {
+                "backup_set": backup_set,
+                "snapshot_at": snapshot_at.isoformat(),
+                "tables": {
+                    table: {
+                        "id": result["backup_id"],
+                        "rows": result["rows"],
+                        "signature": result["signature"],
+                        "checksum": result["checksum"],
+                        "stored_bytes": result["stored_bytes"],
+                    }
+                    for table, result in results.items()
+                },
+            }
+            self.blob_service_client.get_blob_client(
+                container=self.container_name,
+                blob=f"{self.SET_PREFIX}/{backup_set}.json",
+            ).upload_blob(json.dumps(manifest), overwrite=False)
+
+            seconds = time.monotonic() - started_at
+            logger.info(
+                "Backed up %s as of %s in %.2fs",
+                ", ".join(tables),
+                snapshot_at.isoformat(),
+                seconds,
             )
-            backups = []
-            blob_list = container_client.list_blobs(name_starts_with=f"{table_name}/")
+            return {
+                "backup_set": backup_set,
+                "snapshot_at": snapshot_at.isoformat(),
+                "tables": results,
+                "seconds": round(seconds, 3),
+            }
+        except Exception as e:
+            raise BackupError(f"Failed to create dataset backup: {str(e)}")
+
+    def _backup_snapshot_table(
+        self,
+        handle: OperationHandle,
+        fixed: threading.Barrier,
+        table_name: str,
+        backup_name: str,
+        codec: str,
+        backup_set: str,
+    ) -> Dict:
+        """Fix a snapshot on a new connection, then back up the table from it."""
+        try:
+            with self.connection_factory() as conn:
+                cursor = handle.track(conn.cursor())
+                self.snapshot.begin(cursor, table_name)
+                fixed.wait()
 
-            for blob in blob_list:
-                backups.append(
+                signature = self._table_signature(cursor, table_name)
+                watermark = self._signature_max_id(signature)
+                cursor.execute(f"SELECT * FROM {table_name}")
+                return self._write_backup(
+                    table_name,
+                    backup_name,
+                    codec,
+                    self._iter_cursor_batches(cursor, handle),
                     {
-                        "id": blob.name,
-                        "table_name": table_name,
-                        "created_at": blob.creation_time.isoformat(),
-                        "size": blob.size,
-                    }
+                        "kind": "full",
+                        "chain_length": 0,
+                        "signature": signature,
+                        "watermark": "" if watermark is None else watermark,
+                        "backup_set": backup_set,
+                    },
+                )
+        except Exception:
+            fixed.abort()
+            raise
+
+    def _read_backup_set(self, backup_set: str) -> Dict:
+        return json.loads(
+            self.transfer_engine.download_bytes(
+                self.blob_service_client.get_blob_client(
+                    container=self.container_name,
+                    blob=f"{self.SET_PREFIX}/{backup_set}.json",
                 )
+            )
+        )
+
+    async def restore_dataset(
+        self,
+        backup_ids: Dict[str, Optional[str]],
+        manage_constraints: bool = False,
+        as_of: Optional[datetime] = None,
+        backup_set: Optional[str] = None,
+    ) -> Dict:
+        """
+        Restore departments, jobs and employees as one operation.
+
+        Parent tables are loaded concurrently before employees. With
+        `manage_constraints`, nonclustered indexes and FK checks are disabled
+        for the load, then indexes are rebuilt and every FK re-validated.
+
+        Args:
+            backup_ids: Backup id per table; tables without one are restored
+                from `backup_set`, else from their latest backup, or the latest
+                one as of `as_of`
+            manage_constraints: Disable indexes and FK checks during the load
+            as_of: Point in time used for tables without a backup id
+            backup_set: Backup set created by `create_dataset_backup`
 
-            return backups
+        Returns:
+            Dictionary with the result per table and the seconds per phase
+        """
+        tables = [table for phase in self.DATASET_PHASES for table in phase]
+        # Resolved up front so a missing backup fails before any table is touched
+        backup_ids = await self.executor.run(
+            self._resolve_dataset,
+            tables,
+            backup_ids,
+            as_of,
+            backup_set,
+            operation="restore_dataset.resolve",
+        )
+
+        started_at = time.monotonic()
+        phases: Dict[str, float] = {}
+        results: Dict[str, Dict] = {}
+
+        try:
+            phase_started = time.monotonic()
+            await self.executor.run(
+                self._prepare_dataset,
+                tables,
+                manage_constraints,
+                timeout=self.operation_timeout,
+                operation="restore_dataset.prepare",
+            )
+            phases["prepare"] = round(time.monotonic() - phase_started, 3)
+
+            for phase in self.DATASET_PHASES:
+                phase_started = time.monotonic()
+                restored = await asyncio.gather(
+                    *(
+                        # Loaded in place: with manage_constraints the indexes
+                        # are disabled, and a shadow could not be switched in
+                        self.executor.run(
+                            self._restore_table,
+                            backup_ids[table],
+                            table,
+                            staged=False,
+                            timeout=self.operation_timeout,
+                            operation=f"restore.{table}",
+                        )
+                        for table in phase
+                    )
+                )
+                results.update(zip(phase, restored))
+                phases["+".join(phase)] = round(time.monotonic() - phase_started, 3)
+        finally:
+            if manage_constraints:
+                phase_started = time.monotonic()
+                # Runs after a failed load too, so the tables are never left
+                # without their indexes; a failed validation surfaces here
+                await self.executor.run(
+                    self._finish_dataset,
+                    tables,
+                    timeout=self.operation_timeout,
+                    operation="restore_dataset.finish",
+                )
+                phases["rebuild"] = round(time.monotonic() - phase_started, 3)
+
+        total = time.monotonic() - started_at
+        logger.info(
+            "Restored dataset in %.2fs %s",
+            total,
+            ", ".join(f"{name}={seconds}s" for name, seconds in phases.items()),
+        )
+        return {
+            "tables": results,
+            "phases": phases,
+            "constraints_managed": manage_constraints,
+            "seconds": round(total, 3),
+        }
+
+    def _resolve_dataset(
+        self,
+        handle: OperationHandle,
+        tables: List[str],
+        backup_ids: Dict[str, Optional[str]],
+        as_of: Optional[datetime],
+        backup_set: Optional[str] = None,
+    ) -> Dict[str, str]:
+        try:
+            if backup_set:
+                members = self._read_backup_set(backup_set)["tables"]
+                backup_ids = {
+                    table: backup_ids.get(table) or members[table]["id"]
+                    for table in tables
+                }
+            return {
+                table: backup_ids.get(table) or self._resolve_backup_id(table, as_of)
+                for table in tables
+            }
+        except Exception as e:
+            raise RestoreError(f"Failed to resolve dataset backups: {str(e)}")
+
+    def _prepare_dataset(
+        self, handle: OperationHandle, tables: List[str], manage_constraints: bool
+    ) -> None:
+        """
+        Empty the child table first so parent rows can be deleted, and disable
+        indexes and FK checks when requested.
+        """
+        try:
+            with self.connection_factory() as conn:
+                cursor = handle.track(conn.cursor())
+                if manage_constraints:
+                    for table in tables:
+                        disabled = self.bulk_load.disable(cursor, table)
+                        if disabled:
+                            logger.info(
+                                "Disabled indexes on %s: %s",
+                                table,
+                                ", ".join(disabled),
+                            )
+                for table in self.DATASET_PHASES[-1]:
+                    cursor.execute(self.truncate_statement.format(table=table))
+                conn.commit()
+        except Exception as e:
+            raise RestoreError(f"Failed to prepare dataset restore: {str(e)}")
+
+    def _finish_dataset(self, handle: OperationHandle, tables: List[str]) -> None:
+        try:
+            with self.connection_factory() as conn:
+                cursor = handle.track(conn.cursor())
+                for table in tables:
+                    self.bulk_load.enable(cursor, table)
+                conn.commit()
+        except Exception as e:
+            raise RestoreError(
+                f"Failed to rebuild indexes or validate foreign keys: {str(e)}"
+            )
+
+    async def list_backups(self, table_name: str) -> List[dict]:
+        """
+        List all available backups for a specific table.
+        """
+        return await self.executor.run(
+            self._list_backups, table_name, operation=f"list_backups.{table_name}"
+        )
+
+    def _list_backups(self, handle: OperationHandle, table_name: str) -> List[dict]:
+        try:
+            catalog = self._read_catalog(table_name)
+            entries = [
+                entry
+                for segment in catalog.get("segments", [])
+                for entry in self._read_segment(segment["id"])
+            ] + catalog["backups"]
+            entries.sort(key=self._created_at)
+            return [
+                {"table_name": table_name, "size": entry.get("stored_bytes"), **entry}
+                for entry in entries
+            ]
         except Exception as e:
             raise BackupError(f"Failed to list backups: {str(e)}")
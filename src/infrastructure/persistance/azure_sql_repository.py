@@ -1,91 +1,304 @@
 import datetime
-from typing import List
-import pyodbc
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
 from src.domain.entities.employee import Employee
 from src.domain.entities.departament import Department
 from src.domain.entities.job import Job
 from src.domain.repositories.employee_repository import EmployeeRepository
 from src.domain.repositories.department_repository import DepartmentRepository
 from src.domain.repositories.job_repository import JobRepository
+from src.domain.repositories.metrics_repository import MetricsRepository
+from src.infrastructure.db.connection import connect, get_db_cursor
+from src.infrastructure.db.converters import to_sql_datetime
+from src.infrastructure.db.executor import DatabaseExecutor, OperationHandle
+from src.infrastructure.db.hires_aggregate import (
+    AzureSQLHiresAggregate,
+    covers_whole_quarters,
+    quarter_index,
+)
+from src.infrastructure.db.write_governor import WriteGovernor, is_transient_error
 import avro.schema
 from avro.datafile import DataFileWriter, DataFileReader
 from avro.io import DatumWriter, DatumReader
 
+logger = logging.getLogger(__name__)
+
+
+def _insert_batch(
+    handle: OperationHandle,
+    connection_string: str,
+    query: str,
+    rows: List[tuple],
+    entity_name: str,
+    on_inserted: Optional[Callable[[Any, List[tuple]], None]] = None,
+) -> List[bool]:
+    """
+    Insert a batch of rows in a single transaction using fast_executemany.
+
+    Transient errors are re-raised so the write governor retries the whole batch.
+    Any other error (constraint violation, invalid value) rolls the batch back and
+    falls back to row by row inserts, so valid rows are still saved and each
+    failing row is reported as False. `on_inserted` receives the cursor and the
+    rows saved before the transaction commits.
+    """
+    if not rows:
+        return []
+
+    with connect(connection_string) as conn:
+        cursor = handle.track(conn.cursor())
+        cursor.fast_executemany = True
+        try:
+            cursor.executemany(query, rows)
+            if on_inserted:
+                on_inserted(cursor, rows)
+            conn.commit()
+            return [True] * len(rows)
+        except Exception as e:
+            conn.rollback()
+            if is_transient_error(e):
+                raise
+            logger.warning(
+                "Batch insert of %s %s rows failed, retrying row by row: %s",
+                len(rows),
+                entity_name,
+                e,
+            )
+
+        results = []
+        for row in rows:
+            handle.check()
+            try:
+                cursor.execute(query, row)
+                results.append(True)
+            except Exception as e:
+                if is_transient_error(e):
+                    conn.rollback()
+                    raise
+                logger.error("Failed to save %s %s: %s", entity_name, row[0], e)
+                results.append(False)
+
+        if on_inserted:
+            try:
+                on_inserted(
+                    cursor, [row for row, saved in zip(rows, results) if saved]
+                )
+            except Exception:
+                conn.rollback()
+                raise
+
+        # Commit all changes to the database
+        conn.commit()
+        return results
+
 
 class AzureSQLEmployeeRepository(EmployeeRepository):
-    def __init__(self, connection_string: str):
+    def __init__(
+        self,
+        connection_string: str,
+        executor: Optional[DatabaseExecutor] = None,
+        write_timeout: Optional[float] = None,
+        write_governor: Optional[WriteGovernor] = None,
+        lazy_init: bool = False,
+    ):
         self.connection_string = connection_string
-        self.connection = self._create_connection()
+        self.executor = executor or DatabaseExecutor()
+        self.write_timeout = write_timeout
+        self.write_governor = write_governor or WriteGovernor()
+        self.hires_aggregate = AzureSQLHiresAggregate()
+        # Operations open their own connections; this one only checks the
+        # database is reachable, on first use with lazy_init
+        self._connection = None
+        if not lazy_init:
+            self._connection = self._create_connection()
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            self._connection = self._create_connection()
+        return self._connection
 
     def _create_connection(self):
         try:
-            connection = pyodbc.connect(self.connection_string)
-            print("[INFO] Database connection established successfully.")
+            connection = connect(self.connection_string)
+            logger.info("Database connection established successfully.")
             return connection
         except Exception as e:
-            print(f"[ERROR] Failed to establish database connection: {str(e)}")
+            logger.error("Failed to establish database connection: %s", e)
             raise e
 
     async def find_by_department(self, department_id: int) -> List[Employee]:
         try:
-            with pyodbc.connect(self.connection_string) as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    "SELECT * FROM employees WHERE department_id = ?", department_id
-                )
-                rows = cursor.fetchall()
-
-                employees = [
-                    Employee(
-                        id=row.id,
-                        name=row.name,
-                        datetime=row.datetime,
-                        department_id=row.department_id,
-                        job_id=row.job_id,
-                    )
-                    for row in rows
-                ]
-                return employees
+            return await self.executor.run(
+                self._find_employees,
+                "SELECT * FROM employees WHERE department_id = ?",
+                department_id,
+                operation="employees.find_by_department",
+            )
         except Exception as e:
-            print(f"Error finding employees by department: {str(e)}")
+            logger.error("Error finding employees by department: %s", e)
             return []
 
     async def find_by_job(self, job_id: int) -> List[Employee]:
         try:
-            with pyodbc.connect(self.connection_string) as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT * FROM employees WHERE job_id = ?", job_id)
-                rows = cursor.fetchall()
-
-                employees = [
-                    Employee(
-                        id=row.id,
-                        name=row.name,
-                        datetime=row.datetime,
-                        department_id=row.department_id,
-                        job_id=row.job_id,
-                    )
-                    for row in rows
-                ]
-                return employees
+            return await self.executor.run(
+                self._find_employees,
+                "SELECT * FROM employees WHERE job_id = ?",
+                job_id,
+                operation="employees.find_by_job",
+            )
         except Exception as e:
-            print(f"Error finding employees by job: {str(e)}")
+            logger.error("Error finding employees by job: %s", e)
             return []
 
     async def find_by_hire_date_range(
         self, start_date: datetime.datetime, end_date: datetime.datetime
     ) -> List[Employee]:
         try:
-            with pyodbc.connect(self.connection_string) as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    "SELECT * FROM employees WHERE datetime BETWEEN ? AND ?",
-                    start_date,
-                    end_date,
+            return await self.executor.run(
+                self._find_employees,
+                "SELECT * FROM employees WHERE datetime BETWEEN ? AND ?",
+                start_date,
+                end_date,
+                operation="employees.find_by_hire_date_range",
+            )
+        except Exception as e:
+            logger.error("Error finding employees by hire date range: %s", e)
+            return []
+
+    def _find_employees(
+        self, handle: OperationHandle, query: str, *params
+    ) -> List[Employee]:
+        with connect(self.connection_string) as conn:
+            cursor = handle.track(conn.cursor())
+            cursor.execute(query, *params)
+            rows = cursor.fetchall()
+
+            employees = [
+                Employee(
+                    id=row.id,
+                    name=row.name,
+                    datetime=row.datetime,
+                    department_id=row.department_id,
+                    job_id=row.job_id,
                 )
-                rows = cursor.fetchall()
+                for row in rows
+            ]
+            return employees
 
-                employees = [
+    async def find_page_by_department(
+        self, department_id: int, after_id: int = 0, limit: int = 1000
+    ) -> List[Employee]:
+        return await self.executor.run(
+            self._find_page,
+            "department_id = ?",
+            (department_id,),
+            after_id,
+            limit,
+            operation="employees.find_page_by_department",
+        )
+
+    async def find_page_by_job(
+        self, job_id: int, after_id: int = 0, limit: int = 1000
+    ) -> List[Employee]:
+        return await self.executor.run(
+            self._find_page,
+            "job_id = ?",
+            (job_id,),
+            after_id,
+            limit,
+            operation="employees.find_page_by_job",
+        )
+
+    async def find_page_by_hire_date_range(
+        self,
+        start_date: datetime.datetime,
+        end_date: datetime.datetime,
+        after_id: int = 0,
+        limit: int = 1000,
+    ) -> List[Employee]:
+        return await self.executor.run(
+            self._find_page,
+            "datetime BETWEEN ? AND ?",
+            (start_date, end_date),
+            after_id,
+            limit,
+            operation="employees.find_page_by_hire_date_range",
+        )
+
+    def iter_by_department(
+        self, department_id: int, page_size: int = 1000
+    ) -> AsyncIterator[List[Employee]]:
+        return self._iter_pages(
+            lambda after_id: self.find_page_by_department(
+                department_id, after_id, page_size
+            ),
+            page_size,
+        )
+
+    def iter_by_job(
+        self, job_id: int, page_size: int = 1000
+    ) -> AsyncIterator[List[Employee]]:
+        return self._iter_pages(
+            lambda after_id: self.find_page_by_job(job_id, after_id, page_size),
+            page_size,
+        )
+
+    def iter_by_hire_date_range(
+        self,
+        start_date: datetime.datetime,
+        end_date: datetime.datetime,
+        page_size: int = 1000,
+    ) -> AsyncIterator[List[Employee]]:
+        return self._iter_pages(
+            lambda after_id: self.find_page_by_hire_date_range(
+                start_date, end_date, after_id, page_size
+            ),
+            page_size,
+        )
+
+    async def _iter_pages(
+        self,
+        fetch_page: Callable[[int], Awaitable[List[Employee]]],
+        page_size: int,
+    ) -> AsyncIterator[List[Employee]]:
+        """
+        Walk a result set with keyset pagination on id. Each page is a short,
+        independent query, so no connection or cursor is held between pages and
+        memory stays bounded by `page_size`.
+        """
+        after_id = 0
+        while True:
+            page = await fetch_page(after_id)
+            if page:
+                yield page
+            if len(page) < page_size:
+                return
+            after_id = page[-1].id
+
+    def _find_page(
+        self,
+        handle: OperationHandle,
+        condition: str,
+        params: tuple,
+        after_id: int,
+        limit: int,
+    ) -> List[Employee]:
+        with connect(self.connection_string) as conn:
+            cursor = handle.track(conn.cursor())
+            cursor.execute(
+                "SELECT TOP (?) id, name, datetime, department_id, job_id "
+                f"FROM employees WHERE {condition} AND id > ? ORDER BY id",
+                limit,
+                *params,
+                after_id,
+            )
+
+            employees = []
+            while True:
+                rows = cursor.fetchmany(500)
+                if not rows:
+                    break
+                employees.extend(
                     Employee(
                         id=row.id,
                         name=row.name,
@@ -94,421 +307,673 @@ class AzureSQLEmployeeRepository(EmployeeRepository):
                         job_id=row.job_id,
                     )
                     for row in rows
-                ]
-                return employees
-        except Exception as e:
-            print(f"Error finding employees by hire date range: {str(e)}")
-            return []
+                )
+            return employees
 
     async def save(self, employee: Employee) -> bool:
         try:
-            with pyodbc.connect(self.connection_string) as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    """
-                    INSERT INTO employees (id, name, datetime, department_id, job_id)
-                    VALUES (?, ?, ?, ?, ?)
-                """,
-                    (
-                        employee.id,
-                        employee.name,
-                        employee.datetime,
-                        employee.department_id,
-                        employee.job_id,
-                    ),
-                )
-                return True
+            return await self.executor.run(
+                self._save, employee, operation="employees.save"
+            )
         except Exception as e:
-            print(f"Error saving employee: {str(e)}")
+            logger.error("Error saving employee: %s", e)
             return False
 
-    async def save_batch(self, employees: List[Employee]) -> List[bool]:
-        results = []
-        cursor = self.connection.cursor()
-
-        for employee in employees:
-            try:
-                query = """
-                    INSERT INTO employees (id, name, datetime, department_id, job_id)
-                    VALUES (?, ?, ?, ?, ?)
+    def _save(self, handle: OperationHandle, employee: Employee) -> bool:
+        with connect(self.connection_string) as conn:
+            cursor = handle.track(conn.cursor())
+            cursor.execute(
                 """
-                cursor.execute(
-                    query,
+                INSERT INTO employees (id, name, datetime, department_id, job_id)
+                VALUES (?, ?, ?, ?, ?)
+            """,
+                (
                     employee.id,
                     employee.name,
                     employee.datetime,
                     employee.department_id,
                     employee.job_id,
-                )
-                results.append(True)
-            except Exception as e:
-                print(f"[ERROR] Failed to save employee {employee.id}: {str(e)}")
-                results.append(False)
+                ),
+            )
+            self.hires_aggregate.add(
+                cursor,
+                [
+                    (
+                        to_sql_datetime(employee.datetime),
+                        employee.department_id,
+                        employee.job_id,
+                    )
+                ],
+            )
+            return True
 
-        # Commit all changes to the database
-        self.connection.commit()
-        return results
+    async def save_batch(self, employees: List[Employee]) -> List[bool]:
+        return await self.write_governor.submit(
+            lambda: self.executor.run(
+                self._save_batch,
+                employees,
+                timeout=self.write_timeout,
+                operation="employees.save_batch",
+            ),
+            name=f"employees batch of {len(employees)}",
+        )
+
+    def _save_batch(
+        self, handle: OperationHandle, employees: List[Employee]
+    ) -> List[bool]:
+        query = """
+            INSERT INTO employees (id, name, datetime, department_id, job_id)
+            VALUES (?, ?, ?, ?, ?)
+        """
+        rows = [
+            (
+                employee.id,
+                employee.name,
+                to_sql_datetime(employee.datetime),
+                employee.department_id,
+                employee.job_id,
+            )
+            for employee in employees
+        ]
+        # The hires aggregate is updated in the same transaction as the batch
+        return _insert_batch(
+            handle,
+            self.connection_string,
+            query,
+            rows,
+            "employee",
+            on_inserted=lambda cursor, saved: self.hires_aggregate.add(
+                cursor, [(row[2], row[3], row[4]) for row in saved]
+            ),
+        )
 
     async def backup(self, format: str = "AVRO") -> str:
         try:
-            with pyodbc.connect(self.connection_string) as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT * FROM employees")
-                rows = cursor.fetchall()
-
-                # Define AVRO schema
-                schema = {
-                    "name": "Employee",
-                    "type": "record",
-                    "fields": [
-                        {"name": "id", "type": "int"},
-                        {"name": "name", "type": "string"},
-                        {"name": "datetime", "type": "string"},
-                        {"name": "department_id", "type": "int"},
-                        {"name": "job_id", "type": "int"},
-                    ],
-                }
-
-                # Write to AVRO file
-                backup_path = (
-                    f"backups/employees_{datetime.now().strftime('%Y%m%d_%H%M%S')}.avro"
-                )
-                with DataFileWriter(
-                    open(backup_path, "wb"),
-                    DatumWriter(),
-                    avro.schema.parse(str(schema)),
-                ) as writer:
-                    for row in rows:
-                        writer.append(
-                            {
-                                "id": row.id,
-                                "name": row.name,
-                                "datetime": row.datetime.isoformat(),
-                                "department_id": row.department_id,
-                                "job_id": row.job_id,
-                            }
-                        )
-
-                return backup_path
+            return await self.executor.run(
+                self._backup,
+                timeout=self.write_timeout,
+                operation="employees.backup",
+            )
         except Exception as e:
-            print(f"Error creating backup: {str(e)}")
+            logger.error("Error creating backup: %s", e)
             raise
 
-    async def restore(self, backup_path: str) -> bool:
-        try:
-            # Read AVRO file
-            with DataFileReader(open(backup_path, "rb"), DatumReader()) as reader:
-                employees = list(reader)
-
-            # Restore to database
-            with pyodbc.connect(self.connection_string) as conn:
-                cursor = conn.cursor()
-                cursor.execute("TRUNCATE TABLE employees")  # Clear existing data
-
-                for emp in employees:
-                    cursor.execute(
-                        """
-                        INSERT INTO employees (id, name, datetime, department_id, job_id)
-                        VALUES (?, ?, ?, ?, ?)
-                    """,
-                        (
-                            emp["id"],
-                            emp["name"],
-                            emp["datetime"],
-                            emp["department_id"],
-                            emp["job_id"],
-                        ),
+    def _backup(self, handle: OperationHandle) -> str:
+        with connect(self.connection_string) as conn:
+            cursor = handle.track(conn.cursor())
+            cursor.execute("SELECT * FROM employees")
+            rows = cursor.fetchall()
+
+            # Define AVRO schema
+            schema = {
+                "name": "Employee",
+                "type": "record",
+                "fields": [
+                    {"name": "id", "type": "int"},
+                    {"name": "name", "type": "string"},
+                    {"name": "datetime", "type": "string"},
+                    {"name": "department_id", "type": "int"},
+                    {"name": "job_id", "type": "int"},
+                ],
+            }
+
+            # Write to AVRO file
+            backup_path = (
+                f"backups/employees_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.avro"
+            )
+            with DataFileWriter(
+                open(backup_path, "wb"),
+                DatumWriter(),
+                avro.schema.parse(str(schema)),
+            ) as writer:
+                for row in rows:
+                    writer.append(
+                        {
+                            "id": row.id,
+                            "name": row.name,
+                            "datetime": row.datetime.isoformat(),
+                            "department_id": row.department_id,
+                            "job_id": row.job_id,
+                        }
                     )
 
-                return True
+            return backup_path
+
+    async def restore(self, backup_path: str) -> bool:
+        try:
+            return await self.executor.run(
+                self._restore,
+                backup_path,
+                timeout=self.write_timeout,
+                operation="employees.restore",
+            )
         except Exception as e:
-            print(f"Error restoring backup: {str(e)}")
+            logger.error("Error restoring backup: %s", e)
             return False
 
+    def _restore(self, handle: OperationHandle, backup_path: str) -> bool:
+        # Read AVRO file
+        with DataFileReader(open(backup_path, "rb"), DatumReader()) as reader:
+            employees = list(reader)
+
+        # Restore to database
+        with connect(self.connection_string) as conn:
+            cursor = handle.track(conn.cursor())
+            cursor.execute("TRUNCATE TABLE employees")  # Clear existing data
+
+            for emp in employees:
+                handle.check()
+                cursor.execute(
+                    """
+                    INSERT INTO employees (id, name, datetime, department_id, job_id)
+                    VALUES (?, ?, ?, ?, ?)
+                """,
+                    (
+                        emp["id"],
+                        emp["name"],
+                        emp["datetime"],
+                        emp["department_id"],
+                        emp["job_id"],
+                    ),
+                )
+
+            return True
+
+
 class AzureSQLDepartmentRepository(DepartmentRepository):
-    def __init__(self, connection_string: str):
+    def __init__(
+        self,
+        connection_string: str,
+        executor: Optional[DatabaseExecutor] = None,
+        write_timeout: Optional[float] = None,
+        write_governor: Optional[WriteGovernor] = None,
+        lazy_init: bool = False,
+    ):
         self.connection_string = connection_string
-        self.connection = self._create_connection()
+        self.executor = executor or DatabaseExecutor()
+        self.write_timeout = write_timeout
+        self.write_governor = write_governor or WriteGovernor()
+        # Operations open their own connections; this one only checks the
+        # database is reachable, on first use with lazy_init
+        self._connection = None
+        if not lazy_init:
+            self._connection = self._create_connection()
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            self._connection = self._create_connection()
+        return self._connection
 
     def _create_connection(self):
         try:
-            connection = pyodbc.connect(self.connection_string)
-            print("[INFO] Database connection established successfully.")
+            connection = connect(self.connection_string)
+            logger.info("Database connection established successfully.")
             return connection
         except Exception as e:
-            print(f"[ERROR] Failed to establish database connection: {str(e)}")
+            logger.error("Failed to establish database connection: %s", e)
             raise e
 
     async def find_by_name(self, department: str) -> List[Department]:
         try:
-            with pyodbc.connect(self.connection_string) as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    "SELECT * FROM departments WHERE department = ?", department
-                )
-                rows = cursor.fetchall()
-
-                department = [
-                    Department(
-                        id=row.id,
-                        department=row.department,
-                    )
-                    for row in rows
-                ]
-                return department
+            return await self.executor.run(
+                self._find_by_name, department, operation="departments.find_by_name"
+            )
         except Exception as e:
-            print(f"Error finding department by department: {str(e)}")
+            logger.error("Error finding department by department: %s", e)
             return []
+
+    def _find_by_name(
+        self, handle: OperationHandle, department: str
+    ) -> List[Department]:
+        with connect(self.connection_string) as conn:
+            cursor = handle.track(conn.cursor())
+            cursor.execute(
+                "SELECT * FROM departments WHERE department = ?", department
+            )
+            rows = cursor.fetchall()
+
+            department = [
+                Department(
+                    id=row.id,
+                    department=row.department,
+                )
+                for row in rows
+            ]
+            return department
+
     async def save(self, departments: Department) -> bool:
         try:
-            with pyodbc.connect(self.connection_string) as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    """
-                    INSERT INTO departments (id, department)
-                    VALUES (?, ?)
-                """,
-                    (
-                        departments.id,
-                        departments.department,
-                    ),
-                )
-                return True
+            return await self.executor.run(
+                self._save, departments, operation="departments.save"
+            )
         except Exception as e:
-            print(f"Error saving departments: {str(e)}")
+            logger.error("Error saving departments: %s", e)
             return False
 
-    async def save_batch(self, departments: List[Department]) -> List[bool]:
-        results = []
-        cursor = self.connection.cursor()
-
-        for department in departments:
-            try:
-                query = """
-                    INSERT INTO departments (id, department)
-                    VALUES (?, ?)
+    def _save(self, handle: OperationHandle, departments: Department) -> bool:
+        with connect(self.connection_string) as conn:
+            cursor = handle.track(conn.cursor())
+            cursor.execute(
                 """
-                cursor.execute(
-                    query,
-                    department.id,
-                    department.department
-                )
-                results.append(True)
-            except Exception as e:
-                print(f"[ERROR] Failed to save departments {departments.id}: {str(e)}")
-                results.append(False)
+                INSERT INTO departments (id, department)
+                VALUES (?, ?)
+            """,
+                (
+                    departments.id,
+                    departments.department,
+                ),
+            )
+            return True
 
-        # Commit all changes to the database
-        self.connection.commit()
-        return results
+    async def save_batch(self, departments: List[Department]) -> List[bool]:
+        return await self.write_governor.submit(
+            lambda: self.executor.run(
+                self._save_batch,
+                departments,
+                timeout=self.write_timeout,
+                operation="departments.save_batch",
+            ),
+            name=f"departments batch of {len(departments)}",
+        )
+
+    def _save_batch(
+        self, handle: OperationHandle, departments: List[Department]
+    ) -> List[bool]:
+        query = """
+            INSERT INTO departments (id, department)
+            VALUES (?, ?)
+        """
+        rows = [(department.id, department.department) for department in departments]
+        return _insert_batch(handle, self.connection_string, query, rows, "department")
 
     async def backup(self, format: str = "AVRO") -> str:
         try:
-            with pyodbc.connect(self.connection_string) as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT * FROM departments")
-                rows = cursor.fetchall()
-
-                # Define AVRO schema
-                schema = {
-                    "name": "departments",
-                    "type": "record",
-                    "fields": [
-                        {"name": "id", "type": "int"},
-                        {"name": "department", "type": "string"}
-                    ],
-                }
-
-                # Write to AVRO file
-                backup_path = (
-                    f"backups/departments_{datetime.now().strftime('%Y%m%d_%H%M%S')}.avro"
-                )
-                with DataFileWriter(
-                    open(backup_path, "wb"),
-                    DatumWriter(),
-                    avro.schema.parse(str(schema)),
-                ) as writer:
-                    for row in rows:
-                        writer.append(
-                            {
-                                "id": row.id,
-                                "department": row.department
-                            }
-                        )
-
-                return backup_path
+            return await self.executor.run(
+                self._backup,
+                timeout=self.write_timeout,
+                operation="departments.backup",
+            )
         except Exception as e:
-            print(f"Error creating backup: {str(e)}")
+            logger.error("Error creating backup: %s", e)
             raise
 
-    async def restore(self, backup_path: str) -> bool:
-        try:
-            # Read AVRO file
-            with DataFileReader(open(backup_path, "rb"), DatumReader()) as reader:
-                departments = list(reader)
-
-            # Restore to database
-            with pyodbc.connect(self.connection_string) as conn:
-                cursor = conn.cursor()
-                cursor.execute("TRUNCATE TABLE departments")  # Clear existing data
-
-                for dep in departments:
-                    cursor.execute(
-                        """
-                        INSERT INTO departmentss (id, department)
-                        VALUES (?, ?)
-                    """,
-                        (
-                            dep["id"],
-                            dep["department"]
-                        ),
+    def _backup(self, handle: OperationHandle) -> str:
+        with connect(self.connection_string) as conn:
+            cursor = handle.track(conn.cursor())
+            cursor.execute("SELECT * FROM departments")
+            rows = cursor.fetchall()
+
+            # Define AVRO schema
+            schema = {
+                "name": "departments",
+                "type": "record",
+                "fields": [
+                    {"name": "id", "type": "int"},
+                    {"name": "department", "type": "string"}
+                ],
+            }
+
+            # Write to AVRO file
+            backup_path = (
+                f"backups/departments_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.avro"
+            )
+            with DataFileWriter(
+                open(backup_path, "wb"),
+                DatumWriter(),
+                avro.schema.parse(str(schema)),
+            ) as writer:
+                for row in rows:
+                    writer.append(
+                        {
+                            "id": row.id,
+                            "department": row.department
+                        }
                     )
 
-                return True
+            return backup_path
+
+    async def restore(self, backup_path: str) -> bool:
+        try:
+            return await self.executor.run(
+                self._restore,
+                backup_path,
+                timeout=self.write_timeout,
+                operation="departments.restore",
+            )
         except Exception as e:
-            print(f"Error restoring backup: {str(e)}")
+            logger.error("Error restoring backup: %s", e)
             return False
 
+    def _restore(self, handle: OperationHandle, backup_path: str) -> bool:
+        # Read AVRO file
+        with DataFileReader(open(backup_path, "rb"), DatumReader()) as reader:
+            departments = list(reader)
+
+        # Restore to database
+        with connect(self.connection_string) as conn:
+            cursor = handle.track(conn.cursor())
+            cursor.execute("TRUNCATE TABLE departments")  # Clear existing data
+
+            for dep in departments:
+                handle.check()
+                cursor.execute(
+                    """
+                    INSERT INTO departments (id, department)
+                    VALUES (?, ?)
+                """,
+                    (
+                        dep["id"],
+                        dep["department"]
+                    ),
+                )
+
+            return True
+
+
 class AzureSQLJobRepository(JobRepository):
-    def __init__(self, connection_string: str):
+    def __init__(
+        self,
+        connection_string: str,
+        executor: Optional[DatabaseExecutor] = None,
+        write_timeout: Optional[float] = None,
+        write_governor: Optional[WriteGovernor] = None,
+        lazy_init: bool = False,
+    ):
         self.connection_string = connection_string
-        self.connection = self._create_connection()
+        self.executor = executor or DatabaseExecutor()
+        self.write_timeout = write_timeout
+        self.write_governor = write_governor or WriteGovernor()
+        # Operations open their own connections; this one only checks the
+        # database is reachable, on first use with lazy_init
+        self._connection = None
+        if not lazy_init:
+            self._connection = self._create_connection()
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            self._connection = self._create_connection()
+        return self._connection
 
     def _create_connection(self):
         try:
-            connection = pyodbc.connect(self.connection_string)
-            print("[INFO] Database connection established successfully.")
+            connection = connect(self.connection_string)
+            logger.info("Database connection established successfully.")
             return connection
         except Exception as e:
-            print(f"[ERROR] Failed to establish database connection: {str(e)}")
+            logger.error("Failed to establish database connection: %s", e)
             raise e
 
     async def find_by_name(self, job: str) -> List[Job]:
         try:
-            with pyodbc.connect(self.connection_string) as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    "SELECT * FROM jobs WHERE job = ?", job
-                )
-                rows = cursor.fetchall()
-
-                job = [
-                    Job(
-                        id=row.id,
-                        job=row.job,
-                    )
-                    for row in rows
-                ]
-                return job
+            return await self.executor.run(
+                self._find_by_name, job, operation="jobs.find_by_name"
+            )
         except Exception as e:
-            print(f"Error finding job by job: {str(e)}")
+            logger.error("Error finding job by job: %s", e)
             return []
+
+    def _find_by_name(self, handle: OperationHandle, job: str) -> List[Job]:
+        with connect(self.connection_string) as conn:
+            cursor = handle.track(conn.cursor())
+            cursor.execute(
+                "SELECT * FROM jobs WHERE job = ?", job
+            )
+            rows = cursor.fetchall()
+
+            job = [
+                Job(
+                    id=row.id,
+                    job=row.job,
+                )
+                for row in rows
+            ]
+            return job
+
     async def save(self, jobs: Job) -> bool:
         try:
-            with pyodbc.connect(self.connection_string) as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    """
-                    INSERT INTO jobs (id, job)
-                    VALUES (?, ?)
-                """,
-                    (
-                        jobs.id,
-                        jobs.department,
-                    ),
-                )
-                return True
+            return await self.executor.run(self._save, jobs, operation="jobs.save")
         except Exception as e:
-            print(f"Error saving jobs {str(e)}")
+            logger.error("Error saving jobs %s", e)
             return False
 
-    async def save_batch(self, jobs: List[Job]) -> List[bool]:
-        results = []
-        cursor = self.connection.cursor()
-
-        for job in jobs:
-            try:
-                query = """
-                    INSERT INTO jobs (id, job)
-                    VALUES (?, ?)
+    def _save(self, handle: OperationHandle, jobs: Job) -> bool:
+        with connect(self.connection_string) as conn:
+            cursor = handle.track(conn.cursor())
+            cursor.execute(
                 """
-                cursor.execute(
-                    query,
-                    job.id,
-                    job.job
-                )
-                results.append(True)
-            except Exception as e:
-                print(f"[ERROR] Failed to save job {jobs.id}: {str(e)}")
-                results.append(False)
+                INSERT INTO jobs (id, job)
+                VALUES (?, ?)
+            """,
+                (
+                    jobs.id,
+                    jobs.job,
+                ),
+            )
+            return True
 
-        # Commit all changes to the database
-        self.connection.commit()
-        return results
+    async def save_batch(self, jobs: List[Job]) -> List[bool]:
+        return await self.write_governor.submit(
+            lambda: self.executor.run(
+                self._save_batch,
+                jobs,
+                timeout=self.write_timeout,
+                operation="jobs.save_batch",
+            ),
+            name=f"jobs batch of {len(jobs)}",
+        )
+
+    def _save_batch(self, handle: OperationHandle, jobs: List[Job]) -> List[bool]:
+        query = """
+            INSERT INTO jobs (id, job)
+            VALUES (?, ?)
+        """
+        rows = [(job.id, job.job) for job in jobs]
+        return _insert_batch(handle, self.connection_string, query, rows, "job")
 
     async def backup(self, format: str = "AVRO") -> str:
         try:
-            with pyodbc.connect(self.connection_string) as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT * FROM jobs")
-                rows = cursor.fetchall()
-
-                # Define AVRO schema
-                schema = {
-                    "name": "jobs",
-                    "type": "record",
-                    "fields": [
-                        {"name": "id", "type": "int"},
-                        {"name": "job", "type": "string"}
-                    ],
-                }
-
-                # Write to AVRO file
-                backup_path = (
-                    f"backups/jobs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.avro"
-                )
-                with DataFileWriter(
-                    open(backup_path, "wb"),
-                    DatumWriter(),
-                    avro.schema.parse(str(schema)),
-                ) as writer:
-                    for row in rows:
-                        writer.append(
-                            {
-                                "id": row.id,
-                                "job": row.job
-                            }
-                        )
-
-                return backup_path
+            return await self.executor.run(
+                self._backup,
+                timeout=self.write_timeout,
+                operation="jobs.backup",
+            )
         except Exception as e:
-            print(f"Error creating backup: {str(e)}")
+            logger.error("Error creating backup: %s", e)
             raise
 
-    async def restore(self, backup_path: str) -> bool:
-        try:
-            # Read AVRO file
-            with DataFileReader(open(backup_path, "rb"), DatumReader()) as reader:
-                jobs = list(reader)
-
-            # Restore to database
-            with pyodbc.connect(self.connection_string) as conn:
-                cursor = conn.cursor()
-                cursor.execute("TRUNCATE TABLE jobs")  # Clear existing data
-
-                for job in jobs:
-                    cursor.execute(
-                        """
-                        INSERT INTO jobs (id, job)
-                        VALUES (?, ?)
-                    """,
-                        (
-                            job["id"],
-                            job["job"]
-                        ),
+    def _backup(self, handle: OperationHandle) -> str:
+        with connect(self.connection_string) as conn:
+            cursor = handle.track(conn.cursor())
+            cursor.execute("SELECT * FROM jobs")
+            rows = cursor.fetchall()
+
+            # Define AVRO schema
+            schema = {
+                "name": "jobs",
+                "type": "record",
+                "fields": [
+                    {"name": "id", "type": "int"},
+                    {"name": "job", "type": "string"}
+                ],
+            }
+
+            # Write to AVRO file
+            backup_path = (
+                f"backups/jobs_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.avro"
+            )
+            with DataFileWriter(
+                open(backup_path, "wb"),
+                DatumWriter(),
+                avro.schema.parse(str(schema)),
+            ) as writer:
+                for row in rows:
+                    writer.append(
+                        {
+                            "id": row.id,
+                            "job": row.job
+                        }
                     )
 
-                return True
+            return backup_path
+
+    async def restore(self, backup_path: str) -> bool:
+        try:
+            return await self.executor.run(
+                self._restore,
+                backup_path,
+                timeout=self.write_timeout,
+                operation="jobs.restore",
+            )
         except Exception as e:
-            print(f"Error restoring backup: {str(e)}")
-            return False
\ No newline at end of file
+            logger.error("Error restoring backup: %s", e)
+            return False
+
+    def _restore(self, handle: OperationHandle, backup_path: str) -> bool:
+        # Read AVRO file
+        with DataFileReader(open(backup_path, "rb"), DatumReader()) as reader:
+            jobs = list(reader)
+
+        # Restore to database
+        with connect(self.connection_string) as conn:
+            cursor = handle.track(conn.cursor())
+            cursor.execute("TRUNCATE TABLE jobs")  # Clear existing data
+
+            for job in jobs:
+                handle.check()
+                cursor.execute(
+                    """
+                    INSERT INTO jobs (id, job)
+                    VALUES (?, ?)
+                """,
+                    (
+                        job["id"],
+                        job["job"]
+                    ),
+                )
+
+            return True
+
+
+class AzureSQLMetricsRepository(MetricsRepository):
+    # Period label per granularity, computed from the hire date (style 126 is
+    # ISO 8601; weeks are labelled by their Monday whatever DATEFIRST is)
+    PERIODS = {
+        "month": "CONVERT(CHAR(7), e.datetime, 126)",
+        "quarter": "CONCAT(YEAR(e.datetime), '-Q', DATEPART(QUARTER, e.datetime))",
+        "week": (
+            "CONVERT(CHAR(10), DATEADD(DAY, "
+            "-((DATEPART(WEEKDAY, e.datetime) + @@DATEFIRST - 2) % 7), "
+            "CAST(e.datetime AS DATE)), 126)"
+        ),
+    }
+
+    def __init__(self, executor: Optional[DatabaseExecutor] = None):
+        self.executor = executor or DatabaseExecutor()
+
+    # Whole quarters are read from the hires_by_quarter aggregate, whose size
+    # grows with the department/job pairs rather than with the employees. Other
+    # ranges filter employees with a half-open range on the hire date, which
+    # IX_Employee_HireDate can seek (YEAR(datetime) = ? could not)
+
+    async def hires_by_period(
+        self, start: datetime.date, end: datetime.date, granularity: str = "quarter"
+    ) -> List[Dict]:
+        if granularity == "quarter" and covers_whole_quarters(start, end):
+            query = """
+            SELECT
+                d.department,
+                j.job,
+                CONCAT(h.year, '-Q', h.quarter) as period,
+                SUM(h.hires) as hires
+            FROM hires_by_quarter h
+            JOIN departments d ON h.department_id = d.id
+            JOIN jobs j ON h.job_id = j.id
+            WHERE h.year BETWEEN ? AND ?
+                AND h.year * 4 + h.quarter - 1 >= ?
+                AND h.year * 4 + h.quarter - 1 < ?
+            GROUP BY d.department, j.job, h.year, h.quarter
+            ORDER BY d.department, j.job, h.year, h.quarter;
+            """
+            params = (start.year, end.year, quarter_index(start), quarter_index(end))
+        else:
+            query = f"""
+            SELECT department, job, period, COUNT(*) as hires
+            FROM (
+                SELECT d.department, j.job, {self.PERIODS[granularity]} as period
+                FROM employees e
+                JOIN departments d ON e.department_id = d.id
+                JOIN jobs j ON e.job_id = j.id
+                WHERE e.datetime >= ? AND e.datetime < ?
+            ) hires
+            GROUP BY department, job, period
+            ORDER BY department, job, period;
+            """
+            params = self._date_bounds(start, end)
+        return await self.executor.run(
+            self._query, query, params, operation="metrics.hires_by_period"
+        )
+
+    async def departments_above_mean(
+        self, start: datetime.date, end: datetime.date
+    ) -> List[Dict]:
+        if covers_whole_quarters(start, end):
+            department_hires = """
+                SELECT
+                    d.id,
+                    d.department,
+                    SUM(h.hires) as hired_count
+                FROM hires_by_quarter h
+                JOIN departments d ON h.department_id = d.id
+                WHERE h.year BETWEEN ? AND ?
+                    AND h.year * 4 + h.quarter - 1 >= ?
+                    AND h.year * 4 + h.quarter - 1 < ?
+                GROUP BY d.id, d.department
+            """
+            params = (start.year, end.year, quarter_index(start), quarter_index(end))
+        else:
+            department_hires = """
+                SELECT
+                    d.id,
+                    d.department,
+                    COUNT(*) as hired_count
+                FROM employees e
+                JOIN departments d ON e.department_id = d.id
+                WHERE e.datetime >= ? AND e.datetime < ?
+                GROUP BY d.id, d.department
+            """
+            params = self._date_bounds(start, end)
+        return await self.executor.run(
+            self._query,
+            f"""
+            WITH DepartmentHires AS ({department_hires}),
+            HiresMean AS (
+                SELECT AVG(CAST(hired_count AS FLOAT)) as mean_hires
+                FROM DepartmentHires
+            )
+            SELECT
+                id,
+                department,
+                hired_count as hired
+            FROM DepartmentHires, HiresMean
+            WHERE hired_count > mean_hires
+            ORDER BY hired_count DESC;
+            """,
+            params,
+            operation="metrics.departments_above_mean",
+        )
+
+    @staticmethod
+    def _date_bounds(start: datetime.date, end: datetime.date) -> tuple:
+        return (
+            datetime.datetime.combine(start, datetime.time()),
+            datetime.datetime.combine(end, datetime.time()),
+        )
+
+    def _query(self, handle: OperationHandle, query: str, params: tuple) -> List[Dict]:
+        with get_db_cursor() as cursor:
+            handle.track(cursor)
+            cursor.execute(query, *params)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
@@ -0,0 +1,519 @@
+import asyncio
+import datetime
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.application.services.metrics_cache import DataVersions
+from src.domain.repositories.metrics_repository import MetricsRepository
+from src.infrastructure.db.executor import DatabaseExecutor, OperationHandle
+
+logger = logging.getLogger(__name__)
+
+# Imported by the first repository: only METRICS_ENGINE=numpy needs numpy, and
+# importing it would otherwise slow down every start of the app
+np = None
+
+
+def _import_numpy() -> bool:
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            return False
+        np = numpy
+    return True
+
+_EPOCH = datetime.date(1970, 1, 1)
+# Months from year 0 to 1970, so month codes are year * 12 + month - 1
+_EPOCH_MONTHS = 1970 * 12
+
+
+class _Dimensions:
+    """Department and job ids and names, sorted by id for vectorized lookups."""
+
+    def __init__(self, departments: List[tuple], jobs: List[tuple]):
+        self.department_ids, self.department_names = self._sorted(departments)
+        self.job_ids, self.job_names = self._sorted(jobs)
+        # Rank of each name among the distinct names: the SQL metrics group by
+        # name, and ranks make the group keys sort like the names
+        self.department_labels, self.department_ranks = self._ranks(
+            self.department_names
+        )
+        self.job_labels, self.job_ranks = self._ranks(self.job_names)
+        # Codes of the (department name, job name) pairs; the last one stands
+        # for employees whose department or job is missing
+        self.pair_count = len(self.department_labels) * len(self.job_labels)
+
+    @staticmethod
+    def _sorted(rows: List[tuple]) -> Tuple[Any, List[str]]:
+        rows = sorted(rows)
+        return (
+            np.array([row[0] for row in rows], dtype=np.int64),
+            [row[1] for row in rows],
+        )
+
+    @staticmethod
+    def _ranks(names: List[str]) -> Tuple[List[str], Any]:
+        labels = sorted(set(names))
+        rank = {name: position for position, name in enumerate(labels)}
+        return labels, np.array([rank[name] for name in names], dtype=np.int32)
+
+    @staticmethod
+    def encode(ids: Any, values: Any) -> Any:
+        """Positions of `values` in the sorted `ids`, len(ids) where missing."""
+        if not len(ids):
+            return np.zeros(len(values), dtype=np.int32)
+        positions = np.searchsorted(ids, values).clip(0, len(ids) - 1)
+        found = ids[positions] == values
+        return np.where(found, positions, len(ids)).astype(np.int32)
+
+    def pairs(self, department: Any, job: Any) -> Any:
+        """Pair codes of department and job positions from `encode`."""
+        known = (department < len(self.department_ids)) & (job < len(self.job_ids))
+        department_ranks = np.append(self.department_ranks, 0)[department]
+        job_ranks = np.append(self.job_ranks, 0)[job]
+        pairs = department_ranks * len(self.job_labels) + job_ranks
+        return np.where(known, pairs, self.pair_count).astype(np.int32)
+
+
+class _Employees:
+    """
+    Hire day, hire month and dimension positions of every employee as parallel
+    arrays sorted by hire day, so a date range is a slice found by binary search.
+    Never modified once built; refreshes build a new instance.
+    """
+
+    def __init__(
+        self,
+        day: Any,
+        month: Any,
+        department_id: Any,
+        job_id: Any,
+        dimensions: _Dimensions,
+        rows: int,
+        max_id: Optional[int],
+    ):
+        self.day = day
+        self.month = month
+        self.department_id = department_id
+        self.job_id = job_id
+        self.dimensions = dimensions
+        self.department = _Dimensions.encode(dimensions.department_ids, department_id)
+        self.pair = dimensions.pairs(
+            self.department, _Dimensions.encode(dimensions.job_ids, job_id)
+        )
+        # Rows and highest id loaded, to fetch only newer rows on the next refresh
+        self.rows = rows
+        self.max_id = max_id
+
+    @classmethod
+    def from_rows(cls, rows: List[tuple], dimensions: _Dimensions) -> "_Employees":
+        """Build from (id, hire datetime, department_id, job_id) rows."""
+        day, month, department_id, job_id = cls._columns(rows)
+        order = np.argsort(day, kind="stable")
+        return cls(
+            day[order],
+            month[order],
+            department_id[order],
+            job_id[order],
+            dimensions,
+            rows=len(rows),
+            max_id=max((row[0] for row in rows), default=None),
+        )
+
+    def append(self, rows: List[tuple]) -> "_Employees":
+        """Copy with the rows added, inserted in hire day order."""
+        if not rows:
+            return self
+        day, month, department_id, job_id = self._columns(rows)
+        order = np.argsort(day, kind="stable")
+        positions = np.searchsorted(self.day, day[order], side="right")
+        return _Employees(
+            np.insert(self.day, positions, day[order]),
+            np.insert(self.month, positions, month[order]),
+            np.insert(self.department_id, positions, department_id[order]),
+            np.insert(self.job_id, positions, job_id[order]),
+            self.dimensions,
+            rows=self.rows + len(rows),
+            max_id=max(self.max_id or 0, max(row[0] for row in rows)),
+        )
+
+    def with_dimensions(self, dimensions: _Dimensions) -> "_Employees":
+        return _Employees(
+            self.day,
+            self.month,
+            self.department_id,
+            self.job_id,
+            dimensions,
+            rows=self.rows,
+            max_id=self.max_id,
+        )
+
+    @staticmethod
+    def _columns(rows: List[tuple]) -> Tuple[Any, Any, Any, Any]:
+        # datetime objects (pyodbc) and 'YYYY-MM-DD HH:MM:SS' text (SQLite) alike
+        hired_at = np.array([row[1] for row in rows], dtype="datetime64[s]")
+        months = hired_at.astype("datetime64[M]").astype(np.int64) + _EPOCH_MONTHS
+        return (
+            hired_at.astype("datetime64[D]").astype(np.int32),
+            months.astype(np.int32),
+            np.array([row[2] for row in rows], dtype=np.int64),
+            np.array([row[3] for row in rows], dtype=np.int64),
+        )
+
+
+class ColumnarMetricsRepository(MetricsRepository):
+    """
+    Metrics answered in process from a columnar copy of employees kept in
+    NumPy arrays, with the departments and jobs as lookup tables. Range filters
+    are binary searches on the hire day and group-bys are bincounts over
+    combined integer keys, so a query takes microseconds instead of a round
+    trip to the database.
+
+    The copy is loaded on first use and refreshed before a query whenever the
+    data versions moved: rows added by ingests are fetched by id and merged,
+    restores reload the table. Every `refresh_interval` seconds new rows are
+    also looked for, picking up ingests made through other instances. Should a
+    refresh fail, the query is answered by `fallback`.
+    """
+
+    TABLES = ("employees", "departments", "jobs")
+
+    # Period code per granularity, from the hire day and month of the rows
+    PERIODS = {
+        "month": lambda day, month: month,
+        "quarter": lambda day, month: month // 3,
+        # 1970-01-01 was a Thursday; weeks start on Monday
+        "week": lambda day, month: (day + 3) // 7,
+    }
+
+    LABELS = {
+        "month": lambda code: f"{code // 12:04d}-{code % 12 + 1:02d}",
+        "quarter": lambda code: f"{code // 4}-Q{code % 4 + 1}",
+        "week": lambda code: (
+            _EPOCH + datetime.timedelta(days=code * 7 - 3)
+        ).isoformat(),
+    }
+
+    def __init__(
+        self,
+        connection_factory: Callable[[], Any],
+        executor: Optional[DatabaseExecutor] = None,
+        data_versions: Optional[DataVersions] = None,
+        fallback: Optional[MetricsRepository] = None,
+        refresh_interval: float = 30.0,
+        fetch_size: int = 50000,
+    ):
+        """
+        Args:
+            connection_factory: Returns a DB-API connection to the database
+            executor: Runs the loads off the event loop
+            data_versions: Table versions bumped by ingests and restores
+            fallback: Answers while the copy cannot be refreshed
+            refresh_interval: Seconds between checks for rows added elsewhere
+            fetch_size: Rows fetched per round trip while loading
+        """
+        if not _import_numpy():
+            raise ValueError("METRICS_ENGINE=numpy requires the numpy package")
+        self.connection_factory = connection_factory
+        self.executor = executor or DatabaseExecutor()
+        self.data_versions = data_versions or DataVersions()
+        self.fallback = fallback
+        self.refresh_interval = refresh_interval
+        self.fetch_size = fetch_size
+        self._employees: Optional[_Employees] = None
+        self._versions: Dict[str, Tuple[int, int]] = {}
+        self._refreshed_at = 0.0
+        self._refresh_lock = asyncio.Lock()
+
+    async def hires_by_period(
+        self, start: datetime.date, end: datetime.date, granularity: str = "quarter"
+    ) -> List[Dict]:
+        employees = await self._current()
+        if employees is None:
+            return await self.fallback.hires_by_period(start, end, granularity)
+
+        low, high = self._range(employees, start, end)
+        if low == high:
+            return []
+        period = self.PERIODS[granularity](
+            employees.day[low:high], employees.month[low:high]
+        )
+        first_period = int(period.min())
+        periods = int(period.max()) - first_period + 1
+
+        # One integer key per (department, job, period) group, ordered like the
+        # department and job names and the period
+        dimensions = employees.dimensions
+        keys = employees.pair[low:high].astype(np.int64) * periods + (
+            period - first_period
+        )
+        groups = (dimensions.pair_count + 1) * periods
+        if groups <= 4 * len(keys) + 65536:
+            counts = np.bincount(keys, minlength=groups)
+            keys = np.flatnonzero(counts)
+            counts = counts[keys]
+        else:
+            # Sparse groups: sorting the keys is cheaper than counting into
+            # a mostly empty array
+            keys, counts = np.unique(keys, return_counts=True)
+        # Employees without a matching department or job are not counted; their
+        # keys sort last
+        known = np.searchsorted(keys, dimensions.pair_count * periods)
+        keys, counts = keys[:known], counts[:known]
+
+        pairs, offsets = np.divmod(keys, periods)
+        departments, jobs = np.divmod(pairs, len(dimensions.job_labels))
+        department_labels = dimensions.department_labels
+        job_labels = dimensions.job_labels
+        label = self.LABELS[granularity]
+        period_labels = [label(first_period + offset) for offset in range(periods)]
+        return [
+            {
+                "department": department_labels[department],
+                "job": job_labels[job],
+                "period": period_labels[offset],
+                "hires": hires,
+            }
+            for department, job, offset, hires in zip(
+                departments.tolist(), jobs.tolist(), offsets.tolist(), counts.tolist()
+            )
+        ]
+
+    async def departments_above_mean(
+        self, start: datetime.date, end: datetime.date
+    ) -> List[Dict]:
+        employees = await self._current()
+        if employees is None:
+            return await self.fallback.departments_above_mean(start, end)
+
+        low, high = self._range(employees, start, end)
+        dimensions = employees.dimensions
+        # The last count is of employees without a matching department
+        hired = np.bincount(
+            employees.department[low:high],
+            minlength=len(dimensions.department_ids) + 1,
+        )[:-1]
+        if not hired.any():
+            return []
+
+        # Mean over the departments that hired anyone, as in the SQL version
+        mean = hired[hired > 0].mean()
+        above = np.flatnonzero(hired > mean)
+        above = above[np.argsort(-hired[above], kind="stable")]
+        return [
+            {
+                "id": int(dimensions.department_ids[position]),
+                "department": dimensions.department_names[position],
+                "hired": int(hired[position]),
+            }
+            for position in above.tolist()
+        ]
+
+    def stats(self) -> Dict:
+        employees = self._employees
+        if employees is None:
+            return {"engine": "numpy", "loaded": False}
+        arrays = (
+            employees.day,
+            employees.month,
+            employees.department_id,
+            employees.job_id,
+            employees.department,
+            employees.pair,
+        )
+        return {
+            "engine": "numpy",
+            "loaded": True,
+            "rows": int(len(employees.day)),
+            "bytes": int(sum(array.nbytes for array in arrays)),
+            "departments": int(len(employees.dimensions.department_ids)),
+            "jobs": int(len(employees.dimensions.job_ids)),
+            "versions": dict(self._versions),
+            "refreshed_seconds_ago": round(time.monotonic() - self._refreshed_at, 3),
+        }
+
+    @staticmethod
+    def _range(
+        employees: _Employees, start: datetime.date, end: datetime.date
+    ) -> Tuple[int, int]:
+        # Hire dates in [start, end): a slice of the rows sorted by hire day
+        # Bounds of the array's own dtype, or NumPy converts the whole array
+        bounds = np.array(
+            [(start - _EPOCH).days, (end - _EPOCH).days], dtype=employees.day.dtype
+        )
+        low, high = np.searchsorted(employees.day, bounds)
+        return int(low), int(high)
+
+    async def _current(self) -> Optional[_Employees]:
+        """The columnar copy, refreshed first if the data changed since."""
+        if not self._stale():
+            return self._employees
+        async with self._refresh_lock:
+            if not self._stale():
+                return self._employees
+            # Read before loading: a bump during the load triggers another refresh
+            versions = {
+                table: self.data_versions.changes(table) for table in self.TABLES
+            }
+            try:
+                self._employees = await self.executor.run(
+                    self._refresh,
+                    self._employees,
+                    versions,
+                    operation="metrics.columnar_refresh",
+                )
+            except Exception as e:
+                if self.fallback is None:
+                    raise
+                logger.warning("Columnar metrics refresh failed, using SQL: %s", e)
+                return None
+            self._versions = versions
+            self._refreshed_at = time.monotonic()
+            return self._employees
+
+    def _stale(self) -> bool:
+        if self._employees is None:
+            return True
+        if time.monotonic() - self._refreshed_at >= self.refresh_interval:
+            return True
+        return any(
+            self.data_versions.changes(table) != self._versions.get(table)
+            for table in self.TABLES
+        )
+
+    def _refresh(
+        self,
+        handle: OperationHandle,
+        employees: Optional[_Employees],
+        versions: Dict[str, Tuple[int, int]],
+    ) -> _Employees:
+        conn = self.connection_factory()
+        try:
+            cursor = handle.track(conn.cursor())
+            dimensions = employees.dimensions if employees else None
+            if dimensions is None or any(
+                versions[table] != self._versions.get(table)
+                for table in ("departments", "jobs")
+            ):
+                dimensions = _Dimensions(
+                    self._fetch(cursor, "SELECT id, department FROM departments"),
+                    self._fetch(cursor, "SELECT id, job FROM jobs"),
+                )
+                if employees is not None:
+                    employees = employees.with_dimensions(dimensions)
+
+            # A restore may have replaced any row: reload the table
+            if employees is None or (
+                versions["employees"][1] != self._versions.get("employees", (0, 0))[1]
+            ):
+                return self._load(cursor, dimensions)
+
+            # Otherwise rows were only added; fetch those with higher ids, unless
+            # the counts show rows were added below the highest id loaded
+            cursor.execute("SELECT COUNT(*), MAX(id) FROM employees")
+            total, max_id = cursor.fetchone()
+            if max_id is None or employees.max_id is None:
+                return self._load(cursor, dimensions)
+            added = self._fetch(
+                cursor,
+                "SELECT id, datetime, department_id, job_id FROM employees "
+                "WHERE id > ? AND id <= ?",
+                (employees.max_id, max_id),
+            )
+            if employees.rows + len(added) != total:
+                return self._load(cursor, dimensions)
+            if added:
+                logger.info("Columnar metrics: %s new employees merged", len(added))
+            return employees.append(added)
+        finally:
+            conn.close()
+
+    def _load(self, cursor: Any, dimensions: _Dimensions) -> _Employees:
+        started = time.perf_counter()
+        employees = _Employees.from_rows(
+            self._fetch(
+                cursor, "SELECT id, datetime, department_id, job_id FROM employees"
+            ),
+            dimensions,
+        )
+        logger.info(
+            "Columnar metrics: %s employees loaded in %.2fs",
+            employees.rows,
+            time.perf_counter() - started,
+        )
+        return employees
+
+    def _fetch(self, cursor: Any, query: str, params: tuple = ()) -> List[tuple]:
+        if params:
+            cursor.execute(query, params)
+        else:
+            cursor.execute(query)
+        rows: List[tuple] = []
+        while True:
+            chunk = cursor.fetchmany(self.fetch_size)
+            if not chunk:
+                return rows
+            rows.extend(tuple(row) for row in chunk)
+
+
+if __name__ == "__main__":
+    # Query latency over synthetic employees:
+    #   BENCHMARK_ROWS=1000000 \
+    #   python -m src.infrastructure.persistance.columnar_metrics_repository
+    import os
+    import random
+
+    rows = int(os.getenv("BENCHMARK_ROWS", "1000000"))
+    first_day = datetime.datetime(2019, 1, 1)
+    employees = [
+        (
+            id,
+            first_day + datetime.timedelta(seconds=random.randrange(4 * 365 * 86400)),
+            random.randint(1, 12),
+            random.randint(1, 180),
+        )
+        for id in range(1, rows + 1)
+    ]
+    repository = ColumnarMetricsRepository(connection_factory=lambda: None)
+    dimensions = _Dimensions(
+        [(id, f"Department {id}") for id in range(1, 13)],
+        [(id, f"Job {id}") for id in range(1, 181)],
+    )
+    repository._employees = _Employees.from_rows(employees, dimensions)
+    repository._versions = {table: (0, 0) for table in repository.TABLES}
+    repository.refresh_interval = float("inf")
+    repository._refreshed_at = time.monotonic()
+    print(f"{rows} employees, {repository.stats()['bytes'] / 2**20:.1f} MiB")
+
+    async def measure(name, query, runs=200):
+        groups = len(await query())
+        started = time.perf_counter()
+        for _ in range(runs):
+            await query()
+        milliseconds = (time.perf_counter() - started) / runs * 1000
+        print(f"{name:<36} {milliseconds:8.3f} ms {groups:>8} rows")
+
+    async def main():
+        start, end = datetime.date(2021, 1, 1), datetime.date(2022, 1, 1)
+        week_end = datetime.date(2021, 1, 8)
+        await measure(
+            "hires 2021 by quarter",
+            lambda: repository.hires_by_period(start, end, "quarter"),
+        )
+        await measure(
+            "hires one week by week",
+            lambda: repository.hires_by_period(start, week_end, "week"),
+        )
+        await measure(
+            "departments above mean 2021",
+            lambda: repository.departments_above_mean(start, end),
+        )
+        await measure(
+            "departments above mean one week",
+            lambda: repository.departments_above_mean(start, week_end),
+        )
+
+    asyncio.run(main())
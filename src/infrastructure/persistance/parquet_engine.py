@@ -0,0 +1,179 @@
+import io
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional
+
+from src.infrastructure.persistance.avro_engine import (
+    AvroBatchReader,
+    AvroBatchWriter,
+)
+
+# Imported by the first engine: only Parquet backups need pyarrow, and importing
+# it would otherwise slow down every start of the app
+pa = pq = None
+
+
+def _import_pyarrow() -> bool:
+    global pa, pq
+    if pa is None:
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            return False
+        pa, pq = pyarrow, pyarrow.parquet
+    return True
+
+# AVRO container codec names (as resolved by backup_format) -> Parquet codecs.
+# Parquet has no raw deflate; gzip is deflate with a small header.
+PARQUET_CODECS = {
+    "null": "none",
+    "deflate": "gzip",
+    "snappy": "snappy",
+    "zstandard": "zstd",
+}
+
+
+def _arrow_type(avro_type: Any):
+    if isinstance(avro_type, dict):
+        if avro_type.get("logicalType") == "timestamp-millis":
+            return pa.timestamp("ms")
+        avro_type = avro_type["type"]
+    types = {
+        "int": pa.int32(),
+        "long": pa.int64(),
+        "string": pa.string(),
+        "float": pa.float32(),
+        "double": pa.float64(),
+        "boolean": pa.bool_(),
+    }
+    if avro_type not in types:
+        raise ValueError(f"Unsupported type for Parquet backups: {avro_type!r}")
+    return types[avro_type]
+
+
+def arrow_schema(schema: Dict, metadata: Optional[Dict[str, str]] = None):
+    """Arrow schema equivalent to an AVRO record schema of the backups."""
+    return pa.schema(
+        [
+            pa.field(field["name"], _arrow_type(field["type"]), nullable=False)
+            for field in schema["fields"]
+        ],
+        metadata=metadata,
+    )
+
+
+class _ParquetWriter(AvroBatchWriter):
+    """
+    Writes records as Parquet row groups of `row_group_size` rows, with column
+    statistics (min/max, null count) in every row group. Only one row group is
+    held in memory while writing.
+    """
+
+    def __init__(self, stream, schema, codec, metadata, row_group_size):
+        self._stream = stream
+        self._schema = arrow_schema(schema, metadata)
+        self._names = self._schema.names
+        self._row_group_size = row_group_size
+        self._columns: Dict[str, List] = {name: [] for name in self._names}
+        self._buffered = 0
+        self._encoded_bytes = 0
+        self._writer = pq.ParquetWriter(
+            stream,
+            self._schema,
+            compression=PARQUET_CODECS[codec],
+            write_statistics=True,
+        )
+
+    @property
+    def encoded_bytes(self) -> int:
+        # Size of the row groups as Arrow columns, before encoding and compression
+        return self._encoded_bytes
+
+    def write_batch(self, records: List[Dict]) -> None:
+        for name in self._names:
+            self._columns[name].extend(record[name] for record in records)
+        self._buffered += len(records)
+        if self._buffered >= self._row_group_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._buffered:
+            return
+        # Timestamps arrive as epoch milliseconds, like in the AVRO backups
+        table = pa.Table.from_arrays(
+            [
+                pa.array(self._columns[field.name], type=pa.int64()).cast(field.type)
+                if pa.types.is_timestamp(field.type)
+                else pa.array(self._columns[field.name], type=field.type)
+                for field in self._schema
+            ],
+            schema=self._schema,
+        )
+        self._encoded_bytes += table.nbytes
+        self._writer.write_table(table, row_group_size=self._buffered)
+        self._columns = {name: [] for name in self._names}
+        self._buffered = 0
+
+    def finish(self) -> None:
+        # Writes the footer holding the schema, metadata and statistics
+        self.flush()
+        self._writer.close()
+
+    def close(self) -> None:
+        if self._writer.is_open:
+            self.finish()
+        self._stream.close()
+
+
+class _ParquetReader(AvroBatchReader):
+    def __init__(self, stream: BinaryIO):
+        if not stream.seekable():
+            # The footer is read first, so the file must be seekable
+            stream = io.BytesIO(stream.read())
+        self._file = pq.ParquetFile(stream)
+        self.metadata = {
+            key.decode(): value.decode()
+            for key, value in (self._file.schema_arrow.metadata or {}).items()
+        }
+
+    def iter_batches(self) -> Iterator[List[Dict]]:
+        for index in range(self._file.num_row_groups):
+            table = self._file.read_row_group(index)
+            columns = [
+                column.cast(pa.int64()) if pa.types.is_timestamp(column.type) else column
+                for column in table.columns
+            ]
+            yield pa.Table.from_arrays(columns, names=table.column_names).to_pylist()
+
+
+class ParquetEngine:
+    """
+    Columnar backups in Parquet, with the same interface as the AVRO engines:
+    records go in and come out as the AVRO datums of `backup_format`, so the
+    repository encodes, decodes and versions them the same way.
+    """
+
+    name = "pyarrow"
+
+    def __init__(self, row_group_size: int = 65536):
+        """
+        Args:
+            row_group_size: Rows per row group (and rows held in memory while writing)
+
+        Raises:
+            ValueError: If pyarrow is not installed
+        """
+        if not _import_pyarrow():
+            raise ValueError("Parquet backups need the pyarrow package")
+        self.row_group_size = row_group_size
+
+    def open_writer(
+        self,
+        stream: BinaryIO,
+        schema: Dict,
+        codec: str = "null",
+        metadata: Optional[Dict[str, str]] = None,
+    ) -> AvroBatchWriter:
+        return _ParquetWriter(stream, schema, codec, metadata, self.row_group_size)
+
+    def open_reader(self, stream: BinaryIO) -> AvroBatchReader:
+        return _ParquetReader(stream)
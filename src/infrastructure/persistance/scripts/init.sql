@@ -22,4 +22,23 @@ CREATE TABLE jobs (
 -- Índices para mejorar el rendimiento
 CREATE INDEX IX_Employee_Department ON employees(department_id);
 CREATE INDEX IX_Employee_Job ON employees(job_id);
-CREATE INDEX IX_Employee_HireDate ON employees(datetime);
\ No newline at end of file
+-- Covers the metrics range queries on the hire date without key lookups
+CREATE INDEX IX_Employee_HireDate ON employees(datetime) INCLUDE (department_id, job_id);
+
+-- Hires per department, job, year and quarter, maintained by every employee batch
+-- insert and rebuilt by restores; the metrics read it instead of employees
+CREATE TABLE hires_by_quarter (
+    department_id INT NOT NULL,
+    job_id INT NOT NULL,
+    year INT NOT NULL,
+    quarter TINYINT NOT NULL,
+    hires INT NOT NULL,
+    CONSTRAINT PK_HiresByQuarter PRIMARY KEY (department_id, job_id, year, quarter)
+);
+
+CREATE INDEX IX_HiresByQuarter_Year ON hires_by_quarter(year);
+
+INSERT INTO hires_by_quarter (department_id, job_id, year, quarter, hires)
+SELECT department_id, job_id, YEAR(datetime), DATEPART(QUARTER, datetime), COUNT(*)
+FROM employees
+GROUP BY department_id, job_id, YEAR(datetime), DATEPART(QUARTER, datetime);
@@ -0,0 +1,49 @@
+-- src/infrastructure/persistance/scripts/init_sqlite.sql
+-- Schema for the embedded SQLite backend (DB_BACKEND=sqlite)
+CREATE TABLE IF NOT EXISTS departments (
+    id INTEGER PRIMARY KEY,
+    department TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    job TEXT NOT NULL
+);
+
+-- datetime is stored as 'YYYY-MM-DD HH:MM:SS' text (UTC) so it sorts chronologically
+CREATE TABLE IF NOT EXISTS employees (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    datetime TEXT NOT NULL,
+    department_id INTEGER NOT NULL,
+    job_id INTEGER NOT NULL,
+    CONSTRAINT FK_Employee_Department FOREIGN KEY (department_id) REFERENCES departments(id),
+    CONSTRAINT FK_Employee_Job FOREIGN KEY (job_id) REFERENCES jobs(id)
+);
+
+CREATE INDEX IF NOT EXISTS IX_Employee_Department ON employees(department_id);
+CREATE INDEX IF NOT EXISTS IX_Employee_Job ON employees(job_id);
+CREATE INDEX IF NOT EXISTS IX_Employee_HireDate ON employees(datetime);
+
+-- Hires per department, job, year and quarter, maintained by every employee batch
+-- insert and rebuilt by restores; the metrics read it instead of employees
+CREATE TABLE IF NOT EXISTS hires_by_quarter (
+    department_id INTEGER NOT NULL,
+    job_id INTEGER NOT NULL,
+    year INTEGER NOT NULL,
+    quarter INTEGER NOT NULL,
+    hires INTEGER NOT NULL,
+    PRIMARY KEY (department_id, job_id, year, quarter)
+);
+
+CREATE INDEX IF NOT EXISTS IX_HiresByQuarter_Year ON hires_by_quarter(year);
+
+-- Databases created before the aggregate existed are backfilled once
+INSERT INTO hires_by_quarter (department_id, job_id, year, quarter, hires)
+SELECT department_id, job_id,
+       CAST(strftime('%Y', datetime) AS INTEGER) AS year,
+       (CAST(strftime('%m', datetime) AS INTEGER) + 2) / 3 AS quarter,
+       COUNT(*)
+FROM employees
+WHERE NOT EXISTS (SELECT 1 FROM hires_by_quarter)
+GROUP BY department_id, job_id, year, quarter;
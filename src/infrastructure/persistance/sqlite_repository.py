@@ -0,0 +1,572 @@
+import datetime
+import json
+from abc import ABC, abstractmethod
+import logging
+import sqlite3
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+import avro.schema
+from avro.datafile import DataFileWriter, DataFileReader
+from avro.io import DatumWriter, DatumReader
+
+from src.domain.entities.employee import Employee
+from src.domain.entities.departament import Department
+from src.domain.entities.job import Job
+from src.domain.repositories.employee_repository import EmployeeRepository
+from src.domain.repositories.department_repository import DepartmentRepository
+from src.domain.repositories.job_repository import JobRepository
+from src.domain.repositories.metrics_repository import MetricsRepository
+from src.infrastructure.db.converters import to_sql_datetime
+from src.infrastructure.db.executor import DatabaseExecutor, OperationHandle
+from src.infrastructure.db.hires_aggregate import (
+    SQLiteHiresAggregate,
+    covers_whole_quarters,
+    quarter_index,
+)
+from src.infrastructure.db.sqlite_connection import (
+    SQLiteCancelHandle,
+    get_sqlite_connection,
+)
+from src.infrastructure.db.write_governor import WriteGovernor, is_transient_error
+from src.infrastructure.persistance.azure_backup_repository import AzureBackupRepository
+
+logger = logging.getLogger(__name__)
+
+
+def _to_sqlite_datetime(value: Any) -> Any:
+    """Store datetimes as 'YYYY-MM-DD HH:MM:SS' text so they sort chronologically."""
+    value = to_sql_datetime(value)
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(sep=" ")
+    return value
+
+
+def _from_sqlite_datetime(value: Any) -> Any:
+    if isinstance(value, str):
+        try:
+            return datetime.datetime.fromisoformat(value)
+        except ValueError:
+            return value
+    return value
+
+
+class _SQLiteRepository(ABC):
+    """
+    Shared plumbing for the embedded SQLite repositories: one connection per
+    operation on the database executor, batch writes under the write governor and
+    the AVRO file backup/restore of BaseRepository.
+    """
+
+    TABLE = ""
+    COLUMNS: List[str] = []
+
+    def __init__(
+        self,
+        database_path: str,
+        executor: Optional[DatabaseExecutor] = None,
+        write_timeout: Optional[float] = None,
+        write_governor: Optional[WriteGovernor] = None,
+    ):
+        self.database_path = database_path
+        self.executor = executor or DatabaseExecutor()
+        self.write_timeout = write_timeout
+        self.write_governor = write_governor or WriteGovernor()
+
+    def _connect(self, handle: OperationHandle) -> sqlite3.Connection:
+        conn = get_sqlite_connection(self.database_path)
+        handle.track(SQLiteCancelHandle(conn))
+        return conn
+
+    def _to_row(self, entity: Any) -> tuple:
+        return tuple(getattr(entity, column) for column in self.COLUMNS)
+
+    @abstractmethod
+    def _from_row(self, row: sqlite3.Row) -> Any:
+        """Build the entity of a row read from TABLE."""
+        pass
+
+    def _after_insert(self, conn: sqlite3.Connection, rows: List[tuple]) -> None:
+        """Called with the rows saved, in the transaction that inserted them."""
+
+    async def save(self, entity: Any) -> bool:
+        try:
+            results = await self.executor.run(
+                self._save_batch, [entity], operation=f"{self.TABLE}.save"
+            )
+            return bool(results and results[0])
+        except Exception as e:
+            logger.error("Error saving %s: %s", self.TABLE, e)
+            return False
+
+    async def save_batch(self, entities: List[Any]) -> List[bool]:
+        return await self.write_governor.submit(
+            lambda: self.executor.run(
+                self._save_batch,
+                entities,
+                timeout=self.write_timeout,
+                operation=f"{self.TABLE}.save_batch",
+            ),
+            name=f"{self.TABLE} batch of {len(entities)}",
+        )
+
+    def _save_batch(self, handle: OperationHandle, entities: List[Any]) -> List[bool]:
+        if not entities:
+            return []
+
+        placeholders = ", ".join("?" for _ in self.COLUMNS)
+        query = (
+            f"INSERT INTO {self.TABLE} ({', '.join(self.COLUMNS)}) "
+            f"VALUES ({placeholders})"
+        )
+        rows = [self._to_row(entity) for entity in entities]
+
+        conn = self._connect(handle)
+        try:
+            try:
+                with conn:
+                    conn.executemany(query, rows)
+                    self._after_insert(conn, rows)
+                return [True] * len(rows)
+            except Exception as e:
+                if is_transient_error(e):
+                    raise
+                logger.warning(
+                    "Batch insert of %s %s rows failed, retrying row by row: %s",
+                    len(rows),
+                    self.TABLE,
+                    e,
+                )
+
+            results = []
+            with conn:
+                for row in rows:
+                    handle.check()
+                    try:
+                        conn.execute(query, row)
+                        results.append(True)
+                    except sqlite3.IntegrityError as e:
+                        logger.error("Failed to save %s %s: %s", self.TABLE, row[0], e)
+                        results.append(False)
+                self._after_insert(
+                    conn, [row for row, saved in zip(rows, results) if saved]
+                )
+            return results
+        finally:
+            conn.close()
+
+    async def backup(self, format: str = "AVRO") -> str:
+        try:
+            return await self.executor.run(
+                self._backup, timeout=self.write_timeout, operation=f"{self.TABLE}.backup"
+            )
+        except Exception as e:
+            logger.error("Error creating backup: %s", e)
+            raise
+
+    def _backup(self, handle: OperationHandle) -> str:
+        schema = avro.schema.parse(json.dumps(AzureBackupRepository.SCHEMAS[self.TABLE]))
+        backup_path = (
+            f"backups/{self.TABLE}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.avro"
+        )
+        conn = self._connect(handle)
+        try:
+            cursor = conn.execute(f"SELECT {', '.join(self.COLUMNS)} FROM {self.TABLE}")
+            with DataFileWriter(open(backup_path, "wb"), DatumWriter(), schema) as writer:
+                while True:
+                    rows = cursor.fetchmany(1000)
+                    if not rows:
+                        break
+                    for row in rows:
+                        writer.append(dict(row))
+            return backup_path
+        finally:
+            conn.close()
+
+    async def restore(self, backup_path: str) -> bool:
+        try:
+            return await self.executor.run(
+                self._restore,
+                backup_path,
+                timeout=self.write_timeout,
+                operation=f"{self.TABLE}.restore",
+            )
+        except Exception as e:
+            logger.error("Error restoring backup: %s", e)
+            return False
+
+    def _restore(self, handle: OperationHandle, backup_path: str) -> bool:
+        placeholders = ", ".join("?" for _ in self.COLUMNS)
+        query = (
+            f"INSERT INTO {self.TABLE} ({', '.join(self.COLUMNS)}) "
+            f"VALUES ({placeholders})"
+        )
+        conn = self._connect(handle)
+        try:
+            with DataFileReader(open(backup_path, "rb"), DatumReader()) as reader, conn:
+                conn.execute(f"DELETE FROM {self.TABLE}")  # Clear existing data
+                conn.executemany(
+                    query, (tuple(record[c] for c in self.COLUMNS) for record in reader)
+                )
+            return True
+        finally:
+            conn.close()
+
+
+class SQLiteEmployeeRepository(_SQLiteRepository, EmployeeRepository):
+    TABLE = "employees"
+    COLUMNS = ["id", "name", "datetime", "department_id", "job_id"]
+    hires_aggregate = SQLiteHiresAggregate()
+
+    def _to_row(self, employee: Employee) -> tuple:
+        return (
+            employee.id,
+            employee.name,
+            _to_sqlite_datetime(employee.datetime),
+            employee.department_id,
+            employee.job_id,
+        )
+
+    def _after_insert(self, conn: sqlite3.Connection, rows: List[tuple]) -> None:
+        self.hires_aggregate.add(conn, [(row[2], row[3], row[4]) for row in rows])
+
+    def _from_row(self, row: sqlite3.Row) -> Employee:
+        return Employee(
+            id=row["id"],
+            name=row["name"],
+            datetime=_from_sqlite_datetime(row["datetime"]),
+            department_id=row["department_id"],
+            job_id=row["job_id"],
+        )
+
+    async def find_by_department(self, department_id: int) -> List[Employee]:
+        try:
+            return await self.executor.run(
+                self._find_employees,
+                "department_id = ?",
+                (department_id,),
+                operation="employees.find_by_department",
+            )
+        except Exception as e:
+            logger.error("Error finding employees by department: %s", e)
+            return []
+
+    async def find_by_job(self, job_id: int) -> List[Employee]:
+        try:
+            return await self.executor.run(
+                self._find_employees,
+                "job_id = ?",
+                (job_id,),
+                operation="employees.find_by_job",
+            )
+        except Exception as e:
+            logger.error("Error finding employees by job: %s", e)
+            return []
+
+    async def find_by_hire_date_range(
+        self, start_date: datetime.datetime, end_date: datetime.datetime
+    ) -> List[Employee]:
+        try:
+            return await self.executor.run(
+                self._find_employees,
+                "datetime BETWEEN ? AND ?",
+                (_to_sqlite_datetime(start_date), _to_sqlite_datetime(end_date)),
+                operation="employees.find_by_hire_date_range",
+            )
+        except Exception as e:
+            logger.error("Error finding employees by hire date range: %s", e)
+            return []
+
+    def _find_employees(
+        self, handle: OperationHandle, condition: str, params: tuple
+    ) -> List[Employee]:
+        conn = self._connect(handle)
+        try:
+            rows = conn.execute(
+                f"SELECT * FROM employees WHERE {condition}", params
+            ).fetchall()
+            return [self._from_row(row) for row in rows]
+        finally:
+            conn.close()
+
+    async def find_page_by_department(
+        self, department_id: int, after_id: int = 0, limit: int = 1000
+    ) -> List[Employee]:
+        return await self.executor.run(
+            self._find_page,
+            "department_id = ?",
+            (department_id,),
+            after_id,
+            limit,
+            operation="employees.find_page_by_department",
+        )
+
+    async def find_page_by_job(
+        self, job_id: int, after_id: int = 0, limit: int = 1000
+    ) -> List[Employee]:
+        return await self.executor.run(
+            self._find_page,
+            "job_id = ?",
+            (job_id,),
+            after_id,
+            limit,
+            operation="employees.find_page_by_job",
+        )
+
+    async def find_page_by_hire_date_range(
+        self,
+        start_date: datetime.datetime,
+        end_date: datetime.datetime,
+        after_id: int = 0,
+        limit: int = 1000,
+    ) -> List[Employee]:
+        return await self.executor.run(
+            self._find_page,
+            "datetime BETWEEN ? AND ?",
+            (_to_sqlite_datetime(start_date), _to_sqlite_datetime(end_date)),
+            after_id,
+            limit,
+            operation="employees.find_page_by_hire_date_range",
+        )
+
+    def iter_by_department(
+        self, department_id: int, page_size: int = 1000
+    ) -> AsyncIterator[List[Employee]]:
+        return self._iter_pages(
+            lambda after_id: self.find_page_by_department(
+                department_id, after_id, page_size
+            ),
+            page_size,
+        )
+
+    def iter_by_job(
+        self, job_id: int, page_size: int = 1000
+    ) -> AsyncIterator[List[Employee]]:
+        return self._iter_pages(
+            lambda after_id: self.find_page_by_job(job_id, after_id, page_size),
+            page_size,
+        )
+
+    def iter_by_hire_date_range(
+        self,
+        start_date: datetime.datetime,
+        end_date: datetime.datetime,
+        page_size: int = 1000,
+    ) -> AsyncIterator[List[Employee]]:
+        return self._iter_pages(
+            lambda after_id: self.find_page_by_hire_date_range(
+                start_date, end_date, after_id, page_size
+            ),
+            page_size,
+        )
+
+    async def _iter_pages(
+        self,
+        fetch_page: Callable[[int], Awaitable[List[Employee]]],
+        page_size: int,
+    ) -> AsyncIterator[List[Employee]]:
+        after_id = 0
+        while True:
+            page = await fetch_page(after_id)
+            if page:
+                yield page
+            if len(page) < page_size:
+                return
+            after_id = page[-1].id
+
+    def _find_page(
+        self,
+        handle: OperationHandle,
+        condition: str,
+        params: tuple,
+        after_id: int,
+        limit: int,
+    ) -> List[Employee]:
+        conn = self._connect(handle)
+        try:
+            cursor = conn.execute(
+                "SELECT id, name, datetime, department_id, job_id "
+                f"FROM employees WHERE {condition} AND id > ? ORDER BY id LIMIT ?",
+                (*params, after_id, limit),
+            )
+            employees = []
+            while True:
+                rows = cursor.fetchmany(500)
+                if not rows:
+                    break
+                employees.extend(self._from_row(row) for row in rows)
+            return employees
+        finally:
+            conn.close()
+
+
+class SQLiteDepartmentRepository(_SQLiteRepository, DepartmentRepository):
+    TABLE = "departments"
+    COLUMNS = ["id", "department"]
+
+    def _from_row(self, row: sqlite3.Row) -> Department:
+        return Department(id=row["id"], department=row["department"])
+
+    async def find_by_name(self, department: str) -> List[Department]:
+        try:
+            return await self.executor.run(
+                self._find_by_name, department, operation="departments.find_by_name"
+            )
+        except Exception as e:
+            logger.error("Error finding department by department: %s", e)
+            return []
+
+    def _find_by_name(self, handle: OperationHandle, department: str) -> List[Department]:
+        conn = self._connect(handle)
+        try:
+            rows = conn.execute(
+                "SELECT * FROM departments WHERE department = ?", (department,)
+            ).fetchall()
+            return [self._from_row(row) for row in rows]
+        finally:
+            conn.close()
+
+
+class SQLiteJobRepository(_SQLiteRepository, JobRepository):
+    TABLE = "jobs"
+    COLUMNS = ["id", "job"]
+
+    def _from_row(self, row: sqlite3.Row) -> Job:
+        return Job(id=row["id"], job=row["job"])
+
+    async def find_by_name(self, job: str) -> List[Job]:
+        try:
+            return await self.executor.run(
+                self._find_by_name, job, operation="jobs.find_by_name"
+            )
+        except Exception as e:
+            logger.error("Error finding job by job: %s", e)
+            return []
+
+    def _find_by_name(self, handle: OperationHandle, job: str) -> List[Job]:
+        conn = self._connect(handle)
+        try:
+            rows = conn.execute("SELECT * FROM jobs WHERE job = ?", (job,)).fetchall()
+            return [self._from_row(row) for row in rows]
+        finally:
+            conn.close()
+
+
+class SQLiteMetricsRepository(MetricsRepository):
+    def __init__(self, database_path: str, executor: Optional[DatabaseExecutor] = None):
+        self.database_path = database_path
+        self.executor = executor or DatabaseExecutor()
+
+    # Period label per granularity, computed from the hire date
+    PERIODS = {
+        "month": "strftime('%Y-%m', e.datetime)",
+        "quarter": (
+            "strftime('%Y', e.datetime) || '-Q' || "
+            "((CAST(strftime('%m', e.datetime) AS INTEGER) + 2) / 3)"
+        ),
+        "week": "date(e.datetime, 'weekday 0', '-6 days')",
+    }
+
+    # Whole quarters are read from the hires_by_quarter aggregate, whose size
+    # grows with the department/job pairs rather than with the employees. Other
+    # ranges filter employees with a half-open range on the hire date, which
+    # the IX_Employee_HireDate index can seek
+
+    async def hires_by_period(
+        self, start: datetime.date, end: datetime.date, granularity: str = "quarter"
+    ) -> List[Dict]:
+        if granularity == "quarter" and covers_whole_quarters(start, end):
+            query = """
+            SELECT
+                d.department,
+                j.job,
+                h.year || '-Q' || h.quarter as period,
+                SUM(h.hires) as hires
+            FROM hires_by_quarter h
+            JOIN departments d ON h.department_id = d.id
+            JOIN jobs j ON h.job_id = j.id
+            WHERE h.year BETWEEN ? AND ?
+                AND h.year * 4 + h.quarter - 1 >= ?
+                AND h.year * 4 + h.quarter - 1 < ?
+            GROUP BY d.department, j.job, h.year, h.quarter
+            ORDER BY d.department, j.job, h.year, h.quarter
+            """
+            params = (start.year, end.year, quarter_index(start), quarter_index(end))
+        else:
+            query = f"""
+            SELECT department, job, period, COUNT(*) as hires
+            FROM (
+                SELECT d.department, j.job, {self.PERIODS[granularity]} as period
+                FROM employees e
+                JOIN departments d ON e.department_id = d.id
+                JOIN jobs j ON e.job_id = j.id
+                WHERE e.datetime >= ? AND e.datetime < ?
+            )
+            GROUP BY department, job, period
+            ORDER BY department, job, period
+            """
+            params = self._date_bounds(start, end)
+        return await self.executor.run(
+            self._query, query, params, operation="metrics.hires_by_period"
+        )
+
+    async def departments_above_mean(
+        self, start: datetime.date, end: datetime.date
+    ) -> List[Dict]:
+        if covers_whole_quarters(start, end):
+            department_hires = """
+                SELECT
+                    d.id,
+                    d.department,
+                    SUM(h.hires) as hired_count
+                FROM hires_by_quarter h
+                JOIN departments d ON h.department_id = d.id
+                WHERE h.year BETWEEN ? AND ?
+                    AND h.year * 4 + h.quarter - 1 >= ?
+                    AND h.year * 4 + h.quarter - 1 < ?
+                GROUP BY d.id, d.department
+            """
+            params = (start.year, end.year, quarter_index(start), quarter_index(end))
+        else:
+            department_hires = """
+                SELECT
+                    d.id,
+                    d.department,
+                    COUNT(*) as hired_count
+                FROM employees e
+                JOIN departments d ON e.department_id = d.id
+                WHERE e.datetime >= ? AND e.datetime < ?
+                GROUP BY d.id, d.department
+            """
+            params = self._date_bounds(start, end)
+        return await self.executor.run(
+            self._query,
+            f"""
+            WITH DepartmentHires AS ({department_hires}),
+            HiresMean AS (
+                SELECT AVG(CAST(hired_count AS REAL)) as mean_hires
+                FROM DepartmentHires
+            )
+            SELECT
+                id,
+                department,
+                hired_count as hired
+            FROM DepartmentHires, HiresMean
+            WHERE hired_count > mean_hires
+            ORDER BY hired_count DESC
+            """,
+            params,
+            operation="metrics.departments_above_mean",
+        )
+
+    @staticmethod
+    def _date_bounds(start: datetime.date, end: datetime.date) -> tuple:
+        # Same 'YYYY-MM-DD HH:MM:SS' text as the stored hire dates
+        return (f"{start.isoformat()} 00:00:00", f"{end.isoformat()} 00:00:00")
+
+    def _query(self, handle: OperationHandle, query: str, params: tuple) -> List[Dict]:
+        conn = get_sqlite_connection(self.database_path)
+        handle.track(SQLiteCancelHandle(conn))
+        try:
+            return [dict(row) for row in conn.execute(query, params).fetchall()]
+        finally:
+            conn.close()
@@ -1,15 +1,28 @@
-from azure.storage.blob import BlobServiceClient
+import asyncio
+import logging
 from abc import ABC, abstractmethod
-from typing import BinaryIO
+from typing import BinaryIO, Optional
 from src.application.interfaces.storage_service import StorageService
+from src.infrastructure.azure.blob_transfer import BlobTransferEngine
+
+logger = logging.getLogger(__name__)
 
 
 class AzureBlobStorageServiceInfrastructure(StorageService):
-    def __init__(self, connection_string: str, container_name: str):
+    def __init__(
+        self,
+        connection_string: str,
+        container_name: str,
+        transfer_engine: Optional[BlobTransferEngine] = None,
+    ):
+        # The blob SDK is imported with the first client, not with the app
+        from azure.storage.blob import BlobServiceClient
+
         self.blob_service_client = BlobServiceClient.from_connection_string(
             connection_string
         )
         self.container_name = container_name
+        self.transfer_engine = transfer_engine or BlobTransferEngine()
 
     async def store_file(self, file_content: BinaryIO, filename: str) -> bool:
         try:
@@ -18,13 +31,16 @@ class AzureBlobStorageServiceInfrastructure(StorageService):
             )
             blob_client = container_client.get_blob_client(filename)
             file_content.seek(0)
-            blob_client.upload_blob(file_content, overwrite=True)
-            print(
-                f"[INFO] File '{filename}' successfully stored in container '{self.container_name}'."
+            # Blocks are uploaded in parallel on a worker thread
+            await asyncio.to_thread(self.transfer_engine.upload, blob_client, file_content)
+            logger.info(
+                "File '%s' successfully stored in container '%s'.",
+                filename,
+                self.container_name,
             )
             return True
         except Exception as e:
-            print(f"[ERROR] Error storing file '{filename}': {str(e)}")
+            logger.error("Error storing file '%s': %s", filename, e)
             return False
 
     async def retrieve_file(self, filename: str) -> BinaryIO:
@@ -34,11 +50,15 @@ class AzureBlobStorageServiceInfrastructure(StorageService):
                 self.container_name
             )
             blob_client = container_client.get_blob_client(filename)
-            blob_data = blob_client.download_blob()
-            print(
-                f"[INFO] File '{filename}' successfully retrieved from container '{self.container_name}'."
+            blob_data = await asyncio.to_thread(
+                self.transfer_engine.download_bytes, blob_client
+            )
+            logger.info(
+                "File '%s' successfully retrieved from container '%s'.",
+                filename,
+                self.container_name,
             )
-            return blob_data.content_as_bytes()
+            return blob_data
         except Exception as e:
-            print(f"[ERROR] Error retrieving file '{filename}': {str(e)}")
+            logger.error("Error retrieving file '%s': %s", filename, e)
             raise
@@ -0,0 +1,6 @@
+import os
+
+# The modules under test import settings; secrets are only read on first use
+# and the embedded SQLite backend needs no Azure SQL connection string
+os.environ.setdefault("LAZY_INIT", "true")
+os.environ.setdefault("DB_BACKEND", "sqlite")
@@ -0,0 +1,194 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.domain.exceptions.domain_exceptions import RestoreError
+from src.infrastructure.db.sqlite_connection import get_sqlite_connection
+
+
+def insert_employees(database_path, ids):
+    conn = get_sqlite_connection(database_path)
+    with conn:
+        conn.executemany(
+            "INSERT INTO employees (id, name, datetime, department_id, job_id) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [(i, f"Employee {i}", "2021-03-01 09:00:00", 1, 1) for i in ids],
+        )
+    conn.close()
+
+
+def count_rows(database_path, table_name):
+    conn = get_sqlite_connection(database_path)
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_unchanged_table_is_skipped(backup_repository):
+    first = asyncio.run(backup_repository.create_backup("employees"))
+    second = asyncio.run(backup_repository.create_backup("employees"))
+
+    assert second == {"backup_id": first["backup_id"], "skipped": True}
+
+
+def test_other_format_or_codec_is_not_skipped(backup_repository):
+    first = asyncio.run(backup_repository.create_backup("employees"))
+    parquet = asyncio.run(
+        backup_repository.create_backup("employees", file_format="parquet")
+    )
+    uncompressed = asyncio.run(
+        backup_repository.create_backup("employees", codec="null", file_format="parquet")
+    )
+    repeated = asyncio.run(
+        backup_repository.create_backup("employees", codec="null", file_format="parquet")
+    )
+
+    assert parquet["backup_id"].endswith(".parquet") and not parquet.get("skipped")
+    assert uncompressed["backup_id"] != parquet["backup_id"]
+    assert not uncompressed.get("skipped")
+    assert repeated == {"backup_id": uncompressed["backup_id"], "skipped": True}
+    assert first["backup_id"].endswith(".avro")
+
+
+def test_values_swapped_between_rows_are_backed_up(backup_repository, database):
+    asyncio.run(backup_repository.create_backup("employees"))
+    conn = get_sqlite_connection(database)
+    with conn:
+        conn.execute(
+            "UPDATE employees SET name = CASE id WHEN 1 THEN 'Employee 2' "
+            "ELSE 'Employee 1' END WHERE id IN (1, 2)"
+        )
+    conn.close()
+
+    assert not asyncio.run(backup_repository.create_backup("employees")).get("skipped")
+
+
+def test_incremental_backups_are_replayed_on_restore(backup_repository, database):
+    full = asyncio.run(backup_repository.create_backup("employees"))
+    insert_employees(database, [301, 302])
+    incremental = asyncio.run(
+        backup_repository.create_backup("employees", incremental=True)
+    )
+    insert_employees(database, [303])
+
+    asyncio.run(backup_repository.restore_backup(incremental["backup_id"], "employees"))
+
+    assert incremental["kind"] == "incremental"
+    assert incremental["parent_id"] == full["backup_id"]
+    assert incremental["rows"] == 2
+    assert count_rows(database, "employees") == 302
+
+
+def test_compacting_an_older_chain_keeps_the_latest_backup(backup_repository, database):
+    asyncio.run(backup_repository.create_backup("employees"))
+    insert_employees(database, [301])
+    first = asyncio.run(backup_repository.create_backup("employees", incremental=True))
+    insert_employees(database, [302])
+    second = asyncio.run(backup_repository.create_backup("employees", incremental=True))
+
+    compacted = asyncio.run(
+        backup_repository.compact_backups("employees", first["backup_id"])
+    )
+
+    ids = [entry["id"] for entry in asyncio.run(backup_repository.list_backups("employees"))]
+    assert ids.index(compacted["backup_id"]) == ids.index(first["backup_id"]) + 1
+    assert backup_repository._resolve_backup_id("employees") == second["backup_id"]
+    assert backup_repository._chain_head("employees")["id"] == second["backup_id"]
+    asyncio.run(backup_repository.restore_backup(None, "employees"))
+    assert count_rows(database, "employees") == 302
+
+
+def test_compacting_the_newest_chain_makes_it_the_base(backup_repository, database):
+    asyncio.run(backup_repository.create_backup("employees"))
+    insert_employees(database, [301])
+    asyncio.run(backup_repository.create_backup("employees", incremental=True))
+
+    compacted = asyncio.run(backup_repository.compact_backups("employees"))
+    insert_employees(database, [302])
+    incremental = asyncio.run(
+        backup_repository.create_backup("employees", incremental=True)
+    )
+
+    assert compacted["rows"] == 301
+    assert incremental["parent_id"] == compacted["backup_id"]
+    assert incremental["chain_length"] == 1
+
+
+def test_catalog_retry_after_a_concurrent_writer_stays_ordered(backup_repository):
+    fetch_catalog = backup_repository._fetch_catalog
+    raced = []
+
+    def fetch_racing_another_writer(table_name):
+        catalog = fetch_catalog(table_name)
+        if not raced:
+            # Another backup is recorded between our read and our upload
+            raced.append(1)
+            backup_repository._record_in_catalog(
+                table_name, {"backup_id": "employees/other.avro"}
+            )
+        return catalog
+
+    backup_repository._fetch_catalog = fetch_racing_another_writer
+    backup_repository._record_in_catalog("employees", {"backup_id": "employees/ours.avro"})
+    backup_repository._fetch_catalog = fetch_catalog
+
+    backups = fetch_catalog("employees")[0]["backups"]
+    assert [entry["id"] for entry in backups] == [
+        "employees/other.avro",
+        "employees/ours.avro",
+    ]
+    assert backups[0]["created_at"] <= backups[1]["created_at"]
+
+
+def test_old_catalog_entries_are_archived_and_still_resolved(backup_repository, database):
+    backup_repository.catalog_segment_size = 2
+    backups = []
+    for employee_id in range(301, 308):
+        insert_employees(database, [employee_id])
+        backup = asyncio.run(backup_repository.create_backup("employees"))
+        backups.append((datetime.now(timezone.utc), backup["backup_id"]))
+
+    catalog = backup_repository._fetch_catalog("employees")[0]
+    assert len(catalog["backups"]) == 3
+    assert [segment["count"] for segment in catalog["segments"]] == [2, 2]
+    for as_of, backup_id in backups:
+        assert backup_repository._resolve_backup_id("employees", as_of) == backup_id
+    assert backup_repository._resolve_backup_id("employees") == backups[-1][1]
+    listed = asyncio.run(backup_repository.list_backups("employees"))
+    assert [entry["id"] for entry in listed] == [backup_id for _, backup_id in backups]
+    with pytest.raises(RestoreError):
+        backup_repository._resolve_backup_id(
+            "employees", backups[0][0] - timedelta(days=1)
+        )
+
+
+def test_failed_partitioned_restore_leaves_the_table_intact(
+    backup_repository, database, blob_service
+):
+    backup = asyncio.run(backup_repository.create_backup("employees", partitions=4))
+    conn = get_sqlite_connection(database)
+    with conn:
+        conn.execute("DELETE FROM employees WHERE id > 250")
+    conn.close()
+    # One partition of the backup is lost
+    parts = backup_repository._backup_blobs(backup["backup_id"])
+    blob_service.get_blob_client("backups", parts[2]).delete_blob()
+
+    with pytest.raises(RestoreError):
+        asyncio.run(backup_repository.restore_backup(backup["backup_id"], "employees"))
+    assert count_rows(database, "employees") == 250
+
+
+def test_partitioned_restore_swaps_every_partition_in(backup_repository, database):
+    backup = asyncio.run(backup_repository.create_backup("employees", partitions=4))
+    conn = get_sqlite_connection(database)
+    with conn:
+        conn.execute("DELETE FROM employees WHERE id > 250")
+    conn.close()
+
+    asyncio.run(backup_repository.restore_backup(None, "employees"))
+
+    assert backup["partitions"] == 4
+    assert count_rows(database, "employees") == 300
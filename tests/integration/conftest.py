@@ -0,0 +1,169 @@
+import functools
+import threading
+import types
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from azure.core import MatchConditions
+from azure.core.exceptions import (
+    ResourceExistsError,
+    ResourceModifiedError,
+    ResourceNotFoundError,
+)
+
+from src.infrastructure.db.bulk_load import SQLiteBulkLoad
+from src.infrastructure.db.hires_aggregate import SQLiteHiresAggregate
+from src.infrastructure.db.snapshot import SQLiteSnapshot
+from src.infrastructure.db.sqlite_connection import get_sqlite_connection
+from src.infrastructure.persistance.azure_backup_repository import (
+    AzureBackupRepository,
+)
+
+
+class InMemoryBlobService:
+    """
+    The part of BlobServiceClient the backup repository uses, with ETags and
+    conditional uploads, over a dictionary.
+    """
+
+    def __init__(self):
+        self.blobs = {}
+        self.lock = threading.Lock()
+
+    def get_container_client(self, container):
+        return InMemoryContainer(self, container)
+
+    def get_blob_client(self, container, blob):
+        return InMemoryBlob(self, container, blob)
+
+
+class InMemoryContainer:
+    def __init__(self, service, name):
+        self.service = service
+        self.name = name
+
+    def exists(self):
+        return True
+
+    def list_blobs(self, name_starts_with="", include=None):
+        with self.service.lock:
+            return [
+                InMemoryBlob(self.service, container, name).get_blob_properties()
+                for (container, name) in sorted(self.service.blobs)
+                if container == self.name and name.startswith(name_starts_with)
+            ]
+
+
+class InMemoryBlob:
+    def __init__(self, service, container, name):
+        self.service = service
+        self.key = (container, name)
+        self.blob_name = name
+        self._blocks = {}
+
+    def upload_blob(self, data, overwrite=False, metadata=None, etag=None,
+                    match_condition=None):
+        if isinstance(data, str):
+            data = data.encode()
+        with self.service.lock:
+            existing = self.service.blobs.get(self.key)
+            if existing and not overwrite:
+                raise ResourceExistsError("BlobAlreadyExists")
+            if match_condition == MatchConditions.IfNotModified and (
+                existing is None or existing["etag"] != etag
+            ):
+                raise ResourceModifiedError("ConditionNotMet")
+            self._store(bytes(data), metadata)
+
+    def stage_block(self, block_id, data, **kwargs):
+        self._blocks[block_id] = bytes(data)
+
+    def commit_block_list(self, block_list, metadata=None, **kwargs):
+        with self.service.lock:
+            self._store(b"".join(self._blocks[block] for block in block_list), metadata)
+
+    def download_blob(self, offset=None, length=None):
+        blob = self._get()
+        data = blob["data"]
+        if offset is not None:
+            data = data[offset : offset + length if length else None]
+        return types.SimpleNamespace(
+            readall=lambda: data, properties=types.SimpleNamespace(etag=blob["etag"])
+        )
+
+    def get_blob_properties(self):
+        blob = self._get()
+        return types.SimpleNamespace(
+            name=self.blob_name,
+            size=len(blob["data"]),
+            metadata=dict(blob["metadata"]),
+            creation_time=blob["created_at"],
+        )
+
+    def delete_blob(self):
+        with self.service.lock:
+            if self.service.blobs.pop(self.key, None) is None:
+                raise ResourceNotFoundError("BlobNotFound")
+
+    def _get(self):
+        blob = self.service.blobs.get(self.key)
+        if blob is None:
+            raise ResourceNotFoundError("BlobNotFound")
+        return blob
+
+    def _store(self, data, metadata):
+        self.service.blobs[self.key] = {
+            "data": data,
+            "metadata": dict(metadata or {}),
+            "etag": uuid.uuid4().hex,
+            "created_at": datetime.now(timezone.utc),
+        }
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = str(tmp_path / "etl.db")
+    conn = get_sqlite_connection(path)
+    with conn:
+        conn.executemany(
+            "INSERT INTO departments VALUES (?, ?)", [(i, f"Dept {i}") for i in (1, 2, 3)]
+        )
+        conn.executemany("INSERT INTO jobs VALUES (?, ?)", [(i, f"Job {i}") for i in (1, 2)])
+        conn.executemany(
+            "INSERT INTO employees (id, name, datetime, department_id, job_id) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [
+                (i, f"Employee {i}", "2021-03-01 09:00:00", i % 3 + 1, i % 2 + 1)
+                for i in range(1, 301)
+            ],
+        )
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def blob_service():
+    return InMemoryBlobService()
+
+
+@pytest.fixture
+def backup_repository(database, blob_service):
+    # Configured as the container configures the SQLite backend
+    repository = AzureBackupRepository(
+        blob_connection_string="",
+        container_name="backups",
+        connection_factory=functools.partial(get_sqlite_connection, database),
+        truncate_statement="DELETE FROM {table}",
+        bulk_load=SQLiteBulkLoad(),
+        snapshot=SQLiteSnapshot(),
+        hires_aggregate=SQLiteHiresAggregate(),
+        signature_statement=(
+            "SELECT COUNT(*), MAX(id), table_digest({columns}) FROM {table}"
+        ),
+        catalog_ttl=0,
+        lazy_init=True,
+    )
+    repository._blob_service_client = blob_service
+    yield repository
+    repository.executor.shutdown()
@@ -0,0 +1,86 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.domain.exceptions.domain_exceptions import (
+    DatabaseCancelledError,
+    DatabaseTimeoutError,
+)
+from src.infrastructure.db.executor import DatabaseExecutor
+
+
+class BlockingCursor:
+    """Cursor whose statement runs until it is cancelled."""
+
+    def __init__(self):
+        self.cancelled = threading.Event()
+
+    def execute(self):
+        if not self.cancelled.wait(5):
+            raise AssertionError("statement was never cancelled")
+        raise RuntimeError("Operation cancelled")
+
+    def cancel(self):
+        self.cancelled.set()
+
+
+def test_run_passes_a_handle_and_returns_the_result():
+    executor = DatabaseExecutor(max_workers=1)
+
+    def operation(handle, value):
+        return handle.name, value * 2
+
+    try:
+        assert asyncio.run(executor.run(operation, 21, operation="double")) == (
+            "double",
+            42,
+        )
+    finally:
+        executor.shutdown()
+
+
+def test_timeout_cancels_the_running_statement():
+    executor = DatabaseExecutor(max_workers=1)
+    cursor = BlockingCursor()
+    handles = []
+
+    def operation(handle):
+        handles.append(handle)
+        handle.track(cursor).execute()
+
+    try:
+        with pytest.raises(DatabaseTimeoutError):
+            asyncio.run(executor.run(operation, timeout=0.05, operation="slow"))
+        assert cursor.cancelled.wait(1)
+        assert handles[0].cancelled
+        # Cursors opened after the cancellation are refused
+        with pytest.raises(DatabaseCancelledError):
+            handles[0].track(BlockingCursor())
+    finally:
+        executor.shutdown()
+
+
+def test_cancelling_the_caller_cancels_the_operation():
+    executor = DatabaseExecutor(max_workers=1)
+    cursor = BlockingCursor()
+    started = threading.Event()
+
+    def operation(handle):
+        handle.track(cursor)
+        started.set()
+        cursor.execute()
+
+    async def run():
+        task = asyncio.ensure_future(executor.run(operation, timeout=0))
+        while not started.is_set():
+            await asyncio.sleep(0.001)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    try:
+        asyncio.run(run())
+        assert cursor.cancelled.wait(1)
+    finally:
+        executor.shutdown()
@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+from src.application.services.metrics_cache import DataVersions, MetricsCache
+
+
+def test_concurrent_requests_share_one_computation():
+    cache = MetricsCache(DataVersions())
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"hires": 3}
+
+    async def run():
+        return await asyncio.gather(
+            *(cache.get_or_compute("hires", ["employees"], compute) for _ in range(5))
+        )
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert {etag for etag, _ in results} == {results[0][0]}
+    assert all(result == {"hires": 3} for _, result in results)
+    stats = cache.stats()
+    assert stats["misses"] == 1
+    assert stats["coalesced"] == 4
+    assert stats["in_flight"] == 0
+
+
+def test_results_are_recomputed_once_a_table_changes():
+    versions = DataVersions()
+    cache = MetricsCache(versions)
+    values = iter([1, 2])
+
+    async def compute():
+        return next(values)
+
+    async def run():
+        first = await cache.get_or_compute("hires", ["employees"], compute)
+        cached = await cache.get_or_compute("hires", ["employees"], compute)
+        versions.bump("departments")
+        unrelated = await cache.get_or_compute("hires", ["employees"], compute)
+        versions.bump("employees", appended=True)
+        changed = await cache.get_or_compute("hires", ["employees"], compute)
+        return first, cached, unrelated, changed
+
+    first, cached, unrelated, changed = asyncio.run(run())
+    assert first == cached == unrelated
+    assert changed[1] == 2
+    assert changed[0] != first[0]
+    assert cache.stats()["hits"] == 2
+
+
+def test_failed_computations_are_not_cached():
+    cache = MetricsCache(DataVersions())
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("query failed")
+        return 7
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await cache.get_or_compute("hires", ["employees"], compute)
+        return await cache.get_or_compute("hires", ["employees"], compute)
+
+    assert asyncio.run(run())[1] == 7
+    assert len(calls) == 2
+
+
+def test_results_expire_after_the_ttl():
+    cache = MetricsCache(DataVersions(), ttl=0)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return len(calls)
+
+    async def run():
+        await cache.get_or_compute("hires", ["employees"], compute)
+        return await cache.get_or_compute("hires", ["employees"], compute)
+
+    assert asyncio.run(run())[1] == 2
+
+
+def test_least_recently_used_results_are_evicted():
+    cache = MetricsCache(DataVersions(), max_entries=2)
+
+    async def compute():
+        return 0
+
+    async def run():
+        for key in ("a", "b", "a", "c"):
+            await cache.get_or_compute(key, ["employees"], compute)
+
+    asyncio.run(run())
+    assert cache.stats()["entries"] == 2
+    assert cache.stats()["misses"] == 3
+
+
+def test_not_modified_matches_the_etag():
+    cache = MetricsCache(DataVersions())
+    etag = '"abc"'
+    assert cache.not_modified('"abc"', etag)
+    assert cache.not_modified('"x", W/"abc"', etag)
+    assert cache.not_modified("*", etag)
+    assert not cache.not_modified('"x"', etag)
+    assert not cache.not_modified(None, etag)
+    assert cache.stats()["not_modified"] == 3
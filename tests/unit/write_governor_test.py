@@ -0,0 +1,130 @@
+import asyncio
+
+import pytest
+
+from src.domain.exceptions.domain_exceptions import DatabaseTimeoutError
+from src.infrastructure.db.write_governor import WriteGovernor, is_transient_error
+
+
+class TransientError(Exception):
+    def __init__(self):
+        super().__init__("[SQL Server]The service is currently busy. (40501)")
+
+
+def governor(**kwargs) -> WriteGovernor:
+    # No backoff delay, so retries run immediately
+    return WriteGovernor(base_backoff=0, **kwargs)
+
+
+def test_is_transient_error_classification():
+    assert is_transient_error(TransientError())
+    assert is_transient_error(Exception("HYT00", "Query timeout expired"))
+    assert is_transient_error(Exception("database is locked"))
+    assert not is_transient_error(Exception("23000", "Violation of PRIMARY KEY (2627)"))
+    # The statement may still commit after a timeout, so it is not retried
+    assert not is_transient_error(DatabaseTimeoutError("timed out"))
+
+
+def test_transient_errors_are_retried_and_cut_the_limit_once():
+    write_governor = governor(initial_concurrency=8, max_retries=3)
+    attempts = []
+
+    async def write():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise TransientError()
+        return [True]
+
+    assert asyncio.run(write_governor.submit(write)) == [True]
+    state = write_governor.snapshot()
+    assert len(attempts) == 3
+    assert state["retries"] == 2
+    assert state["transient_errors"] == 2
+    assert state["batches_succeeded"] == 1
+    # Each retry started after the previous cut, so both count: 8 -> 4 -> 2
+    assert state["concurrency_limit"] == 2
+    assert state["limit_decreases"] == 2
+
+
+def test_retries_give_up_after_max_retries():
+    write_governor = governor(max_retries=2)
+    attempts = []
+
+    async def write():
+        attempts.append(1)
+        raise TransientError()
+
+    with pytest.raises(TransientError):
+        asyncio.run(write_governor.submit(write))
+    assert len(attempts) == 3
+    assert write_governor.snapshot()["batches_failed"] == 1
+
+
+def test_permanent_errors_are_not_retried():
+    write_governor = governor(initial_concurrency=4)
+    attempts = []
+
+    async def write():
+        attempts.append(1)
+        raise ValueError("Violation of PRIMARY KEY constraint (2627)")
+
+    with pytest.raises(ValueError):
+        asyncio.run(write_governor.submit(write))
+    assert len(attempts) == 1
+    assert write_governor.snapshot()["concurrency_limit"] == 4
+
+
+def test_timeouts_cut_the_limit_without_a_retry():
+    write_governor = governor(initial_concurrency=4)
+    attempts = []
+
+    async def write():
+        attempts.append(1)
+        raise DatabaseTimeoutError("Database operation 'employees.save_batch' timed out")
+
+    with pytest.raises(DatabaseTimeoutError):
+        asyncio.run(write_governor.submit(write))
+    state = write_governor.snapshot()
+    assert len(attempts) == 1
+    assert state["timeouts"] == 1
+    assert state["retries"] == 0
+    assert state["batches_failed"] == 1
+    assert state["concurrency_limit"] == 2
+
+
+def test_limit_grows_by_one_after_a_round_of_successes():
+    write_governor = governor(initial_concurrency=2, max_concurrency=3)
+
+    async def write():
+        return []
+
+    async def run(batches):
+        for _ in range(batches):
+            await write_governor.submit(write)
+
+    asyncio.run(run(2))
+    assert write_governor.limit == 3
+    # Capped at max_concurrency
+    asyncio.run(run(6))
+    assert write_governor.limit == 3
+    assert write_governor.snapshot()["limit_increases"] == 1
+
+
+def test_concurrent_writes_never_exceed_the_limit():
+    write_governor = governor(initial_concurrency=3, max_concurrency=3)
+    running = []
+    peak = []
+
+    async def write():
+        running.append(1)
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        running.pop()
+        return []
+
+    async def run():
+        await asyncio.gather(*(write_governor.submit(write) for _ in range(12)))
+
+    asyncio.run(run())
+    assert max(peak) == 3
+    assert write_governor.in_flight == 0